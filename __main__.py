@@ -6,7 +6,9 @@ import re
 import ast
 import time
 import yaml
+import asyncio
 import topgg
+import functools
 import prsaw
 import topgg
 import typing
@@ -26,6 +28,16 @@ from discord.ext import commands, ipc
 from helpers.context import CustomContext
 from asyncdagpi import Client, ImageFeatures
 from helpers.helpers import LoggingEventsFlags
+from helpers.extensions import ImportProfiler, LazyExtensions, load_manifest
+from helpers.router import MessageRouter
+from helpers.webhooks import WebhookPool
+from helpers.log_queue import LOG_QUEUE_CAP, LogQueue
+from helpers.log_spool import LogSpool
+from helpers.log_routes import LogRoutes
+from helpers.guild_settings import SETTINGS_COLUMNS, GuildSettingsCache
+from helpers.timers import TimerService
+from helpers.snapshots import MAX_SNAPSHOTS, SNAPSHOTS_PER_CHANNEL, MessageSnapshots
+from helpers.levels import RankIndex, TotalXPStore, XPAccumulator
 from collections import defaultdict, deque, namedtuple
 from helpers.paginator import PersistentExceptionView, PersistentVerifyView
 
@@ -49,8 +61,8 @@ discord.gateway.DiscordWebSocket.identify = loc["identify"]
 
 PRE: tuple = ("sb!",)
 
-with open(r'/root/stealthbot/config.yaml') as file:
-    full_yaml = yaml.load(file)
+with open(os.environ.get('STEALTHBOT_CONFIG', r'/root/stealthbot/config.yaml')) as file:
+    full_yaml = yaml.safe_load(file)
 yaml_data = full_yaml
 
 initial_extensions = (
@@ -60,6 +72,9 @@ initial_extensions = (
 extensions = ('cogs.events', 'cogs.fun', 'cogs.images', 'cogs.levels', 'cogs.logger', 'cogs.moderation', 'cogs.owner', 'cogs.utility', 'cogs.guild_config',
               'cogs.help', 'cogs.misc', 'cogs.nsfw', 'cogs.welcome')
 
+# these run background tasks or fill caches on startup, so they're always loaded right away
+eager_extensions = ('cogs.events', 'cogs.help', 'cogs.logger', 'cogs.moderation', 'cogs.welcome')
+
 target_type = typing.Union[discord.Member, discord.User, discord.PartialEmoji, discord.Guild, discord.Invite]
 
 os.environ["JISHAKU_NO_UNDERSCORE"] = "True"
@@ -139,6 +154,7 @@ class StealthBot(commands.AutoShardedBot):
         self._BotBase__cogs = commands.core._CaseInsensitiveDict()
         self.owner_ids = [564890536947875868, 555818548291829792, # Ender and vicente
                           349373972103561218, 675104167345258506, 855775178893426719]  # Leo and yoni and perez
+        self.owner_id_set = frozenset(self.owner_ids)
         self.ipc = ipc.Server(self, secret_key=yaml_data['IPC_SECRET'])
         self.pomice = pomice.NodePool()
         self.db = self.loop.run_until_complete(create_db_pool())
@@ -148,6 +164,11 @@ class StealthBot(commands.AutoShardedBot):
         self.add_check(self.maintenance)
         self.add_check(self.blacklist_check)
         self.persistent_views_added = False
+        self.router = MessageRouter(self)
+        # 'total' keeps one cumulative total_xp column instead of level + xp, see `dev migrate-xp`
+        self.xp_mode = yaml_data.get('XP_MODE', 'level')
+        self.xp = TotalXPStore(self) if self.xp_mode == 'total' else XPAccumulator(self)
+        self.ranks = RankIndex(self)
 
         # Tokens
         self.dagpi_cooldown = commands.CooldownMapping.from_cooldown(60, 60, commands.BucketType.default)
@@ -168,23 +189,41 @@ class StealthBot(commands.AutoShardedBot):
         self.launch_time = discord.utils.utcnow()
         self.theme = "default"
         self.messages_count = 0
+        self.lazy_extensions = yaml_data.get('LAZY_EXTENSIONS', False)
+        self.lazy = LazyExtensions(self)
+        self.extension_timings = {}
 
         # Cache stuff
-        self.afk_users = {}
+        self.afk_record = namedtuple('afk_record', ['start_time', 'reason'])
+        # None until the record is needed, for users only known to be AFK
+        self.afk_users: typing.Dict[int, typing.Optional[tuple]] = {}
         self.auto_un_afk = {}
         self.blacklist = {}
         self.prefixes = {}
-        self.messages = {}
-        self.edited_messages = {}
+        self.prefix_matchers = {}
         self.dj_modes = {}
         self.dj_roles = {}
         self.disable_commands_guilds = {}
+        self.guild_settings = GuildSettingsCache(self)
         self.dm_webhooks = defaultdict(str)
         log_wh = self.log_webhooks = namedtuple('log_wh',
                                                 ['default', 'message', 'member', 'join_leave', 'voice', 'server'])
         self.log_channels: typing.Dict[int, log_wh] = {}
-        self.log_cache = defaultdict(lambda: defaultdict(list))
+        log_queue = functools.partial(LogQueue, yaml_data.get('LOG_QUEUE_CAP', LOG_QUEUE_CAP),
+                                      yaml_data.get('LOG_QUEUE_POLICY', 'drop-oldest'))
+        self.log_cache: typing.DefaultDict[int, typing.DefaultDict[str, LogQueue]] = \
+            defaultdict(lambda: defaultdict(log_queue))
         self.guild_loggings: typing.Dict[int, LoggingEventsFlags] = {}
+        self.webhook_pool = WebhookPool(self)
+        self.log_routes = LogRoutes(self)
+        self._avatar_bytes: typing.Optional[typing.Tuple[str, bytes]] = None
+        # recent messages from logging guilds, so deletes and edits can be logged after discord.py forgot them
+        self.message_snapshots = MessageSnapshots(self, per_channel=yaml_data.get('SNAPSHOTS_PER_CHANNEL', SNAPSHOTS_PER_CHANNEL),
+                                                  max_snapshots=yaml_data.get('MAX_SNAPSHOTS', MAX_SNAPSHOTS))
+        # keeps queued log embeds on disk so a restart doesn't drop them
+        self.log_spool = LogSpool() if yaml_data.get('LOG_SPOOL', False) else None
+        # temp mutes and anything else that expires, cogs register their kinds of timers on load
+        self.timers = TimerService(self)
 
         # Useless stuff
         self.brain_cells = 0
@@ -194,20 +233,33 @@ class StealthBot(commands.AutoShardedBot):
         self.loop.run_until_complete(self.populate_cache())
 
 
+    def add_cog(self, cog: commands.Cog, **kwargs) -> None:
+        super().add_cog(cog, **kwargs)
+        self.router.add_cog(cog)
+
+    def remove_cog(self, name: str):
+        cog = self.get_cog(name)
+        if cog:
+            self.router.remove_cog(cog)
+
+        return super().remove_cog(name)
+
     def update_log(self, deliver_type: str, webhook_url: str, guild_id: int):
         guild_id = getattr(guild_id, 'id', guild_id)
-        if deliver_type == 'default':
-            self.log_channels[guild_id]._replace(default=webhook_url)
-        elif deliver_type == 'message':
-            self.log_channels[guild_id]._replace(message=webhook_url)
-        elif deliver_type == 'member':
-            self.log_channels[guild_id]._replace(member=webhook_url)
-        elif deliver_type == 'join_leave':
-            self.log_channels[guild_id]._replace(join_leave=webhook_url)
-        elif deliver_type == 'voice':
-            self.log_channels[guild_id]._replace(voice=webhook_url)
-        elif deliver_type == 'server':
-            self.log_channels[guild_id]._replace(server=webhook_url)
+        if deliver_type not in self.log_webhooks._fields:
+            return
+
+        # namedtuples are immutable, _replace hands back a new one
+        self.log_channels[guild_id] = self.log_channels[guild_id]._replace(**{deliver_type: webhook_url})
+        self.webhook_pool.invalidate(guild_id, deliver_type)
+        self.log_routes.rebuild(guild_id)
+
+    async def avatar_bytes(self) -> bytes:
+        # webhooks get created with the bot's avatar, no need to download it every time
+        key = self.user.display_avatar.key
+        if self._avatar_bytes is None or self._avatar_bytes[0] != key:
+            self._avatar_bytes = (key, await self.user.display_avatar.read())
+        return self._avatar_bytes[1]
 
 
     def dj_only(self, guild: discord.Guild):
@@ -222,27 +274,72 @@ class StealthBot(commands.AutoShardedBot):
         else:return False
 
 
-    async def get_pre(self, bot, message: discord.Message, raw_prefix: Optional[bool] = False):
-        if not message:
-            return commands.when_mentioned_or(*self.PRE)(bot, message) if not raw_prefix else self.PRE
+    async def get_afk(self, *user_ids: int) -> typing.Dict[int, tuple]:
+        """Returns the afk records of the given users that are AFK, only hitting the database (once, for all of them)
+        for ones that were marked AFK without their record being cached."""
+        records = {user_id: self.afk_users[user_id] for user_id in user_ids if user_id in self.afk_users}
+        missing = [user_id for user_id, record in records.items() if record is None]
+
+        if missing:
+            values = await self.db.fetch("SELECT user_id, start_time, reason FROM afk "
+                                         "WHERE user_id = ANY($1) AND start_time IS NOT NULL", missing)
 
-        if not message.guild:
-            return commands.when_mentioned_or(*self.PRE)(bot, message) if not raw_prefix else self.PRE
+            for value in values:
+                records[value['user_id']] = self.afk_users[value['user_id']] = \
+                    self.afk_record(value['start_time'], value['reason'])
 
+            for user_id in missing:
+                if records[user_id] is None:
+                    # not actually AFK anymore
+                    records.pop(user_id)
+                    self.afk_users.pop(user_id, None)
+
+        return records
+
+    def set_prefixes(self, guild_id: int, prefixes) -> None:
+        self.prefixes[guild_id] = prefixes
+        # rebuilt on the next message from that guild
+        self.prefix_matchers.pop(guild_id, None)
+
+    def get_prefix_matcher(self, guild_id: Optional[int]) -> tuple:
         try:
-            prefix = self.prefixes[message.guild.id]
+            return self.prefix_matchers[guild_id]
 
         except KeyError:
-            prefix = (await self.db.fetchval("SELECT prefix FROM guilds WHERE guild_id = $1",
-                                             message.guild.id)) or self.PRE
-            prefix = prefix if prefix[0] else self.PRE
+            pass
 
-            self.prefixes[message.guild.id] = prefix
+        prefixes = self.prefixes.get(guild_id, self.PRE) if guild_id else self.PRE
+        # longest first, so a prefix can't be shadowed by a shorter one it starts with
+        matcher = tuple(sorted(prefixes, key=len, reverse=True))
 
-        if await bot.is_owner(message.author) and bot.no_prefix is True:
-            return commands.when_mentioned_or(*prefix, "")(bot, message) if not raw_prefix else prefix
-        
-        return commands.when_mentioned_or(*prefix)(bot, message) if not raw_prefix else prefix
+        # the mention forms need our user ID, so only cache once we're logged in
+        if self.user:
+            matcher = (f'<@{self.user.id}> ', f'<@!{self.user.id}> ') + matcher
+            self.prefix_matchers[guild_id] = matcher
+
+        return matcher
+
+    async def get_pre(self, bot, message: discord.Message, raw_prefix: Optional[bool] = False):
+        if not message or not message.guild:
+            return self.get_prefix_matcher(None) if not raw_prefix else self.PRE
+
+        if message.guild.id not in self.prefixes:
+            # loading the settings sets the prefixes too
+            await self.guild_settings.get(message.guild.id)
+
+        if raw_prefix:
+            return self.prefixes[message.guild.id]
+
+        matcher = self.get_prefix_matcher(message.guild.id)
+
+        if self.no_prefix is True and message.author.id in self.owner_id_set:
+            return matcher + ("",)
+
+        return matcher
+
+    async def get_prefix(self, message: discord.Message):
+        # skips the list() copy the default implementation makes, the matcher is already a tuple
+        return await self.get_pre(self, message)
 
 
     async def get_context(self, message, *, cls=CustomContext):
@@ -254,6 +351,7 @@ class StealthBot(commands.AutoShardedBot):
         return await channel.send(f"Posted server count ({self.topggpy.guild_count}) and shard count {self.shard_count}")
 
     def _load_extension(self, ext):
+        start = time.perf_counter()
         try:
             self.load_extension(ext)
             print(f"[EXT] {ext} has been loaded")
@@ -261,82 +359,68 @@ class StealthBot(commands.AutoShardedBot):
         except Exception as e:
             print(f"[EXT] {ext} failed to load.\n{type(e).__name__}: {e}")
 
+        self.extension_timings[ext] = time.perf_counter() - start
+
     async def load_cogs(self) -> None:
         print("[EXT] loading cogs...")
-        for ext in initial_extensions:
-            self._load_extension(ext)
+        manifest = load_manifest() if self.lazy_extensions else {}
 
-        for ext in extensions:
-            self._load_extension(ext)
+        with ImportProfiler() as profiler:
+            for ext in initial_extensions:
+                self._load_extension(ext)
 
-    async def populate_cache(self):
-        print("[CACHE] populating cache...")
-        # BLACKLIST
-        values = await self.db.fetch("SELECT user_id, is_blacklisted FROM blacklist")
+            for ext in extensions:
+                if ext in manifest and ext not in eager_extensions:
+                    self.lazy.register(ext, manifest[ext])
 
-        for value in values:
-            self.blacklist[value['user_id']] = (value['is_blacklisted'] or False)
-
-        print("[CACHE] blacklist has been loaded")
-        # BLACKLIST
+                else:
+                    self._load_extension(ext)
 
-        # PREFIXES
-        values = await self.db.fetch("SELECT guild_id, prefix FROM guilds")
+        profiler.report(self.extension_timings)
 
-        for value in values:
-            if value['prefix']:
-                self.prefixes[value['guild_id']] = ((value['prefix'] if value['prefix'][0] else PRE) or PRE)
+    async def _timed_stage(self, name: str, coro) -> typing.Tuple[str, float]:
+        start = time.perf_counter()
+        await coro
+        return name, (time.perf_counter() - start) * 1000
 
-        for guild in self.guilds:
-            try:
-                self.prefixes[guild.id]
-
-            except KeyError:
-                self.prefixes[guild.id] = PRE
-
-        print("[CACHE] prefixes have been loaded")
-        # PREFIXES
-
-        # AFK
-        self.afk_users = dict(
-            [(r['user_id'], True) for r in (await self.db.fetch('SELECT user_id, start_time FROM afk')) if
-             r['start_time']])
+    async def _cache_blacklist(self):
+        values = await self.db.fetch("SELECT user_id, is_blacklisted FROM blacklist")
 
-        self.auto_un_afk = dict(
-            [(r['user_id'], r['auto_un_afk']) for r in (await self.db.fetch('SELECT user_id, auto_un_afk FROM afk')) if
-             r['auto_un_afk'] is not None])
+        for value in values:
+            self.blacklist[value['user_id']] = (value['is_blacklisted'] or False)
 
-        print("[CACHE] afk users have been loaded")
-        # AFK
+    async def _cache_guilds(self):
+        # every per-guild setting lives in the guilds table, so read it once (prefixes and disabled commands included)
+        values = await self.db.fetch(f"SELECT guild_id, {', '.join(SETTINGS_COLUMNS)} FROM guilds")
+        self.guild_settings.load(values, (guild.id for guild in self.guilds))
 
-        # DISABLE COMMANDS GUILDS
-        self.disable_commands_guilds = dict(
-            [(r['guild_id'], True) for r in (await self.db.fetch('SELECT guild_id, disable_commands FROM guilds')) if
-             r['disable_commands']])
+    async def _cache_afk(self):
+        values = await self.db.fetch("SELECT user_id, start_time, reason, auto_un_afk FROM afk")
 
-        print("[CACHE] disable command guilds have been loaded")
-        # DISABLE COMMANDS GUILDS
+        self.afk_users = dict([(r['user_id'], self.afk_record(r['start_time'], r['reason']))
+                               for r in values if r['start_time']])
+        self.auto_un_afk = dict([(r['user_id'], r['auto_un_afk']) for r in values if r['auto_un_afk'] is not None])
 
-        # MUSIC STUFF
-        values = await self.db.fetch("SELECT guild_id, dj_only FROM music")
+    async def _cache_music(self):
+        values = await self.db.fetch("SELECT guild_id, dj_only, dj_role_id FROM music")
 
         for value in values:
             self.dj_modes[value['guild_id']] = (value['dj_only'] or False)
-
-        values = await self.db.fetch("SELECT guild_id, dj_role_id FROM music")
-
-        for value in values:
             self.dj_roles[value['guild_id']] = (value['dj_role_id'] or False)
 
-        print("[CACHE] music stuff has been loaded")
-        # MUSIC STUFF
+    async def _cache_logging(self):
+        # make sure every logging guild has a logging_events row in one statement instead of one per guild
+        await self.db.execute("INSERT INTO logging_events(guild_id) SELECT guild_id FROM log_channels "
+                              "ON CONFLICT (guild_id) DO NOTHING")
 
-        # LOGGING STUFF
-        for entry in await self.db.fetch('SELECT * FROM log_channels'):
-            guild_id = entry['guild_id']
-            await self.db.execute('INSERT INTO logging_events(guild_id) VALUES ($1) ON CONFLICT (guild_id) DO NOTHING',
-                                  entry['guild_id'])
+        values = await self.db.fetch(
+            'SELECT c.guild_id, c.default_channel, c.message_channel, c.join_leave_channel, c.member_channel, '
+            'c.voice_channel, c.server_channel, '
+            + ', '.join(f'e.{flag}' for flag in LoggingEventsFlags.VALID_FLAGS) +
+            ' FROM log_channels c JOIN logging_events e ON e.guild_id = c.guild_id')
 
+        for entry in values:
+            guild_id = entry['guild_id']
             self.log_channels[guild_id] = self.log_webhooks(default=entry['default_channel'],
                                                             message=entry['message_channel'],
                                                             join_leave=entry['join_leave_channel'],
@@ -344,18 +428,61 @@ class StealthBot(commands.AutoShardedBot):
                                                             voice=entry['voice_channel'],
                                                             server=entry['server_channel'])
 
-            flags = dict(await self.db.fetchrow(
-                'SELECT message_delete, message_purge, message_edit, member_join, member_leave, member_update, user_ban, user_unban, '
-                'user_update, invite_create, invite_delete, voice_join, voice_leave, voice_move, voice_mod, emoji_create, emoji_delete, '
-                'emoji_update, sticker_create, sticker_delete, sticker_update, server_update, stage_open, stage_close, channel_create, '
-                'channel_delete, channel_edit, role_create, role_delete, role_edit FROM logging_events WHERE guild_id = $1',
-                guild_id))
-            self.guild_loggings[guild_id] = LoggingEventsFlags(**flags)
+            self.guild_loggings[guild_id] = LoggingEventsFlags(
+                **{flag: entry[flag] for flag in LoggingEventsFlags.VALID_FLAGS})
 
-        print("[CACHE] logging guilds have been loaded")
-        # LOGGING STUFF
+        self.log_routes.rebuild_all()
 
+    async def populate_cache(self):
+        print("[CACHE] populating cache...")
+        start = time.perf_counter()
+
+        # every stage uses its own pool connection, so they can all run at the same time
+        timings = await asyncio.gather(
+            self._timed_stage("blacklist", self._cache_blacklist()),
+            self._timed_stage("guild settings", self._cache_guilds()),
+            self._timed_stage("afk users", self._cache_afk()),
+            self._timed_stage("music stuff", self._cache_music()),
+            self._timed_stage("logging guilds", self._cache_logging()),
+            self._timed_stage("xp journal replay", self.xp.replay()),
+        )
 
+        for name, ms in timings:
+            print(f"[CACHE] {name} loaded in {ms:.2f}ms")
+
+        if self.log_spool:
+            # needs the logging guilds, so it can't run alongside the other stages
+            name, ms = await self._timed_stage("log spool replay", self.log_spool.replay(self))
+            print(f"[CACHE] {name} took {ms:.2f}ms ({sum(len(q) for c in self.log_cache.values() for q in c.values())} "
+                  f"log events requeued)")
+
+        try:
+            await self.guild_settings.listen()
+        except Exception as e:
+            print(f"[CACHE] couldn't LISTEN for guild settings changes, other processes' edits won't show up here ({e})")
+
+        print(f"[CACHE] cache populated in {(time.perf_counter() - start) * 1000:.2f}ms "
+              f"({len(self.log_channels)} logging guilds)")
+
+
+
+    async def close(self):
+        # the levelling cog batches XP writes, don't lose the last few seconds of them
+        try:
+            await self.xp.flush()
+
+        except Exception:
+            print("[XP] couldn't flush pending XP, it will be replayed from the journal on the next start")
+
+        finally:
+            self.xp.close()
+
+        if self.log_spool:
+            await self.log_spool.close()
+
+        await self.guild_settings.close()
+        self.timers.close()
+        await super().close()
 
     async def on_ready(self):
         print(f"-------------================----------------")
@@ -399,6 +526,10 @@ This restart took {delay} seconds.
         # wait until bot is ready
         await self.wait_until_ready()
 
+        # hand the message to the cogs' message handlers that can actually act on it
+        self.router.dispatch(message)
+        self.message_snapshots.add(message)
+
         # send a message if bot is pinged
         if self.user:
             # check if bot.mention is in message.content
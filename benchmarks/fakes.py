@@ -0,0 +1,258 @@
+"""
+Local stand-ins used by the benchmarks so StealthBot can boot without Discord, Postgres or any API keys.
+"""
+
+import os
+import re
+import sys
+import yaml
+import random
+import asyncio
+import datetime
+import tempfile
+import importlib.util
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CONFIG_KEYS = ('TOKEN', 'IPC_SECRET', 'PRSAW_KEY', 'DAGPI_TOKEN', 'DBL_TOKEN', 'WEATHER_TOKEN', 'UPTIME_WEBHOOK',
+               'ASYNC_PRAW_CLIENT_ID', 'ASYNC_PRAW_CLIENT_SECRET', 'ASYNC_PRAW_USER_AGENT', 'ASYNC_PRAW_USERNAME',
+               'ASYNC_PRAW_PASSWORD', 'NODE2_HOST', 'NODE2_PORT', 'NODE2_PASSWORD', 'NODE2_IDENTIFIER',
+               'SPOTIFY_CLIENT_ID', 'SPOTIFY_CLIENT_SECRET', 'OR_TOKEN', 'OR_TEST_TOKEN')
+
+LOGGING_EVENTS = ('message_delete', 'message_purge', 'message_edit', 'member_join', 'member_leave', 'member_update',
+                  'user_ban', 'user_unban', 'user_update', 'invite_create', 'invite_delete', 'voice_join',
+                  'voice_leave', 'voice_move', 'voice_mod', 'emoji_create', 'emoji_delete', 'emoji_update',
+                  'sticker_create', 'sticker_delete', 'sticker_update', 'server_update', 'stage_open', 'stage_close',
+                  'channel_create', 'channel_delete', 'channel_edit', 'role_create', 'role_delete', 'role_edit')
+
+BOT_ID = 760179628122964008
+AUTHOR_ID = 100000000000000001
+
+
+class Stub:
+    """Accepts any call, attribute access or await, used in place of the third-party API clients."""
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def __getattr__(self, item):
+        return Stub()
+
+    def __call__(self, *args, **kwargs):
+        return Stub()
+
+    def __getitem__(self, item):
+        return Stub()
+
+    def __await__(self):
+        return asyncio.sleep(0, result=self).__await__()
+
+
+class FakePool:
+    """A tiny stand-in for an asyncpg pool.
+
+    Answers queries from in-memory tables and sleeps ``latency`` seconds per round trip, limited to ``size``
+    concurrent queries like a real pool's connections."""
+
+    def __init__(self, tables: dict, *, latency: float = 0.0005, size: int = 10):
+        self.tables = tables
+        self.latency = latency
+        self.queries = 0
+        self._connections = asyncio.Semaphore(size)
+
+    async def _round_trip(self):
+        self.queries += 1
+        async with self._connections:
+            await asyncio.sleep(self.latency)
+
+    def _rows(self, query: str, args: tuple):
+        match = re.search(r'FROM (\w+)', query)
+        rows = self.tables.get(match.group(1), []) if match else []
+
+        if 'JOIN logging_events' in query:
+            events = {row['guild_id']: row for row in self.tables.get('logging_events', [])}
+            rows = [{**row, **events[row['guild_id']]} for row in rows if row['guild_id'] in events]
+
+        where = re.search(r'WHERE (\w+) = \$1', query)
+        if where and args:
+            rows = [row for row in rows if row.get(where.group(1)) == args[0]]
+
+        any_ = re.search(r'WHERE (\w+) = ANY\(\$1(?:::\w+\[\])?\)', query)
+        if any_ and args:
+            wanted = set(args[0])
+            rows = [row for row in rows if row.get(any_.group(1)) in wanted]
+
+        return rows
+
+    async def fetch(self, query: str, *args):
+        await self._round_trip()
+        return self._rows(query, args)
+
+    async def fetchrow(self, query: str, *args):
+        await self._round_trip()
+        rows = self._rows(query, args)
+        return rows[0] if rows else None
+
+    async def fetchval(self, query: str, *args):
+        await self._round_trip()
+        rows = self._rows(query, args)
+        column = re.match(r'\s*SELECT (\w+)', query)
+        if not rows or not column:
+            return None
+        return rows[0].get(column.group(1))
+
+    async def execute(self, query: str, *args):
+        await self._round_trip()
+        return "OK"
+
+    async def executemany(self, query: str, args):
+        await self._round_trip()
+
+    def acquire(self):
+        return self
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        pass
+
+    async def close(self):
+        pass
+
+
+def make_guild_ids(guilds: int) -> list:
+    # spaced out so each guild's channel ids (guild_id + n) never collide with another guild
+    return [800000000000000000 + i * 100 for i in range(guilds)]
+
+
+def seed_tables(guilds: int, *, logging_ratio: float = 0.25, afk_users: int = None) -> dict:
+    guild_ids = make_guild_ids(guilds)
+    logging_ids = guild_ids[:int(guilds * logging_ratio)]
+    afk_users = guilds // 10 if afk_users is None else afk_users
+    now = datetime.datetime.now(datetime.timezone.utc)
+
+    return {
+        'guilds': [{'guild_id': g, 'prefix': ['sb!', '!'] if i % 10 == 0 else None, 'disable_commands': i % 50 == 0,
+                    'welcome_channel_id': None, 'welcome_message': None, 'muted_role_id': None,
+                    'verify_role_id': None} for i, g in enumerate(guild_ids)],
+        'log_channels': [{'guild_id': g, **{f'{t}_channel': f'https://discord.com/api/webhooks/{g}/{t}'
+                                           for t in ('default', 'message', 'member', 'join_leave', 'voice', 'server')},
+                          **{f'{t}_chid': g for t in ('default', 'message', 'member', 'join_leave', 'voice', 'server')}}
+                         for g in logging_ids],
+        'logging_events': [{'guild_id': g, **{event: True for event in LOGGING_EVENTS}} for g in logging_ids],
+        'afk': [{'user_id': AUTHOR_ID + 1 + i, 'start_time': now, 'reason': 'benchmarking', 'auto_un_afk': True}
+                for i in range(afk_users)],
+        'music': [{'guild_id': g, 'dj_only': False, 'dj_role_id': None} for g in guild_ids[::5]],
+        'blacklist': [{'user_id': 1000 + i, 'is_blacklisted': True, 'reason': 'benchmarking'} for i in range(100)],
+        'users': [],
+        'temporary_mutes': [],
+    }
+
+
+def write_config() -> str:
+    """Writes a throwaway config.yaml and points the bot at it."""
+    data = {key: 'benchmark' for key in CONFIG_KEYS}
+    data['NODE2_PORT'] = 2333
+
+    fd, path = tempfile.mkstemp(suffix='.yaml')
+    with os.fdopen(fd, 'w') as file:
+        yaml.safe_dump(data, file)
+
+    os.environ['STEALTHBOT_CONFIG'] = path
+    return path
+
+
+def load_main_module():
+    """Imports __main__.py under another name, with every outside service swapped for a stand-in."""
+    if ROOT not in sys.path:
+        sys.path.insert(0, ROOT)
+    os.chdir(ROOT)
+    write_config()
+
+    spec = importlib.util.spec_from_file_location('stealthbot', os.path.join(ROOT, '__main__.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+
+    for name in ('topgg', 'prsaw', 'pomice', 'ipc', 'asyncpraw', 'aiohttp', 'mystbin'):
+        setattr(module, name, Stub())
+    module.Client = Stub
+    return module
+
+
+def user_payload(user_id: int, *, bot: bool = False) -> dict:
+    return {'id': str(user_id), 'username': f'user{user_id % 10000}', 'discriminator': '0001', 'avatar': None,
+            'bot': bot}
+
+
+def member_payload(user_id: int, *, bot: bool = False) -> dict:
+    return {'user': user_payload(user_id, bot=bot), 'roles': [], 'joined_at': '2021-01-01T00:00:00+00:00',
+            'deaf': False, 'mute': False}
+
+
+def guild_payload(guild_id: int, *, members: tuple = (), channels: int = 1, category_id: int = None,
+                  channel_ids: tuple = None) -> dict:
+    channel_ids = channel_ids or [guild_id + 1 + i for i in range(channels)]
+    channel_payloads = [{'id': str(channel_id), 'name': f'channel-{i}', 'type': 0, 'position': i,
+                         'guild_id': str(guild_id), 'permission_overwrites': [], 'topic': str(AUTHOR_ID),
+                         'parent_id': str(category_id) if category_id else None}
+                        for i, channel_id in enumerate(channel_ids)]
+    if category_id:
+        channel_payloads.append({'id': str(category_id), 'name': 'category', 'type': 4, 'position': channels,
+                                 'guild_id': str(guild_id), 'permission_overwrites': []})
+
+    return {
+        'id': str(guild_id), 'name': f'guild-{guild_id % 100000}', 'owner_id': str(AUTHOR_ID), 'features': [],
+        'member_count': len(members) + 1, 'emojis': [], 'stickers': [], 'channels': channel_payloads,
+        'roles': [{'id': str(guild_id), 'name': '@everyone', 'permissions': '8', 'position': 0, 'color': 0,
+                   'hoist': False, 'managed': False, 'mentionable': False}],
+        'members': [member_payload(BOT_ID, bot=True)] + [member_payload(m) for m in members],
+    }
+
+
+def message_payload(channel_id: int, guild_id: int = None, *, author_id: int = AUTHOR_ID, content: str = 'sb!prefixes',
+                    mentions: tuple = (), bot: bool = False) -> dict:
+    data = {
+        'id': str(random.getrandbits(62)), 'channel_id': str(channel_id), 'author': user_payload(author_id, bot=bot),
+        'content': content, 'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        'edited_timestamp': None, 'tts': False, 'mention_everyone': False, 'mention_roles': [], 'attachments': [],
+        'embeds': [], 'pinned': False, 'type': 0,
+        'mentions': [{**user_payload(m), 'member': {'roles': [], 'joined_at': '2021-01-01T00:00:00+00:00',
+                                                    'deaf': False, 'mute': False}} for m in mentions],
+    }
+
+    if guild_id:
+        data['guild_id'] = str(guild_id)
+        data['member'] = {'roles': [], 'joined_at': '2021-01-01T00:00:00+00:00', 'deaf': False, 'mute': False}
+
+    return data
+
+
+def stub_http(bot, *, latency: float = 0.0005) -> None:
+    """Replaces the REST calls the boot path makes with local fakes, and logs the bot in as a fake user."""
+    import discord
+
+    async def invites_from(guild_id, *args, **kwargs):
+        await asyncio.sleep(latency)
+        return []
+
+    async def send_message(channel_id, *args, **kwargs):
+        await asyncio.sleep(latency)
+        return message_payload(int(channel_id), author_id=BOT_ID, content=kwargs.get('content') or '', bot=True)
+
+    async def noop(*args, **kwargs):
+        await asyncio.sleep(latency)
+        return {}
+
+    bot.http.invites_from = invites_from
+    bot.http.send_message = send_message
+    bot.http.add_reaction = noop
+    bot.http.delete_message = noop
+    bot.http.send_typing = noop
+    bot.http.token = 'benchmark'
+    bot._connection.user = discord.ClientUser(state=bot._connection, data=user_payload(BOT_ID, bot=True))
+
+
+def add_guilds(bot, guild_ids, **kwargs) -> list:
+    state = bot._connection
+    return [state._add_guild_from_data(guild_payload(guild_id, **kwargs)) for guild_id in guild_ids]
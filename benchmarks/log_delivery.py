@@ -0,0 +1,376 @@
+"""
+Offline benchmark for the logging pipeline (cogs/logger), from listener to webhook.
+
+Boots StealthBot offline (see benchmarks/fakes.py) with every guild logging, and points its webhooks at a local aiohttp
+server that plays Discord's webhook endpoint: it answers after a configurable latency, rate limits a share of the
+requests with a 429 + Retry-After, and 404s the webhooks of a share of the guilds until the bot re-creates them.
+Then it feeds storms of member updates, voice moves and purges straight into the LoggingBackend listeners and waits
+for everything to be delivered. Reports events/sec ingested, delivery latency percentiles (embed creation until the
+fake server gets it), HTTP requests per event and how much memory the queues held at their peak:
+
+    python -m benchmarks.log_delivery
+    python -m benchmarks.log_delivery --guilds 5000 --events 50000 --rate-limit 0.05 --not-found 0.02
+"""
+
+import io
+import sys
+import time
+import random
+import asyncio
+import argparse
+import datetime
+import contextlib
+
+from benchmarks import fakes
+
+DISCORD_API = 'https://discord.com/api'
+DELIVER_TYPES = ('default', 'message', 'member', 'join_leave', 'voice', 'server')
+
+# (kind, weight)
+DEFAULT_MIX = (
+    ('member_update', 50),
+    ('voice_move', 40),
+    ('purge', 10),
+)
+
+
+def webhook_url(guild_id: int, deliver_type: str, generation: int = 0) -> str:
+    # shaped like a real one, WEBHOOK_URL_REGEX wants a snowflake and a 68 character token
+    token = f'{deliver_type}-{generation}-'.ljust(68, 'x')
+    return f'{DISCORD_API}/webhooks/{guild_id + DELIVER_TYPES.index(deliver_type) + 10}/{token}'
+
+
+class FakeWebhookServer:
+    """Impersonates ``POST /api/webhooks/{id}/{token}``.
+
+    Webhooks in ``broken`` 404 until they're replaced (the repaired ones have a different token), and ``rate_limit``
+    of the remaining requests get a 429 with a Retry-After of ``retry_after`` seconds."""
+
+    def __init__(self, *, latency: float, rate_limit: float, retry_after: float, broken: set, seed: int = 0):
+        self.latency = latency
+        self.rate_limit = rate_limit
+        self.retry_after = retry_after
+        self.broken = broken
+        self.random = random.Random(seed)
+        self.statuses = {}
+        self.embeds = 0
+        self.files = 0
+        self.latencies = []
+        self.last_request = time.perf_counter()
+        self.base = None
+        self._runner = None
+
+    async def start(self) -> str:
+        from aiohttp import web
+
+        app = web.Application(client_max_size=64 * 1024 * 1024)
+        app.router.add_post('/api/webhooks/{id}/{token}', self.handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, '127.0.0.1', 0)
+        await site.start()
+
+        port = site._server.sockets[0].getsockname()[1]  # noqa
+        self.base = f'http://127.0.0.1:{port}/api'
+        return self.base
+
+    async def stop(self) -> None:
+        if self._runner:
+            await self._runner.cleanup()
+
+    def _reply(self, status: int, **kwargs):
+        from aiohttp import web
+
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+        return web.json_response(status=status, **kwargs)
+
+    async def handle(self, request):
+        self.last_request = time.perf_counter()
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        if (request.match_info['id'], request.match_info['token']) in self.broken:
+            return self._reply(404, data={'message': 'Unknown Webhook', 'code': 10015})
+
+        if self.random.random() < self.rate_limit:
+            return self._reply(429, data={'message': 'You are being rate limited.', 'retry_after': self.retry_after,
+                                          'global': False},
+                               headers={'Retry-After': str(self.retry_after), 'X-RateLimit-Remaining': '0',
+                                        'X-RateLimit-Reset-After': str(self.retry_after)})
+
+        if request.content_type == 'multipart/form-data':
+            payload = None
+            async for part in await request.multipart():
+                if part.name == 'payload_json':
+                    payload = await part.json()
+                else:
+                    await part.read()
+                    self.files += 1
+        else:
+            payload = await request.json()
+
+        now = datetime.datetime.now(datetime.timezone.utc)
+        for embed in payload['embeds']:
+            self.embeds += 1
+            if embed.get('timestamp'):
+                sent = datetime.datetime.fromisoformat(embed['timestamp'])
+                self.latencies.append((now - sent).total_seconds())
+
+        return self._reply(204, headers={'X-RateLimit-Remaining': '4', 'X-RateLimit-Reset-After': '1'})
+
+
+class LocalSession:
+    """Sends the bot's webhook requests to the fake server instead of discord.com."""
+
+    def __init__(self, session, base: str):
+        self.session = session
+        self.base = base
+
+    def post(self, url: str, **kwargs):
+        return self.session.post(url.replace(DISCORD_API, self.base), **kwargs)
+
+    def __getattr__(self, item):
+        return getattr(self.session, item)
+
+
+def seed_tables(guild_ids: list) -> dict:
+    tables = fakes.seed_tables(len(guild_ids), logging_ratio=0, afk_users=0)
+    tables['log_channels'] = [{'guild_id': g, **{f'{t}_channel': webhook_url(g, t) for t in DELIVER_TYPES},
+                               **{f'{t}_chid': g + 1 for t in DELIVER_TYPES}} for g in guild_ids]
+    tables['logging_events'] = [{'guild_id': g, **{event: True for event in fakes.LOGGING_EVENTS}}
+                                for g in guild_ids]
+    return tables
+
+
+def make_bot_class(module, guilds: int, members: list, latency: float):
+    class BenchmarkBot(module.StealthBot):
+        errors = {}
+
+        async def populate_cache(self):
+            fakes.stub_http(self, latency=latency)
+            fakes.add_guilds(self, fakes.make_guild_ids(guilds), members=tuple(members), channels=2)
+            await super().populate_cache()
+
+        async def on_error(self, event_method, *args, **kwargs):
+            error = sys.exc_info()[0]
+            key = f"{event_method}: {getattr(error, '__name__', error)}"
+            self.errors[key] = self.errors.get(key, 0) + 1
+
+    async def create_db_pool():
+        return fakes.FakePool(seed_tables(fakes.make_guild_ids(guilds)), latency=latency)
+
+    module.create_db_pool = create_db_pool
+    return BenchmarkBot
+
+
+def stub_webhook_repair(bot, latency: float) -> None:
+    """Lets create_and_deliver find the bot's webhook in a channel, with a fresh token so it stops 404ing."""
+    generations = {}
+
+    async def channel_webhooks(channel_id, *args, **kwargs):
+        await asyncio.sleep(latency)
+        channel = bot.get_channel(int(channel_id))
+        generations[channel_id] = generation = generations.get(channel_id, 0) + 1
+        url = webhook_url(channel.guild.id, 'default', generation)
+        webhook_id, token = url.rsplit('/', 2)[-2:]
+        return [{'id': webhook_id, 'type': 1, 'token': token, 'channel_id': str(channel_id),
+                 'guild_id': str(channel.guild.id), 'name': 'Stealth Bot Logging',
+                 'user': fakes.user_payload(fakes.BOT_ID, bot=True)}]
+
+    bot.http.channel_webhooks = channel_webhooks
+
+
+def deep_size(obj, seen: set = None) -> int:
+    seen = set() if seen is None else seen
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_size(k, seen) + deep_size(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)) or type(obj).__name__ == 'deque':
+        size += sum(deep_size(item, seen) for item in obj)
+    elif not isinstance(obj, (str, bytes, int, float, bool, type(None))):
+        if hasattr(obj, '__dict__'):
+            size += deep_size(vars(obj), seen)
+        for slot in getattr(type(obj), '__slots__', ()):
+            if hasattr(obj, slot):
+                size += deep_size(getattr(obj, slot), seen)
+    return size
+
+
+class Storm:
+    def __init__(self, bot, guilds: list, members: list, seed: int = 0):
+        import discord
+
+        self.discord = discord
+        self.bot = bot
+        self.guilds = guilds
+        self.members = members
+        self.random = random.Random(seed)
+
+    def member_update(self, guild):
+        state = self.bot._connection
+        user_id = self.random.choice(self.members)
+        data = fakes.member_payload(user_id)
+        before = self.discord.Member(data=data, guild=guild, state=state)
+        after = self.discord.Member(data={**data, 'nick': f'nick-{self.random.getrandbits(16)}'}, guild=guild,
+                                    state=state)
+        return 'logger_on_member_update', (before, after)
+
+    def voice_move(self, guild):
+        first, second = guild.text_channels[:2]
+        member = guild.get_member(self.random.choice(self.members))
+        data = {'session_id': 'benchmark', 'self_mute': False, 'self_deaf': False, 'mute': False, 'deaf': False,
+                'self_video': False, 'suppress': False}
+        before = self.discord.VoiceState(data=data, channel=first)
+        after = self.discord.VoiceState(data=data, channel=second)
+        return 'logger_on_voice_state_update', (member, before, after)
+
+    def purge(self, guild):
+        channel = guild.text_channels[0]
+        count = self.random.randint(2, 200)
+        messages = [self.discord.Message(state=self.bot._connection, channel=channel,
+                                         data=fakes.message_payload(channel.id, guild.id,
+                                                                    author_id=self.random.choice(self.members),
+                                                                    content='spam ' * self.random.randint(1, 40)))
+                    for _ in range(count)]
+        payload = self.discord.RawBulkMessageDeleteEvent({'ids': [str(m.id) for m in messages],
+                                                          'channel_id': str(channel.id), 'guild_id': str(guild.id)})
+        payload.cached_messages = messages
+        return 'logger_on_raw_bulk_message_delete', (payload,)
+
+    def generate(self, count: int, mix=DEFAULT_MIX) -> list:
+        kinds, weights = zip(*mix)
+        return [getattr(self, kind)(self.random.choice(self.guilds))
+                for kind in self.random.choices(kinds, weights=weights, k=count)]
+
+
+async def drain(bot, cog, server: FakeWebhookServer, timeout: float) -> bool:
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        busy = (cog.pending_member_updates or cog.delivery.workers or cog.repairs
+                or any(queue for queues in bot.log_cache.values() for queue in queues.values()))
+        # the fake server going quiet for a bit covers requests still sleeping out a Retry-After
+        if not busy and time.perf_counter() - server.last_request > 1:
+            return True
+        await asyncio.sleep(0.05)
+    return False
+
+
+async def run(bot, storm: Storm, server: FakeWebhookServer, events: int, timeout: float) -> dict:
+    import aiohttp
+
+    cog = bot.get_cog('LoggingBackend')
+    base = await server.start()
+    bot.session = LocalSession(aiohttp.ClientSession(), base)
+    bot._ready.set()
+
+    batch = storm.generate(events)
+    start = time.perf_counter()
+    for listener, args in batch:
+        await getattr(cog, listener)(*args)
+    ingest = time.perf_counter() - start
+
+    # everything is queued (or waiting out the member update window) now, before the first delivery tick
+    queued = sum(len(queue) for queues in bot.log_cache.values() for queue in queues.values())
+    memory = deep_size(bot.log_cache) + deep_size(cog.pending_member_updates)
+
+    finished = await drain(bot, cog, server, timeout)
+    elapsed = time.perf_counter() - start
+
+    await bot.session.session.close()
+    await server.stop()
+
+    latencies = sorted(server.latencies) or [0.0]
+
+    def percentile(p):
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p))]
+
+    requests = sum(server.statuses.values())
+    dropped = sum(queue.dropped for queues in bot.log_cache.values() for queue in queues.values())
+    return {
+        'events': events,
+        'finished': finished,
+        'ingest_per_second': events / ingest,
+        'elapsed': elapsed,
+        'queued': queued,
+        'memory': memory,
+        'embeds': server.embeds,
+        'files': server.files,
+        'requests': requests,
+        'statuses': server.statuses,
+        'dropped': dropped,
+        'folded': cog.member_updates_folded,
+        'repairs': cog.repair_stats,
+        'p50': percentile(0.50),
+        'p95': percentile(0.95),
+        'p99': percentile(0.99),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--guilds', type=int, default=2000, help='logging guilds to spread the events over')
+    parser.add_argument('--events', type=int, default=20000, help='synthetic events to feed the listeners')
+    parser.add_argument('--members', type=int, default=50, help='members per guild')
+    parser.add_argument('--webhook-latency', type=float, default=0.05, help='seconds the fake server takes to answer')
+    parser.add_argument('--rate-limit', type=float, default=0.02, help='share of requests answered with a 429')
+    parser.add_argument('--retry-after', type=float, default=0.5, help='Retry-After sent with the 429s')
+    parser.add_argument('--not-found', type=float, default=0.01, help="share of guilds whose webhooks 404")
+    parser.add_argument('--latency', type=float, default=0.0002, help='simulated seconds per DB/REST round trip')
+    parser.add_argument('--member-window', type=float, default=None,
+                        help='override the member update coalescing window, in seconds')
+    parser.add_argument('--timeout', type=float, default=120, help='give up waiting for delivery after this long')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--verbose', action='store_true', help="show the bot's own startup output")
+    args = parser.parse_args()
+
+    members = [fakes.AUTHOR_ID + 1 + i for i in range(args.members)]
+    guild_ids = fakes.make_guild_ids(args.guilds)
+    rng = random.Random(args.seed)
+    broken = {(url.rsplit('/', 2)[-2], url.rsplit('/', 1)[-1])
+              for g in rng.sample(guild_ids, int(len(guild_ids) * args.not_found))
+              for url in (webhook_url(g, t) for t in DELIVER_TYPES)}
+
+    module = fakes.load_main_module()
+    cls = make_bot_class(module, args.guilds, members, args.latency)
+
+    output = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+    with output:
+        bot = cls()
+        module.bot = bot
+    stub_webhook_repair(bot, args.latency)
+
+    if args.member_window is not None:
+        from cogs.logger import memer_logs
+        memer_logs.MEMBER_UPDATE_WINDOW = args.member_window
+
+    server = FakeWebhookServer(latency=args.webhook_latency, rate_limit=args.rate_limit,
+                               retry_after=args.retry_after, broken=broken, seed=args.seed)
+    storm = Storm(bot, [g for g in bot.guilds if g.id in bot.log_routes], members, seed=args.seed)
+    result = bot.loop.run_until_complete(run(bot, storm, server, args.events, args.timeout))
+
+    statuses = ', '.join(f"{status}: {count}" for status, count in sorted(result['statuses'].items()))
+    repairs = result['repairs']
+    print(f"events:            {result['events']}{'' if result['finished'] else ' (timed out before delivery finished)'}")
+    print(f"ingest:            {result['ingest_per_second']:.1f} events/sec")
+    print(f"delivered in:      {result['elapsed']:.2f}s")
+    print(f"latency p50:       {result['p50'] * 1000:.1f}ms")
+    print(f"latency p95:       {result['p95'] * 1000:.1f}ms")
+    print(f"latency p99:       {result['p99'] * 1000:.1f}ms")
+    print(f"embeds delivered:  {result['embeds']} ({result['files']} files, {result['folded']} member updates folded)")
+    print(f"http requests:     {result['requests']} ({result['requests'] / result['events']:.3f}/event; {statuses})")
+    print(f"webhook repairs:   {repairs['attempts']} attempts, {repairs['joined']} joined")
+    print(f"queue peak:        {result['queued']} embeds, {result['memory'] / 1024:.1f} KiB")
+    print(f"dropped by cap:    {result['dropped']}")
+
+    if bot.errors:
+        print("handler errors (offline stand-ins don't cover everything):")
+        for key, count in sorted(bot.errors.items(), key=lambda i: i[1], reverse=True):
+            print(f"  {count:>6}  {key}")
+
+
+if __name__ == '__main__':
+    main()
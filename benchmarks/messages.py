@@ -0,0 +1,234 @@
+"""
+Synthetic message-throughput benchmark for the on_message hot path.
+
+Boots StealthBot offline (see benchmarks/fakes.py), then feeds a mixed stream of synthetic messages through every
+loaded on_message listener and process_commands, one message at a time. Reports messages/sec, p50/p99 handling
+latency (dispatch until every task the message spawned has finished) and memory allocated per message:
+
+    python -m benchmarks.messages
+    python -m benchmarks.messages --messages 20000 --latency 0.0002
+"""
+
+import io
+import sys
+import time
+import random
+import asyncio
+import datetime
+import argparse
+import statistics
+import contextlib
+import tracemalloc
+
+from benchmarks import fakes
+
+MODMAIL_GUILD = 879050715660697622
+MODMAIL_CATEGORY = 919172324610170930
+CHATBOT_GUILD = 913851034416324000
+
+# (kind, weight)
+DEFAULT_MIX = (
+    ('plain', 45),
+    ('bot', 5),
+    ('mentions', 10),
+    ('afk_author', 5),
+    ('afk_mention', 5),
+    ('chatbot', 5),
+    ('modmail_reply', 5),
+    ('dm', 5),
+    ('command', 15),
+)
+
+
+class Stream:
+    def __init__(self, bot, guilds: list, authors: list, afk_users: list, seed: int = 0):
+        import discord
+
+        self.discord = discord
+        self.bot = bot
+        self.guilds = guilds
+        self.authors = authors
+        self.afk_users = afk_users
+        self.random = random.Random(seed)
+
+    def _message(self, channel, data):
+        return self.discord.Message(state=self.bot._connection, channel=channel, data=data)
+
+    def build(self, kind: str):
+        rng = self.random
+        guild = rng.choice(self.guilds)
+        channel = guild.text_channels[0]
+        author = rng.choice(self.authors)
+
+        if kind == 'plain':
+            return self._message(channel, fakes.message_payload(channel.id, guild.id, author_id=author,
+                                                                content='hello ' * rng.randint(1, 20)))
+        if kind == 'bot':
+            return self._message(channel, fakes.message_payload(channel.id, guild.id, author_id=fakes.BOT_ID,
+                                                                content='beep', bot=True))
+        if kind == 'mentions':
+            mentions = tuple(rng.sample(self.authors, rng.randint(1, 5)))
+            return self._message(channel, fakes.message_payload(channel.id, guild.id, author_id=author,
+                                                                content=' '.join(f'<@{m}>' for m in mentions),
+                                                                mentions=mentions))
+        if kind == 'afk_author':
+            return self._message(channel, fakes.message_payload(channel.id, guild.id,
+                                                                author_id=rng.choice(self.afk_users), content='back'))
+        if kind == 'afk_mention':
+            afk = rng.choice(self.afk_users)
+            return self._message(channel, fakes.message_payload(channel.id, guild.id, author_id=author,
+                                                                content=f'<@{afk}>', mentions=(afk,)))
+        if kind == 'chatbot':
+            channel = self.bot.get_channel(rng.choice(self.bot.chatbot_channels))
+            return self._message(channel, fakes.message_payload(channel.id, channel.guild.id, author_id=author,
+                                                                content='how are you'))
+        if kind == 'modmail_reply':
+            channel = self.bot.get_guild(MODMAIL_GUILD).text_channels[0]
+            return self._message(channel, fakes.message_payload(channel.id, MODMAIL_GUILD, author_id=author,
+                                                                content='thanks for reaching out'))
+        if kind == 'dm':
+            channel = self.discord.DMChannel(me=self.bot.user, state=self.bot._connection,
+                                             data={'id': str(author + 7), 'type': 1,
+                                                   'recipients': [fakes.user_payload(author)]})
+            return self._message(channel, fakes.message_payload(channel.id, author_id=author, content='help pls'))
+
+        return self._message(channel, fakes.message_payload(channel.id, guild.id, author_id=author,
+                                                            content=rng.choice(('sb!prefixes', 'sb!website',
+                                                                                'sb!vote', 'sb!support'))))
+
+    def generate(self, count: int, mix=DEFAULT_MIX) -> list:
+        kinds, weights = zip(*mix)
+        return [self.build(kind) for kind in self.random.choices(kinds, weights=weights, k=count)]
+
+
+def make_bot_class(module, latency: float, guilds: int, authors: list, afk_users: list):
+    class BenchmarkBot(module.StealthBot):
+        tracked = None
+        errors = {}
+
+        async def populate_cache(self):
+            fakes.stub_http(self, latency=latency)
+            fakes.add_guilds(self, fakes.make_guild_ids(guilds), members=tuple(authors))
+            fakes.add_guilds(self, [CHATBOT_GUILD], members=tuple(authors), channel_ids=tuple(self.chatbot_channels))
+            fakes.add_guilds(self, [MODMAIL_GUILD], members=tuple(authors), category_id=MODMAIL_CATEGORY)
+            await super().populate_cache()
+
+        def _schedule_event(self, coro, event_name, *args, **kwargs):
+            task = super()._schedule_event(coro, event_name, *args, **kwargs)
+            if self.tracked is not None:
+                self.tracked.append(task)
+            return task
+
+        async def on_error(self, event_method, *args, **kwargs):
+            # count them instead of posting tracebacks to a channel that doesn't exist here
+            error = sys.exc_info()[0]
+            key = f"{event_method}: {getattr(error, '__name__', error)}"
+            self.errors[key] = self.errors.get(key, 0) + 1
+
+    async def create_db_pool():
+        tables = fakes.seed_tables(guilds, afk_users=0)
+        now = datetime.datetime.now(datetime.timezone.utc)
+        tables['afk'] = [{'user_id': u, 'start_time': now, 'reason': 'benchmarking', 'auto_un_afk': True}
+                         for u in afk_users]
+        tables['users'] = [{'user_id': a, 'guild_id': g, 'level': 1, 'xp': 0}
+                           for g in fakes.make_guild_ids(guilds) for a in authors]
+        return fakes.FakePool(tables, latency=latency)
+
+    module.create_db_pool = create_db_pool
+    return BenchmarkBot
+
+
+async def handle(bot, message) -> float:
+    bot.tracked = []
+    start = time.perf_counter()
+    bot.dispatch('message', message)
+
+    # handlers can schedule more handlers (the router does), so keep draining until nothing new shows up
+    done = 0
+    while done < len(bot.tracked):
+        pending = bot.tracked[done:]
+        done = len(bot.tracked)
+        await asyncio.gather(*pending, return_exceptions=True)
+
+    bot.tracked = None
+    return time.perf_counter() - start
+
+
+async def run(bot, stream: Stream, count: int, warmup: int) -> dict:
+    bot._ready.set()
+
+    for message in stream.generate(warmup):
+        await handle(bot, message)
+
+    messages = stream.generate(count)
+    blocks = sys.getallocatedblocks()
+    start = time.perf_counter()
+    latencies = [await handle(bot, message) for message in messages]
+    elapsed = time.perf_counter() - start
+    retained = (sys.getallocatedblocks() - blocks) / count
+
+    # a separate, smaller pass since tracing slows everything down a lot
+    sample = stream.generate(min(count, 500))
+    tracemalloc.start()
+    peaks = []
+    for message in sample:
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        await handle(bot, message)
+        peaks.append(tracemalloc.get_traced_memory()[1] - before)
+    tracemalloc.stop()
+
+    latencies.sort()
+    return {
+        'messages': count,
+        'per_second': count / elapsed,
+        'p50': statistics.median(latencies),
+        'p99': latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))],
+        'retained_blocks': retained,
+        'allocated': statistics.mean(peaks),
+        'queries': bot.db.queries,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--messages', type=int, default=5000, help='messages to time')
+    parser.add_argument('--warmup', type=int, default=500, help='untimed messages sent first')
+    parser.add_argument('--guilds', type=int, default=50, help='guilds to spread messages over')
+    parser.add_argument('--authors', type=int, default=200, help='distinct message authors')
+    parser.add_argument('--latency', type=float, default=0.0002, help='simulated seconds per DB/REST round trip')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--verbose', action='store_true', help="show the bot's own startup output")
+    args = parser.parse_args()
+
+    authors = [fakes.AUTHOR_ID + 1 + i for i in range(args.authors)]
+    afk_users = authors[:max(1, args.authors // 10)]
+
+    module = fakes.load_main_module()
+    cls = make_bot_class(module, args.latency, args.guilds, authors, afk_users)
+
+    output = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+    with output:
+        bot = cls()
+        module.bot = bot
+
+    stream = Stream(bot, [g for g in bot.guilds if g.id not in (MODMAIL_GUILD, CHATBOT_GUILD)], authors, afk_users,
+                    seed=args.seed)
+    result = bot.loop.run_until_complete(run(bot, stream, args.messages, args.warmup))
+
+    print(f"messages:        {result['messages']}")
+    print(f"throughput:      {result['per_second']:.1f} messages/sec")
+    print(f"latency p50:     {result['p50'] * 1000:.3f}ms")
+    print(f"latency p99:     {result['p99'] * 1000:.3f}ms")
+    print(f"allocated/msg:   {result['allocated'] / 1024:.1f} KiB (peak, sampled)")
+    print(f"retained/msg:    {result['retained_blocks']:.1f} blocks")
+    print(f"db queries:      {result['queries']}")
+
+    if bot.errors:
+        print("handler errors (offline stand-ins don't cover everything):")
+        for key, count in sorted(bot.errors.items(), key=lambda i: i[1], reverse=True):
+            print(f"  {count:>6}  {key}")
+
+
+if __name__ == '__main__':
+    main()
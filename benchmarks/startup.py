@@ -0,0 +1,116 @@
+"""
+Offline startup benchmark for StealthBot.
+
+Boots the bot against a fake asyncpg pool seeded with N guilds, a stubbed gateway/REST client and stubbed
+aiohttp/topgg/asyncpraw clients, then reports how long each startup stage took:
+
+    python -m benchmarks.startup
+    python -m benchmarks.startup --guilds 10 1000 50000 --latency 0.001
+"""
+
+import io
+import time
+import asyncio
+import argparse
+import contextlib
+
+from benchmarks import fakes
+
+DEFAULT_SWEEP = (10, 100, 1000, 10000, 100000)
+
+
+def make_bot_class(module, timings: dict, guilds: int, latency: float, logging_ratio: float):
+    class BenchmarkBot(module.StealthBot):
+        async def load_cogs(self):
+            start = time.perf_counter()
+            await super().load_cogs()
+            timings['load_cogs'] = time.perf_counter() - start
+
+        async def populate_cache(self):
+            # the gateway would have sent the guilds by now, so fake that before timing the cache warm-up
+            fakes.stub_http(self, latency=latency)
+            fakes.add_guilds(self, fakes.make_guild_ids(guilds), members=(fakes.AUTHOR_ID,))
+
+            start = time.perf_counter()
+            await super().populate_cache()
+            timings['populate_cache'] = time.perf_counter() - start
+
+    async def create_db_pool():
+        return fakes.FakePool(fakes.seed_tables(guilds, logging_ratio=logging_ratio), latency=latency)
+
+    module.create_db_pool = create_db_pool
+    return BenchmarkBot
+
+
+def boot(module, guilds: int, *, latency: float, logging_ratio: float, verbose: bool = False) -> dict:
+    timings = {}
+    cls = make_bot_class(module, timings, guilds, latency, logging_ratio)
+    output = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+
+    with output:
+        start = time.perf_counter()
+        bot = cls()
+        module.bot = bot
+        bot.loop.run_until_complete(after_ready(bot, start, timings))
+        shutdown(bot)
+
+    timings['queries'] = bot.db.queries
+    return timings
+
+
+async def after_ready(bot, start: float, timings: dict) -> None:
+    import discord
+
+    async def invite_warmup(welcome, warmup_start):
+        await welcome.wait_for_invites()
+        timings['invite_warmup'] = time.perf_counter() - warmup_start
+
+    # setting _ready is what starts WelcomeCog's invite warmup, so it's timed from here and runs next to the command
+    welcome = bot.get_cog('WelcomeCog')
+    warmup = asyncio.ensure_future(invite_warmup(welcome, time.perf_counter())) if welcome else None
+    bot._ready.set()
+    guild = bot.guilds[0]
+    channel = guild.text_channels[0]
+
+    command_start = time.perf_counter()
+    message = discord.Message(state=bot._connection, channel=channel,
+                              data=fakes.message_payload(channel.id, guild.id, content='sb!prefixes'))
+    await bot.process_commands(message)
+    timings['first_command'] = time.perf_counter() - command_start
+    timings['time_to_first_command'] = time.perf_counter() - start
+
+    if warmup:
+        await warmup
+    else:
+        timings['invite_warmup'] = 0.0
+
+
+def shutdown(bot) -> None:
+    for ext in list(bot.extensions):
+        with contextlib.suppress(Exception):
+            bot.unload_extension(ext)
+
+    for task in asyncio.all_tasks(bot.loop):
+        task.cancel()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--guilds', type=int, nargs='+', default=DEFAULT_SWEEP, help='guild counts to sweep')
+    parser.add_argument('--latency', type=float, default=0.0005, help='simulated seconds per DB/REST round trip')
+    parser.add_argument('--logging-ratio', type=float, default=0.25, help='share of guilds with logging enabled')
+    parser.add_argument('--verbose', action='store_true', help="show the bot's own startup output")
+    args = parser.parse_args()
+
+    module = fakes.load_main_module()
+
+    print(f"{'guilds':>8} {'load_cogs':>11} {'populate':>11} {'invites':>11} {'1st cmd':>11} {'ttfc':>11} {'queries':>8}")
+    for guilds in args.guilds:
+        t = boot(module, guilds, latency=args.latency, logging_ratio=args.logging_ratio, verbose=args.verbose)
+        print(f"{guilds:>8} {t['load_cogs'] * 1000:>9.1f}ms {t['populate_cache'] * 1000:>9.1f}ms "
+              f"{t['invite_warmup'] * 1000:>9.1f}ms {t['first_command'] * 1000:>9.1f}ms "
+              f"{t['time_to_first_command'] * 1000:>9.1f}ms {t['queries']:>8}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,12 +1,14 @@
+from .afk import Afk
 from .bot import Bot
 from .chatbot import Chatbot
 from .error_handler import ErrorHandler
 from .join_leave import JoinLeave
+from .modmail import ModMail
 from .private import Private
 from .topgg import Topgg
 
 
-class Handler(Bot, Chatbot, ErrorHandler, JoinLeave, Private, Topgg):
+class Handler(Afk, Bot, Chatbot, ErrorHandler, JoinLeave, ModMail, Private, Topgg):
     pass
 
 
@@ -10,6 +10,8 @@ class EventsBase(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
         self.moderation_guilds = [799330949686231050, 879050715660697622, 925067864241754132]
+        # the ghost ping detector needs deleted messages from these even when they don't log
+        bot.message_snapshots.guilds.update(self.moderation_guilds)
 
     @staticmethod
     def time(days: int, hours: int, minutes: int, seconds: int):
@@ -3,18 +3,13 @@ import discord
 
 from helpers import helpers
 from ._base import EventsBase
-from discord.ext import commands
+from helpers.router import message_handler
 
 class Afk(EventsBase):
     
-    @commands.Cog.listener('on_message')
+    @message_handler(guild_only=True, ignore_bots=True,
+                     check=lambda cog, message: message.author.id in cog.bot.afk_users)
     async def on_afk_user_message(self, message: discord.Message):
-        if message.author.bot:
-            return
-
-        if not message.guild:
-            return
-
         if message.author.id in self.bot.afk_users:
             try:
                 if self.bot.auto_un_afk[message.author.id] is False:
@@ -22,9 +17,11 @@ class Afk(EventsBase):
             except KeyError:
                 pass
 
-            self.bot.afk_users.pop(message.author.id)
+            info = (await self.bot.get_afk(message.author.id)).get(message.author.id)
+            if info is None or self.bot.afk_users.pop(message.author.id, None) is None:
+                # already handled by another message
+                return
 
-            info = await self.bot.db.fetchrow("SELECT * FROM afk WHERE user_id = $1", message.author.id)
             await self.bot.db.execute("INSERT INTO afk (user_id, start_time, reason) VALUES ($1, null, null) "
                                       "ON CONFLICT (user_id) DO UPDATE SET start_time = null, reason = null",
                                       message.author.id)
@@ -32,47 +29,34 @@ class Afk(EventsBase):
             colors = [0x910023, 0xA523FF]
             color = random.choice(colors)
 
-            time = info["start_time"]
-
-            delta_uptime = message.created_at - time
+            delta_uptime = message.created_at - info.start_time
             hours, remainder = divmod(int(delta_uptime.total_seconds()), 3600)
             minutes, seconds = divmod(remainder, 60)
             days, hours = divmod(hours, 24)
 
             embed = discord.Embed(title=f"👋 Welcome back {message.author.name}!", description=f"""
 You've been AFK for {self.time(days=days, hours=hours, minutes=minutes, seconds=seconds)}
-With the reason being: {info['reason']}
+With the reason being: {info.reason}
                                     """, timestamp=discord.utils.utcnow(), color=color)
 
             await message.channel.send(embed=embed, delete_after=35)
 
             await message.add_reaction("👋")
 
-    @commands.Cog.listener('on_message')
+    @message_handler(guild_only=True, mentions=True,
+                     check=lambda cog, message: message.author != cog.bot.user and
+                     any(u.id in cog.bot.afk_users for u in message.mentions))
     async def on_afk_user_mention(self, message: discord.Message):
-        if not message.guild:
-            return
-
-        if message.author == self.bot.user:
-            return
-
         if message.mentions:
             pinged_afk_user_ids = list(set([u.id for u in message.mentions]).intersection(self.bot.afk_users))
+            # every record is normally cached already, at worst this is one query for all of them
+            records = await self.bot.get_afk(*pinged_afk_user_ids)
             afkUsers = []
-            for user_id in pinged_afk_user_ids:
+            for user_id, info in records.items():
                 member = message.guild.get_member(user_id)
                 if member and member.id != message.author.id:
-                    info = await self.bot.db.fetchrow("SELECT * FROM afk WHERE user_id = $1", user_id)
-
-                    time = info["start_time"]
-
-                    delta_uptime = message.created_at - time
-                    hours, remainder = divmod(int(delta_uptime.total_seconds()), 3600)
-                    minutes, seconds = divmod(remainder, 60)
-                    days, hours = divmod(hours, 24)
-
                     afkUsers.append(
-                        f"Hey {message.author.mention}, it looks like {member.mention} has been AFK for {helpers.human_timedelta(info['start_time'])}.\nWith the reason being: {info['reason']}\n")
+                        f"Hey {message.author.mention}, it looks like {member.mention} has been AFK for {helpers.human_timedelta(info.start_time)}.\nWith the reason being: {info.reason}\n")
 
             if afkUsers:
                 afkUsers = "\n".join(afkUsers)
@@ -1,10 +1,10 @@
 import discord
 
 from ._base import EventsBase
-from discord.ext import commands
+from helpers.router import message_handler
 
 class Bot(EventsBase):
 
-    @commands.Cog.listener('on_message')
+    @message_handler()
     async def update_messages_seen_count(self, message: discord.Message):
         self.bot.messages_count =+ 1
\ No newline at end of file
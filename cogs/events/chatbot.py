@@ -3,27 +3,20 @@ import discord
 import unidecode
 
 from ._base import EventsBase
-from discord.ext import commands
+from helpers.router import message_handler
 
 class Chatbot(EventsBase):
 
-    @commands.Cog.listener('on_message')
+    @message_handler(guild_only=True, ignore_bots=True, channels=lambda cog: cog.bot.chatbot_channels)
     async def chatbot(self, message: discord.Message):
-        if message.author.bot:
-            return
+        text = unidecode.unidecode(discord.utils.remove_markdown(urllib.parse.quote(message.content)))
+        request = await self.bot.session.get(
+            f"https://api.popcat.xyz/chatbot?msg={text}&owner=Ender2K89&botname=Stealth+Bot")
+        json = await request.json()
 
-        if not message.guild:
-            return
+        try:
+            await message.reply(json['response'])
 
-        if message.channel.id in self.bot.chatbot_channels:
-            text = unidecode.unidecode(discord.utils.remove_markdown(urllib.parse.quote(message.content)))
-            request = await self.bot.session.get(
-                f"https://api.popcat.xyz/chatbot?msg={text}&owner=Ender2K89&botname=Stealth+Bot")
-            json = await request.json()
-
-            try:
-                await message.reply(json['response'])
-
-            except:
-                await message.add_reaction('❌')
-                await message.reply(json['error']['message'])
\ No newline at end of file
+        except:
+            await message.add_reaction('❌')
+            await message.reply(json['error']['message'])
\ No newline at end of file
@@ -30,7 +30,7 @@ To add a prefix simply do `sb!prefix add <prefix>`.
 
     @commands.Cog.listener("on_guild_join")
     async def private_log_on_guild_join(self, guild: discord.Guild):
-        await self.bot.db.execute("DELETE FROM guilds WHERE guild_id = $1", guild.id)
+        await self.bot.guild_settings.delete(guild.id)
 
         embed = discord.Embed(title="New guild!", description=f"""
 **Guild name:** {guild.name}
@@ -51,7 +51,7 @@ To add a prefix simply do `sb!prefix add <prefix>`.
 
     @commands.Cog.listener("on_guild_remove")
     async def private_log_on_guild_remove(self, guild: discord.Guild):
-        await self.bot.db.execute("DELETE FROM guilds WHERE guild_id = $1", guild.id)
+        await self.bot.guild_settings.delete(guild.id)
 
         embed = discord.Embed(title="Left guild!", description=f"""
 **Guild name:** {guild.name}
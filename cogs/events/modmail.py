@@ -2,6 +2,7 @@ import discord
 
 from ._base import EventsBase
 from discord.ext import commands
+from helpers.router import message_handler
 from discord.errors import HTTPException
 from discord.ext.commands.errors import UserNotFound
 
@@ -30,14 +31,14 @@ class ModMail(EventsBase):
         self.bot.dm_webhooks[channel.id] = wh.url
         return wh
 
-    @commands.Cog.listener('on_message')
+    @message_handler(dm_only=True, check=lambda cog, message: message.author != cog.bot.user)
     async def on_mail(self, message: discord.Message):
-        if message.guild or message.author == self.bot.user:
-            return
-
         ctx = await self.bot.get_context(message)
 
-        category = self.bot.get_guild(879050715660697622).get_channel(919172324610170930)
+        guild = self.bot.get_guild(879050715660697622)
+        category = guild and guild.get_channel(919172324610170930)
+        if not category:
+            return
         channel = discord.utils.get(category.channels, topic=str(message.author.id))
 
         if not channel:
@@ -60,14 +61,8 @@ class ModMail(EventsBase):
         except (discord.Forbidden, discord.HTTPException):
             return await message.add_reaction('⚠')
 
-    @commands.Cog.listener('on_message')
+    @message_handler(guild_only=True, ignore_bots=True, category=919172324610170930)
     async def on_mail_reply(self, message: discord.Message):
-        if not message.guild:
-            return
-
-        if any((message.author.bot, message.channel.category_id != 919172324610170930)):
-            return
-
         channel = message.channel
         try:
             user = self.bot.get_user(int(channel.topic)) or await self.bot.fetch_user(int(channel.topic))
@@ -93,7 +88,10 @@ class ModMail(EventsBase):
         if str(before) == str(after) or before.bot:
             return
 
-        category = self.bot.get_guild(879050715660697622).get_channel(919172324610170930)
+        guild = self.bot.get_guild(879050715660697622)
+        category = guild and guild.get_channel(919172324610170930)
+        if not category:
+            return
         channel = discord.utils.get(category.channels, topic=str(after.id))
 
         if channel:
@@ -3,26 +3,21 @@ import discord
 
 from ._base import EventsBase
 from discord.ext import commands
+from helpers.router import message_handler
 
 class Private(EventsBase):
 
-    @commands.Cog.listener('on_message')
+    @message_handler(authors={564890536947875868})
     async def on_owner_forgor(self, message: discord.Message):
         """ Event to detect if the bot owner said 'forgor' in a message and react with 💀 to it. """
 
-        if message.author.id == 564890536947875868 and "forgor" in message.content.lower():
+        if "forgor" in message.content.lower():
             return await message.add_reaction("💀")
 
-    @commands.Cog.listener('on_message')
+    @message_handler(guild_only=True, authors={555818548291829792})
     async def send_emote(self, message: discord.Message):
         """ Event to use nitro emotes for free cause some of my friends don't have nitro. """
 
-        if not message.guild:
-            return
-
-        if message.author.id != 555818548291829792:
-            return
-
         character = "\u200b"
         content = message.content
         emojis = re.findall(r';(?P<name>[a-zA-Z0-9]{1,32}?);', message.content)
@@ -39,35 +34,47 @@ class Private(EventsBase):
             await message.channel.send(content)
 
     @commands.Cog.listener()
-    async def on_message_delete(self, message: discord.Message):
+    async def on_raw_message_delete(self, payload: discord.RawMessageDeleteEvent):
         """ Ghost ping detector for my servers. """
 
-        if not message.guild or message.author.bot:
+        if payload.guild_id not in self.moderation_guilds:
+            return
+
+        # the snapshot is there even if discord.py already dropped the message from its cache
+        message = payload.cached_message
+        snapshot = self.bot.message_snapshots.get(payload.channel_id, payload.message_id)
+        if message is not None:
+            if message.author.bot:
+                return
+            author_id, mentions = message.author.id, [m.id for m in message.mentions]
+        elif snapshot is not None:
+            author_id, mentions = snapshot.author_id, snapshot.mentions
+        else:
+            return
+
+        guild = self.bot.get_guild(payload.guild_id)
+        channel = self.bot.get_channel(payload.channel_id)
+        if not guild or not channel:
             return
 
-        if message.guild.id in self.moderation_guilds:
-            if not message.author.bot:
-                if message.mentions:
-                    users = []
-                    for user in message.mentions:
-                        if user.id == message.author.id:
-                            continue
+        users = []
+        for user_id in mentions:
+            if user_id == author_id:
+                continue
 
-                        user = message.guild.get_member(user.id)
-                        users.append(user.mention)
+            user = guild.get_member(user_id)
+            if user:
+                users.append(user.mention)
 
-                    if users:
-                        embed = discord.Embed(title="<a:alert:854743318033072158> Ghost ping detector <a:alert:854743318033072158>", description=f"""
-{message.author.mention} just deleted a message that pinged {', '.join(users)}!
+        if users:
+            embed = discord.Embed(title="<a:alert:854743318033072158> Ghost ping detector <a:alert:854743318033072158>", description=f"""
+<@{author_id}> just deleted a message that pinged {', '.join(users)}!
                                 """, color=discord.Color.red())
 
-                        return await message.channel.send(message.author.mention, embed=embed, allowed_mentions=discord.AllowedMentions(users=True))
+            return await channel.send(f"<@{author_id}>", embed=embed, allowed_mentions=discord.AllowedMentions(users=True))
 
-    @commands.Cog.listener('on_message')
+    @message_handler(guild_only=True, ignore_bots=True, mentions=True)
     async def on_mention_spam(self, message: discord.Message):
-        if not message.guild or message.author.bot:
-            return
-
         if message.guild.id == 799330949686231050 and len(message.mentions) > 3:
             await message.delete()
             await message.channel.send(
@@ -514,7 +514,7 @@ class GuildSettings(commands.Cog, name="Guild settings"):
             if len(webhooks) == 10:
                 raise commands.BadArgument(f'{channel.mention} has already the max number of webhooks! (10 webhooks)')
             try:
-                w = await channel.create_webhook(name='Stealth Bot logging', avatar=await ctx.me.avatar.read(),
+                w = await channel.create_webhook(name='Stealth Bot logging', avatar=await self.bot.avatar_bytes(),
                                                  reason='Stealth Bot logging')
                 webhook_url = w.url
             except discord.Forbidden:
@@ -533,10 +533,12 @@ class GuildSettings(commands.Cog, name="Guild settings"):
                                   ctx.guild.id)
         self.bot.guild_loggings[ctx.guild.id] = LoggingEventsFlags.all()
         try:
-            self.bot.log_channels[ctx.guild.id]._replace(default=webhook_url)
+            self.bot.log_channels[ctx.guild.id] = self.bot.log_channels[ctx.guild.id]._replace(default=webhook_url)
         except KeyError:
             self.bot.log_channels[ctx.guild.id] = self.bot.log_webhooks(default=webhook_url, voice=None, message=None,
                                                                         member=None, server=None, join_leave=None)
+        self.bot.webhook_pool.invalidate(ctx.guild.id)
+        self.bot.log_routes.rebuild(ctx.guild.id)
         await ctx.send(f'Successfully set the logging channel to {channel.mention}'
                        f'\n_see `{ctx.clean_prefix}help log` for more customization commands!_')
 
@@ -557,6 +559,8 @@ class GuildSettings(commands.Cog, name="Guild settings"):
                 self.bot.log_channels.pop(ctx.guild.id)
             except KeyError:
                 pass
+            self.bot.webhook_pool.invalidate(ctx.guild.id)
+            self.bot.log_routes.rebuild(ctx.guild.id)
             channels = await self.bot.db.fetchrow('DELETE FROM log_channels WHERE guild_id = $1 RETURNING *',
                                                   ctx.guild.id)
 
@@ -625,6 +629,7 @@ class GuildSettings(commands.Cog, name="Guild settings"):
         await self.bot.db.execute(f'UPDATE logging_events SET {event} = $2 WHERE guild_id = $1',
                                   ctx.guild.id, False)
         setattr(self.bot.guild_loggings[ctx.guild.id], event, False)
+        self.bot.log_routes.rebuild(ctx.guild.id)
         await ctx.send(f'✅ **|** Successfully disabled **{str(event).replace("_", " ").title()} Events**')
 
     @log.command(name='enable-event', aliases=['enable_event', 'ee'])
@@ -645,6 +650,7 @@ class GuildSettings(commands.Cog, name="Guild settings"):
         await self.bot.db.execute(f'UPDATE logging_events SET {event} = $2 WHERE guild_id = $1',
                                   ctx.guild.id, True)
         setattr(self.bot.guild_loggings[ctx.guild.id], event, True)
+        self.bot.log_routes.rebuild(ctx.guild.id)
         await ctx.send(f'✅ **|** Successfully enabled **{str(event).replace("_", " ").title()} Events**')
 
     @log.command(name='edit-channels', aliases=['edit_channels', 'ec'], preview='https://i.imgur.com/FO9e9VC.gif')
@@ -755,7 +761,7 @@ class GuildSettings(commands.Cog, name="Guild settings"):
                 over = {ctx.guild.default_role: discord.PermissionOverwrite(read_messages=False),
                         ctx.me: discord.PermissionOverwrite(read_messages=True, send_messages=True,
                                                             manage_channels=True, manage_webhooks=True)}
-                avatar = await ctx.me.avatar.read()
+                avatar = await self.bot.avatar_bytes()
                 cat = await ctx.guild.create_category(name='logging', overwrites=over)
                 join_leave_channel = await cat.create_text_channel(name='join-leave-log')
                 join_leave_webhook = await join_leave_channel.create_webhook(name='Stealth Bot logging', avatar=avatar)
@@ -773,7 +779,9 @@ class GuildSettings(commands.Cog, name="Guild settings"):
                                                                             message=message_webhook.url,
                                                                             member=member_webhook.url,
                                                                             voice=voice_webhook.url)
+                self.bot.webhook_pool.invalidate(ctx.guild.id)
                 self.bot.guild_loggings[ctx.guild.id] = LoggingEventsFlags.all()
+                self.bot.log_routes.rebuild(ctx.guild.id)
                 await self.bot.db.execute('INSERT INTO guilds (guild_id) VALUES ($1) '
                                           'ON CONFLICT (guild_id) DO NOTHING', ctx.guild.id)
                 await self.bot.db.execute("""
@@ -824,20 +832,20 @@ class GuildSettings(commands.Cog, name="Guild settings"):
     @commands.has_permissions(manage_guild=True)
     @commands.bot_has_permissions(manage_guild=True)
     async def welcome(self, ctx):
-        database = await self.bot.db.fetchrow("SELECT * FROM guilds WHERE guild_id = $1", ctx.guild.id)
+        settings = await self.bot.guild_settings.get(ctx.guild.id)
 
-        if not database['welcome_channel_id']:
+        if not settings.welcome_channel_id:
             message = f"This server doesn't have a welcome channel set-up.\nTo set it up do `{ctx.prefix}welcome enable <channel>`"
 
         else:
-            channel = self.bot.get_channel(database['welcome_channel_id'])
+            channel = self.bot.get_channel(settings.welcome_channel_id)
             message = f"This server has a welcome channel set up. It's {channel.mention}.\nTo remove it do `{ctx.prefix}welcome disable`"
 
-        if not database['welcome_message']:
+        if not settings.welcome_message:
             message2 = f"This server doesn't have a welcome message set-up.\nIf you would like to change that do `{ctx.prefix}welcome message <message>`"
 
         else:
-            message2 = f"The welcome message for this server is: `{database['welcome_message']}`"
+            message2 = f"The welcome message for this server is: `{settings.welcome_message}`"
 
         embed = discord.Embed(title="Welcome Module", description=f"""
 This is the welcome module. This module can log when a user joins the server and when they leave.
@@ -858,7 +866,7 @@ This is the welcome module. This module can log when a user joins the server and
         if not channel:
             channel = ctx.channel
 
-        await self.bot.db.execute("INSERT INTO guilds (guild_id, welcome_channel_id) VALUES ($1, $2) ON CONFLICT (guild_id) DO UPDATE SET welcome_channel_id = $2", ctx.guild.id, channel.id)
+        await self.bot.guild_settings.set(ctx.guild.id, welcome_channel_id=channel.id)
 
         embed = discord.Embed(title="Welcome channel updated", description=f"""
 The welcome channel for this server has been set to {channel.mention}!
@@ -875,8 +883,7 @@ If you would like to set a custom welcome message do `{ctx.prefix}welcome messag
     @commands.has_permissions(manage_guild=True)
     @commands.bot_has_permissions(manage_guild=True)
     async def welcome_disable(self, ctx):
-        await self.bot.db.execute("INSERT INTO guilds (guild_id, welcome_channel_id) VALUES ($1, $2) ON CONFLICT (guild_id) DO UPDATE SET welcome_channel_id = $2", ctx.guild.id, None)
-        await self.bot.db.execute("INSERT INTO guilds (guild_id, welcome_message) VALUES ($1, $2) ON CONFLICT (guild_id) DO UPDATE SET welcome_message = $2", ctx.guild.id, None)
+        await self.bot.guild_settings.set(ctx.guild.id, welcome_channel_id=None, welcome_message=None)
 
         embed = discord.Embed(title="Welcome module disabled", description=f"""
 The welcome module has been disabled for this server.
@@ -911,16 +918,16 @@ To use placeholders, surround them with `[]`. (e.g. `[server]`)
     @commands.has_permissions(manage_guild=True)
     @commands.bot_has_permissions(manage_guild=True)
     async def welcome_message(self, ctx, *, message):
-        database = await self.bot.db.fetchrow("SELECT * FROM guilds WHERE guild_id = $1", ctx.guild.id)
+        settings = await self.bot.guild_settings.get(ctx.guild.id)
 
-        if not database['welcome_channel_id']:
+        if not settings.welcome_channel_id:
             return await ctx.send(
                 f"You need to set-up a welcome channel first!\nTo do that do `{ctx.prefix}welcome enable <channel>`")
 
         if len(message) > 500:
             return await ctx.send(f"Your message exceeded the 500-character limit!")
 
-        await self.bot.db.execute("INSERT INTO guilds (guild_id, welcome_message) VALUES ($1, $2) ON CONFLICT (guild_id) DO UPDATE SET welcome_message = $2", ctx.guild.id, message)
+        await self.bot.guild_settings.set(ctx.guild.id, welcome_message=message)
 
         embed = discord.Embed(title="Welcome message updated", description=f"""
 The welcome message for this server has been set to: {message}
@@ -935,16 +942,16 @@ To disable the welcome module do `{ctx.prefix}welcome disable`
     @commands.has_permissions(manage_guild=True)
     @commands.bot_has_permissions(manage_guild=True)
     async def fake_message(self, ctx):
-        database = await self.bot.db.fetchrow("SELECT * FROM guilds WHERE guild_id = $1", ctx.guild.id)
+        settings = await self.bot.guild_settings.get(ctx.guild.id)
 
-        if not database['welcome_channel_id']:
+        if not settings.welcome_channel_id:
             return await ctx.send(f"You need to set-up a welcome channel first!\nTo do that do `{ctx.prefix}welcome enable <channel>`")
 
-        if not database['welcome_message']:
+        if not settings.welcome_message:
             message = f"Welcome to **[server]**, **[full-user]**!"
 
         else:
-            message = database['welcome_message']
+            message = settings.welcome_message
 
         message = message.replace("[server]", f"{ctx.guild.name}")
         message = message.replace("[user]", f"{ctx.author.display_name}").replace("[full-user]", f"{ctx.author}").replace("[user-mention]", f"{ctx.author.mention}")
@@ -964,13 +971,13 @@ To disable the welcome module do `{ctx.prefix}welcome disable`
     async def muterole(self, ctx: CustomContext, role: discord.Role = None):
         if ctx.invoked_subcommand is None:
             if role:
-                await self.bot.db.execute("INSERT INTO guilds(guild_id, muted_role_id) VALUES ($1, $2) ON CONFLICT (guild_id) DO UPDATE SET muted_role_id = $2", ctx.guild.id, role.id)
+                await self.bot.guild_settings.set(ctx.guild.id, muted_role_id=role.id)
 
                 embed = discord.Embed(title="Mute role updated", description=f"The mute-role for this server has been changed to {role.mention}", color=discord.Color.green())
 
                 return await ctx.send(embed=embed, color=False)
 
-            mute_role = await self.bot.db.fetchval("SELECT muted_role_id FROM guilds WHERE guild_id = $1", ctx.guild.id)
+            mute_role = (await self.bot.guild_settings.get(ctx.guild.id)).muted_role_id
 
             if not mute_role:
                 raise errors.MuteRoleNotFound
@@ -994,7 +1001,7 @@ And to remove it, do `{ctx.prefix}mute-role remove`.
     @commands.has_permissions(manage_roles=True)
     @commands.bot_has_permissions(manage_roles=True)
     async def muterole_remove(self, ctx: CustomContext):
-        await self.bot.db.execute("INSERT INTO guilds(guild_id, muted_role_id) VALUES ($1, $2) ON CONFLICT (guild_id) DO UPDATE SET muted_role_id = $2", ctx.guild.id, None)
+        await self.bot.guild_settings.set(ctx.guild.id, muted_role_id=None)
 
         embed = discord.Embed(title="Mute role removed", description="The mute-role for this server has been removed.", color=discord.Color.green())
 
@@ -1007,7 +1014,7 @@ And to remove it, do `{ctx.prefix}mute-role remove`.
     @commands.has_permissions(manage_guild=True)
     @commands.bot_has_permissions(manage_guild=True)
     async def muterole_create(self, ctx: CustomContext):
-        mute_role = await self.bot.db.fetchval("SELECT muted_role_id FROM guilds WHERE guild_id = $1", ctx.guild.id)
+        mute_role = (await self.bot.guild_settings.get(ctx.guild.id)).muted_role_id
 
         if mute_role:
             mute_role = ctx.guild.get_role(mute_role)
@@ -1025,7 +1032,7 @@ And to remove it, do `{ctx.prefix}mute-role remove`.
 
         role = await ctx.guild.create_role(name="Muted", permissions=permissions, reason=f"Mute role created by {ctx.author} ({ctx.author.id})")
 
-        await self.bot.db.execute("INSERT INTO guilds(guild_id, muted_role_id) VALUES ($1, $2) ON CONFLICT (guild_id) DO UPDATE SET muted_role_id = $2", ctx.guild.id, role.id)
+        await self.bot.guild_settings.set(ctx.guild.id, muted_role_id=role.id)
 
         modified = 0
         for channel in ctx.guild.channels:
@@ -1055,7 +1062,7 @@ And to remove it, do `{ctx.prefix}mute-role remove`.
     @commands.bot_has_permissions(manage_guild=True)
     async def muterole_fix(self, ctx: CustomContext):
         await ctx.trigger_typing()
-        mute_role = await self.bot.db.fetchval('SELECT muted_role_id FROM guilds WHERE guild_id = $1', ctx.guild.id)
+        mute_role = (await self.bot.guild_settings.get(ctx.guild.id)).muted_role_id
 
         if not mute_role:
             raise errors.MuteRoleNotFound
@@ -1102,13 +1109,13 @@ And to remove it, do `{ctx.prefix}mute-role remove`.
     @commands.has_permissions(manage_guild=True)
     @commands.bot_has_permissions(manage_guild=True)
     async def verifyrole(self, ctx: CustomContext):
-        role = await self.bot.db.fetchrow("SELECT * FROM guilds WHERE guild_id = $1", ctx.guild.id)
+        settings = await self.bot.guild_settings.get(ctx.guild.id)
 
-        if not role['verify_role_id']:
+        if not settings.verify_role_id:
             return await ctx.send(f"This server doesn't have a verify role. To set it do `{ctx.prefix}verifyrole set <role>`")
 
         else:
-            role = ctx.guild.get_role(role['verify_role_id'])
+            role = ctx.guild.get_role(settings.verify_role_id)
             return await ctx.send(f"The current verify role for this server is {role.mention}.")
 
     @verifyrole.command(
@@ -1117,7 +1124,7 @@ And to remove it, do `{ctx.prefix}mute-role remove`.
     @commands.has_permissions(manage_guild=True)
     @commands.bot_has_permissions(manage_guild=True)
     async def _set(self, ctx: CustomContext, role: discord.Role):
-        await self.bot.db.execute("INSERT INTO guilds (guild_id, verify_role_id) VALUES ($1, $2) ON CONFLICT (guild_id) DO UPDATE SET verify_role_id = $2", ctx.guild.id, role.id)
+        await self.bot.guild_settings.set(ctx.guild.id, verify_role_id=role.id)
         await ctx.send(f"Successfully set the verify role for this server to {role.mention}.")
 
     @verifyrole.command(
@@ -1125,5 +1132,5 @@ And to remove it, do `{ctx.prefix}mute-role remove`.
     @commands.has_permissions(manage_guild=True)
     @commands.bot_has_permissions(manage_guild=True)
     async def remove(self, ctx: CustomContext):
-        await self.bot.db.execute("INSERT INTO guilds (guild_id, verify_role_id) VALUES ($1, $2) ON CONFLICT (guild_id) DO UPDATE SET verify_role_id = $2", ctx.guild.id, None)
+        await self.bot.guild_settings.set(ctx.guild.id, verify_role_id=None)
         await ctx.send(f"Successfully removed the verify role for this server.")
\ No newline at end of file
@@ -341,6 +341,11 @@ class StealthHelp(commands.HelpCommand):
         super().__init__(**options)
         self.context = None
 
+    async def prepare_help_command(self, ctx, command=None):
+        # lazily registered extensions don't have their cogs yet, load them so the categories show up
+        await ctx.bot.lazy.load_all()
+        await super().prepare_help_command(ctx, command)
+
     def get_bot_mapping(self):
         """Retrieves the bot mapping passed to :meth:`send_bot_help`."""
         bot = self.context.bot
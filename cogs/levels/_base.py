@@ -1,6 +1,26 @@
-from discord.ext import commands
+from discord.ext import commands, tasks
+from helpers.levels import FLUSH_INTERVAL, JOURNAL_INTERVAL
+from helpers.rank_card import RankCardRenderer
 
 class LevelsBase(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.cd_mapping = commands.CooldownMapping.from_cooldown(1, 45, commands.BucketType.member)
\ No newline at end of file
+        self.cd_mapping = commands.CooldownMapping.from_cooldown(1, 45, commands.BucketType.member)
+        self.cards = RankCardRenderer(bot.session)
+        self.flush_xp.start()
+        self.write_xp_journal.start()
+
+    def cog_unload(self):
+        self.flush_xp.cancel()
+        self.write_xp_journal.cancel()
+        self.cards.close()
+        # whatever is still pending goes out now instead of waiting for the next load
+        self.bot.loop.create_task(self.bot.xp.flush())
+
+    @tasks.loop(seconds=FLUSH_INTERVAL)
+    async def flush_xp(self):
+        await self.bot.xp.flush()
+
+    @tasks.loop(seconds=JOURNAL_INTERVAL)
+    async def write_xp_journal(self):
+        await self.bot.xp.write_journal()
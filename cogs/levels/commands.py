@@ -1,18 +1,13 @@
 import typing
-import asyncio
 import discord
-import functools
 
 from ._base import LevelsBase
 from discord.ext import commands
-from disrank.generator import Generator
 from helpers.context import CustomContext
 
-class Commands(LevelsBase):
+LEADERBOARD_PAGE = 10
 
-    def get_rank_card(self, args):
-        image = Generator().generate_profile(**args)
-        return image
+class Commands(LevelsBase):
 
     @commands.command(
         help="Shows the specified member's rank card.",
@@ -26,25 +21,15 @@ class Commands(LevelsBase):
             else:
                 member = ctx.author
 
-        user = await self.bot.db.fetchrow("SELECT * FROM users WHERE user_id = $1 AND guild_id = $2",
-                                          member.id, ctx.guild.id)
+        await self.bot.ranks.ensure(ctx.guild.id)
+        user = self.bot.ranks.get(ctx.guild.id, member.id)
 
         if not user:
             return await ctx.send(f"{'You' if member.id == ctx.author.id else f'{member.display_name}'} doesn't have a level")
 
-        args = {
-            'bg_image': 'https://media.discordapp.net/attachments/820049182860509206/923974515623604224/Untitled48_20211224102440.png?width=1193&height=671',  # Background image link
-            'profile_image': str(member.avatar.replace(format='png', size=2048).url),  # User profile picture link
-            'level': user['level'],  # User current level
-            'current_xp': 0,  # Current level minimum xp
-            'user_xp': user['xp'],  # User current xp
-            'next_xp': 300 * user['level'],  # xp required for next level
-            'user_position': 0,  # User position in leaderboard
-            'user_name': str(member), # username with discriminator
-            'user_status': member.status.name,  # User status eg. online, offline, idle, streaming, dnd
-        }
+        position, level, xp = user
 
-        image = await asyncio.get_event_loop().run_in_executor(None, functools.partial(self.get_rank_card, args))
+        image = await self.cards.render(member, level=level, xp=xp, next_xp=300 * level, position=position)
 
         embed = discord.Embed(title=f"{'Your' if member.id == ctx.author.id else f'{member.display_name}s'} rank card")
         embed.set_image(url=f"attachment://rank.png")
@@ -52,23 +37,27 @@ class Commands(LevelsBase):
         return await ctx.send(embed=embed, file=discord.File(fp=image, filename="rank.png"))
 
     @commands.command(
-        help="Shows the level leaderboard for the server.",
+        help="Shows the level leaderboard for the server, 10 members a page.",
         aliases=['lb'])
-    async def leaderboard(self, ctx: CustomContext) -> discord.Message:
-        records = await self.bot.db.fetch("SELECT * FROM users WHERE guild_id = $1 ORDER BY level DESC LIMIT 10",
-                                            ctx.guild.id)
+    async def leaderboard(self, ctx: CustomContext, page: int = 1) -> discord.Message:
+        await self.bot.ranks.ensure(ctx.guild.id)
+        pages = max(1, -(-self.bot.ranks.count(ctx.guild.id) // LEADERBOARD_PAGE))
+        page = min(max(page, 1), pages)
+        start = (page - 1) * LEADERBOARD_PAGE
 
         users = []
         levels = []
         nl = "\n"
 
-        for record in records:
-            user = ctx.guild.get_member(record['user_id'])
+        for position, (user_id, level, xp) in enumerate(self.bot.ranks.page(ctx.guild.id, start, LEADERBOARD_PAGE),
+                                                        start=start + 1):
+            user = ctx.guild.get_member(user_id)
             if not user: continue
-            users.append(f"{user.mention}")
-            levels.append(f"{record['level']} ({record['xp']} XP)")
+            users.append(f"{position}. {user.mention}")
+            levels.append(f"{level} ({xp} XP)")
 
         embed = discord.Embed(title=f"{ctx.guild.name}'s level leaderboard")
-        embed.add_field(name=f"User", value=f"{nl.join(users)}", inline=True)
-        embed.add_field(name=f"Level", value=f"{nl.join(levels)}", inline=True)
+        embed.add_field(name=f"User", value=f"{nl.join(users) or 'Nobody'}", inline=True)
+        embed.add_field(name=f"Level", value=f"{nl.join(levels) or '-'}", inline=True)
+        embed.set_footer(text=f"Page {page}/{pages}")
         return await ctx.send(embed=embed)
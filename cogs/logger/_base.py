@@ -1,69 +1,65 @@
+import time
 import typing
-import asyncio
 import discord
 
 from collections import namedtuple
+from ._delivery import LogDelivery
+from helpers.log_spool import SPOOL_FLUSH_INTERVAL
+from helpers.webhooks import DELIVER_TYPES
+from helpers.log_queue import LogFile
 from discord.ext import commands, tasks
 
 
 guild_channels = typing.Union[discord.TextChannel, discord.VoiceChannel, discord.CategoryChannel, discord.TextChannel]
+# a webhook that couldn't be fixed is retried after a minute, doubling up to 30 minutes
+REPAIR_BACKOFF = 60
+REPAIR_BACKOFF_MAX = 1800
 invalidated_webhook = 'https://canary.discord.com/api/webhooks/000000000000000000/_LQ1qItzrwhNj47TZEagmEgnjBJhCeLIIAE48M61S3XojN5bQuq8JM_kjv4cwCglYJlp'
 
 
 class LoggingBase(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        self.delivery = LogDelivery(bot, on_not_found=self.create_and_deliver)
+        # (guild id, deliver type) -> embeds waiting on the repair in flight
+        self.repairs: typing.Dict[typing.Tuple[int, str], typing.List[discord.Embed]] = {}
+        # (guild id, deliver type) -> (don't retry before, current delay)
+        self.repair_backoff: typing.Dict[typing.Tuple[int, str], typing.Tuple[float, float]] = {}
+        self.repair_stats = {'attempts': 0, 'joined': 0, 'skipped': 0, 'failed': 0, 'dropped': 0}
         self.deliver_logs.start()
+        if bot.log_spool:
+            self.flush_spool.start()
         _nt_send_to = namedtuple('send_to', ['default', 'message', 'member', 'join_leave', 'voice', 'server'])
         self.send_to = _nt_send_to(default='default', message='message', member='member', join_leave='join_leave',
                                    server='server', voice='voice')
 
     def cog_unload(self) -> None:
         self.deliver_logs.cancel()
+        self.flush_spool.cancel()
+        self.delivery.close()
 
-    def log(self, embed, *, guild: typing.Union[discord.Guild, int], send_to: str = 'default'):
+    def log(self, embed, *, guild: typing.Union[discord.Guild, int], send_to: str = 'default', file: LogFile = None):
         guild_id = getattr(guild, 'id', guild)
-        if guild_id in self.bot.log_channels:
-            self.bot.log_cache[guild_id][send_to].append(embed)
+        if guild_id in self.bot.log_routes:
+            # only the embed is spooled, a file attached to it doesn't survive a restart
+            spool = self.bot.log_spool
+            seq = spool.add(guild_id, send_to, embed) if spool else None
+            self.bot.log_cache[guild_id][send_to].append(embed, seq, file)
 
     @tasks.loop(seconds=3)
     async def deliver_logs(self):
+        # the loop only batches up what came in over the last few seconds, the sending happens in the workers
         try:
-            for guild_id, webhooks in self.bot.log_channels.items():
-                for deliver_type, cache in self.bot.log_cache[guild_id].items():
-
-                    embeds = self.bot.log_cache[guild_id][deliver_type][:10]
-                    self.bot.log_cache[guild_id][deliver_type] = self.bot.log_cache[guild_id][deliver_type][10:]
-                    webhook_url = getattr(webhooks, deliver_type, None)
-                    if embeds:
-                        if webhook_url:
-                            webhook = discord.Webhook.from_url(webhook_url or invalidated_webhook,
-                                                               bot_token=self.bot.http.token, session=self.bot.session)
-                            try:
-                                await webhook.send(embeds=embeds)
-                            except discord.NotFound:
-                                self.bot.loop.create_task(
-                                    self.create_and_deliver(embeds=embeds, deliver_type=deliver_type,
-                                                            guild_id=guild_id))
-                                await asyncio.sleep(1)
-                            except Exception as e:
-                                print('Error during task!')
-                                print(e)
-                        else:
-                            deliver_type = self.send_to.default
-                            webhook_url = webhooks.default
-                            webhook = discord.Webhook.from_url(webhook_url or invalidated_webhook,
-                                                               bot_token=self.bot.http.token, session=self.bot.session)
-                            try:
-                                await webhook.send(embeds=embeds)
-                            except discord.NotFound:
-                                self.bot.loop.create_task(
-                                    self.create_and_deliver(embeds=embeds, deliver_type=deliver_type,
-                                                            guild_id=guild_id))
-                                await asyncio.sleep(1)
-                            except Exception as e:
-                                print('Error during task!')
-                                print(e)
+            for guild_id, caches in list(self.bot.log_cache.items()):
+                if guild_id not in self.bot.log_routes:
+                    # logging got disabled with things still queued
+                    self.bot.log_cache.pop(guild_id, None)
+                    continue
+
+                for deliver_type, cache in caches.items():
+                    if cache:
+                        self.delivery.schedule(guild_id, deliver_type)
+
         except Exception as e:  # noqa
             try:
                 await self.bot.on_error('channel_logs')
@@ -71,53 +67,98 @@ class LoggingBase(commands.Cog):
             except Exception as e:
                 print('something happened while task was running')
 
+    @tasks.loop(seconds=SPOOL_FLUSH_INTERVAL)
+    async def flush_spool(self):
+        await self.bot.log_spool.flush()
+
     @deliver_logs.before_loop
     async def wait(self):
         await self.bot.wait_until_ready()
 
-    # noinspection PyProtectedMember
     async def create_and_deliver(self, embeds: typing.List[discord.Embed], deliver_type: str, guild_id: int):
-        if deliver_type not in {'default', 'message', 'member', 'join_leave', 'voice', 'server'}:
+        if deliver_type not in DELIVER_TYPES:
             raise AttributeError('Improper delivery type passed')
-        chennel_ids = await self.bot.db.fetchrow(f'SELECT * FROM log_channels WHERE guild_id = $1', guild_id)
-        channel_id: int = chennel_ids[f"{deliver_type}_chid"]
-        channel: discord.TextChannel = self.bot.get_channel(channel_id)  # type: ignore
-        if not channel and deliver_type != self.send_to.default:
-            for e in embeds:
-                e.footer.text = e.footer.text + f'\nCould not deliver to the {deliver_type} channel. Sent here instead!\n' \
-                                                f'Please set or set the {deliver_type} channel. do `db.help log` for info.'
-                self.log(e, guild=guild_id, send_to=self.send_to.default)
+        key = (guild_id, deliver_type)
+
+        waiting = self.repairs.get(key)
+        if waiting is not None:
+            # this webhook is already being fixed, these go out with the embeds that started it
+            waiting.extend(embeds)
+            self.repair_stats['joined'] += 1
+            return
+
+        retry_at, _ = self.repair_backoff.get(key, (0.0, 0.0))
+        if retry_at > time.monotonic():
+            self.repair_stats['skipped'] += 1
+            return self.undeliverable(embeds, deliver_type, guild_id, None, None)
+
+        self.repairs[key] = waiting = list(embeds)
+        self.repair_stats['attempts'] += 1
+        try:
+            channel, problem = await self.repair_webhook(deliver_type, guild_id)
+        except Exception as e:
+            channel, problem = None, f'Something went wrong while re-creating the webhook ({e.__class__.__name__}).'
+        finally:
+            self.repairs.pop(key, None)
+
+        if problem is None:
+            self.repair_backoff.pop(key, None)
+            for embed in waiting:
+                self.log(embed, guild=guild_id, send_to=deliver_type)
             return
-        if channel.permissions_for(channel.guild.me).manage_webhooks:
-            webhooks_list = await channel.webhooks()
-            for w in webhooks_list:
-                if w.user == self.bot.user:
-                    webhook = w
-                    break
-            else:
-                webhook = await channel.create_webhook(name='Stealth Bot Logging', avatar=await self.bot.user.avatar.read(),
-                                                       reason='Stealth Bot Logging channel')
-            # noinspection SqlResolve
-            await self.bot.db.execute(f"UPDATE log_channels SET {deliver_type}_channel = $1", webhook.url)
-            if deliver_type == 'default':
-                self.bot.log_channels[channel.guild.id]._replace(default=webhook.url)
-            elif deliver_type == 'message':
-                self.bot.log_channels[channel.guild.id]._replace(message=webhook.url)
-            elif deliver_type == 'member':
-                self.bot.log_channels[channel.guild.id]._replace(member=webhook.url)
-            elif deliver_type == 'join_leave':
-                self.bot.log_channels[channel.guild.id]._replace(join_leave=webhook.url)
-            elif deliver_type == 'voice':
-                self.bot.log_channels[channel.guild.id]._replace(voice=webhook.url)
-            elif deliver_type == 'server':
-                self.bot.log_channels[channel.guild.id]._replace(server=webhook.url)
-            await webhook.send(embeds=embeds)
-        elif not deliver_type != self.send_to.default:
+
+        self.repair_stats['failed'] += 1
+        _, delay = self.repair_backoff.get(key, (0.0, REPAIR_BACKOFF / 2))
+        delay = min(delay * 2, REPAIR_BACKOFF_MAX)
+        self.repair_backoff[key] = (time.monotonic() + delay, delay)
+        self.undeliverable(waiting, deliver_type, guild_id, channel, problem)
+
+    async def repair_webhook(self, deliver_type: str, guild_id: int
+                             ) -> typing.Tuple[typing.Optional[discord.TextChannel], typing.Optional[str]]:
+        """Finds or creates the bot's webhook in the log channel. Returns the channel and what's wrong, if anything."""
+        # noinspection SqlResolve
+        channel_id = await self.bot.db.fetchval(f'SELECT {deliver_type}_chid FROM log_channels WHERE guild_id = $1',
+                                                guild_id)
+        channel: discord.TextChannel = self.bot.get_channel(channel_id or 0)  # type: ignore
+        if not channel:
+            return None, f'Please set the {deliver_type} channel. do `db.help log` for info.'
+        if not channel.permissions_for(channel.guild.me).manage_webhooks:
+            return channel, f'Please give me manage_webhooks permissions in #{channel.name}.'
+
+        webhooks_list = await channel.webhooks()
+        for w in webhooks_list:
+            if w.user == self.bot.user:
+                webhook = w
+                break
+        else:
+            webhook = await channel.create_webhook(name='Stealth Bot Logging', avatar=await self.bot.avatar_bytes(),
+                                                   reason='Stealth Bot Logging channel')
+        # noinspection SqlResolve
+        await self.bot.db.execute(f"UPDATE log_channels SET {deliver_type}_channel = $1 WHERE guild_id = $2",
+                                  webhook.url, guild_id)
+        self.bot.update_log(deliver_type, webhook.url, guild_id)
+        return channel, None
+
+    def undeliverable(self, embeds: typing.List[discord.Embed], deliver_type: str, guild_id: int,
+                      channel: typing.Optional[discord.TextChannel], problem: typing.Optional[str]):
+        if deliver_type != self.send_to.default:
             for e in embeds:
-                e.footer.text = e.footer.text + f'\nCould not deliver to the {deliver_type} channel. Sent here instead!\n' \
-                                                f'Please give me manage_webhooks permissions in #{channel.name}.'
+                note = f'Could not deliver to the {deliver_type} channel. Sent here instead!'
+                if problem:
+                    note += f'\n{problem}'
+                e.set_footer(text=f'{e.footer.text}\n{note}' if e.footer.text else note, icon_url=e.footer.icon_url)
                 self.log(e, guild=guild_id, send_to=self.send_to.default)
-        else:
+            return
+
+        # nowhere left to send them, only the first failure of a backoff window gets to say so
+        self.repair_stats['dropped'] += len(embeds)
+        if channel and problem:
+            self.bot.loop.create_task(self._notify_broken(channel))
+
+    async def _notify_broken(self, channel: discord.TextChannel):
+        try:
             await channel.send(f'An error occurred delivering the message to {channel.mention}!'
                                f'\nPlease check if I have the **Manage Webhook** permissions in all the log channels!'
                                f'\nAnd also check that {channel.mention} has less than 10 webhooks, **or** it already has one webhook owned by {channel.guild.me.mention}')
+        except discord.HTTPException:
+            pass
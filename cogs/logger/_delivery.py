@@ -0,0 +1,182 @@
+import json
+import time
+import typing
+import asyncio
+import aiohttp
+import discord
+
+from helpers.webhooks import PooledWebhook
+from helpers.log_queue import LogFile
+
+LOG_CONCURRENCY = 50
+MAX_RETRIES = 3
+
+
+class LogDelivery:
+    """Sends queued log embeds to their webhooks.
+
+    Every (guild, deliver type) gets its own worker that drains its queue in order, packing as many embeds into each
+    request as discord accepts (see LogQueue.take), while a global semaphore caps how many requests are in flight at
+    once. Each webhook's rate limit bucket is read from the response headers, so a worker waits out its own bucket
+    instead of hitting a 429 and nobody else waits with it."""
+
+    def __init__(self, bot, *, concurrency: int = LOG_CONCURRENCY,
+                 on_not_found: typing.Callable[[typing.List[discord.Embed], str, int], typing.Awaitable] = None):
+        self.bot = bot
+        self.on_not_found = on_not_found
+        self.workers: typing.Dict[typing.Tuple[int, str], asyncio.Task] = {}
+        self.sent = 0
+        self.failed = 0
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._global_reset = 0.0
+
+    def resolve(self, guild_id: int, deliver_type: str) -> typing.Tuple[typing.Optional[PooledWebhook], str]:
+        route = self.bot.log_routes.get(guild_id)
+        if route is None:
+            return None, deliver_type
+
+        # types without a channel of their own already point at the default one here
+        deliver_type = route.targets.get(deliver_type, 'default')
+        return self.bot.webhook_pool.get(guild_id, deliver_type), deliver_type
+
+    def schedule(self, guild_id: int, deliver_type: str) -> None:
+        key = (guild_id, deliver_type)
+        worker = self.workers.get(key)
+
+        if worker is None or worker.done():
+            self.workers[key] = self.bot.loop.create_task(self._worker(guild_id, deliver_type))
+
+    def close(self) -> None:
+        for worker in self.workers.values():
+            worker.cancel()
+        self.workers.clear()
+
+    async def _worker(self, guild_id: int, deliver_type: str) -> None:
+        try:
+            while True:
+                cache = self.bot.log_cache.get(guild_id, {}).get(deliver_type)
+                if not cache:
+                    return
+
+                embeds, files = cache.take()
+                last_seq = cache.last_seq
+
+                webhook, send_as = self.resolve(guild_id, deliver_type)
+                if not webhook:
+                    if self.on_not_found:
+                        # the repair logs them again, with new spool entries
+                        self.bot.loop.create_task(self.on_not_found(embeds, send_as, guild_id))
+                    self.ack(guild_id, deliver_type, last_seq)
+                    continue
+
+                try:
+                    await self.send(webhook, embeds, files)
+                    self.sent += len(embeds)
+
+                except discord.NotFound:
+                    if self.on_not_found:
+                        self.bot.loop.create_task(self.on_not_found(embeds, send_as, guild_id))
+
+                except discord.HTTPException as e:
+                    if e.status >= 500:
+                        # discord is having a bad time, try again on the next delivery round
+                        cache.putback()
+                        return
+
+                    # rejected outright, sending it again won't go any better
+                    self.failed += len(embeds)
+                    print(f'Log batch for {guild_id} ({deliver_type}) was rejected: {e}')
+
+                except Exception as e:
+                    # most likely connection trouble. left where it is and unacknowledged, so neither the next
+                    # round nor a restart loses it
+                    cache.putback()
+                    print('Error during task!')
+                    print(e)
+                    return
+
+                self.ack(guild_id, deliver_type, last_seq)
+
+        finally:
+            self.workers.pop((guild_id, deliver_type), None)
+
+    def ack(self, guild_id: int, deliver_type: str, seq: typing.Optional[int]) -> None:
+        if self.bot.log_spool:
+            self.bot.log_spool.ack(guild_id, deliver_type, seq)
+
+    async def _wait_for_bucket(self, bucket) -> None:
+        while True:
+            delay = max(bucket.delay(), self._global_reset - time.monotonic())
+            if delay <= 0:
+                return
+            await asyncio.sleep(delay)
+
+    def _update_bucket(self, bucket, response) -> None:
+        headers = response.headers
+        remaining = headers.get('X-RateLimit-Remaining')
+        reset_after = headers.get('X-RateLimit-Reset-After')
+
+        if remaining is not None:
+            bucket.remaining = int(remaining)
+        if reset_after is not None:
+            bucket.reset_at = time.monotonic() + float(reset_after)
+
+    @staticmethod
+    def _body(payload: dict, files: typing.List[LogFile]) -> dict:
+        if not files:
+            return {'json': payload}
+
+        # a fresh form every attempt, aiohttp can't send the same one twice
+        form = aiohttp.FormData()
+        form.add_field('payload_json', json.dumps(payload), content_type='application/json')
+        for index, (filename, data) in enumerate(files):
+            form.add_field(f'files[{index}]', data, filename=filename,
+                           content_type='application/gzip' if filename.endswith('.gz') else 'text/plain')
+        return {'data': form}
+
+    async def send(self, webhook: PooledWebhook, embeds: typing.List[discord.Embed],
+                   files: typing.List[LogFile] = ()) -> None:
+        bucket = webhook.bucket
+        payload = {'embeds': [embed.to_dict() for embed in embeds]}
+
+        # only server errors use up retries, a 429 just means waiting as long as discord says
+        server_errors = 0
+        while True:
+            await self._wait_for_bucket(bucket)
+
+            async with self._semaphore:
+                # taken up front so the next batch for this webhook waits if this one used the last slot
+                bucket.remaining -= 1
+
+                async with self.bot.session.post(webhook.url, **self._body(payload, files)) as response:
+                    self._update_bucket(bucket, response)
+
+                    if response.status < 300:
+                        return
+
+                    text = await response.text()
+
+            if response.status == 429:
+                try:
+                    data = json.loads(text)
+                except ValueError:
+                    # cloudflare bans come back as html
+                    data = {}
+                retry_after = float(data.get('retry_after') or response.headers.get('Retry-After') or 1)
+
+                if data.get('global') or response.headers.get('X-RateLimit-Global'):
+                    self._global_reset = time.monotonic() + retry_after
+                else:
+                    bucket.remaining = 0
+                    bucket.reset_at = time.monotonic() + retry_after
+                continue
+
+            if response.status == 404:
+                raise discord.NotFound(response, text)
+
+            if response.status >= 500 and server_errors < MAX_RETRIES - 1:
+                await asyncio.sleep(1 + server_errors * 2)
+                server_errors += 1
+                continue
+
+            raise discord.HTTPException(response, text)
@@ -15,7 +15,7 @@ class JoinLeaveLogs(LoggingBase):
 
     @commands.Cog.listener('on_invite_update')
     async def logger_on_member_join(self, member: discord.Member, invite: typing.Optional[discord.Invite]):
-        if member.guild.id not in self.bot.log_channels or not self.bot.guild_loggings[member.guild.id].member_join:
+        if not self.bot.log_routes.enabled(member.guild.id, 'member_join'):
             return
         embed = discord.Embed(title='Member joined', colour=discord.Colour.green(), timestamp=discord.utils.utcnow(),
                               description=f'{member.mention} | {member.guild.member_count} to join.'
@@ -31,7 +31,7 @@ class JoinLeaveLogs(LoggingBase):
 
     @commands.Cog.listener('on_member_remove')
     async def logger_on_member_remove(self, member: discord.Member):
-        if member.guild.id not in self.bot.log_channels or not self.bot.guild_loggings[member.guild.id].member_leave:
+        if not self.bot.log_routes.enabled(member.guild.id, 'member_leave'):
             return
         embed = discord.Embed(color=discord.Colour(0xF4D58C), title='Member left',
                               description=f"**Created at:** {discord.utils.format_dt(member.created_at)} ({discord.utils.format_dt(member.created_at, 'R')})"
@@ -46,7 +46,7 @@ class JoinLeaveLogs(LoggingBase):
 
     @commands.Cog.listener('on_invite_create')
     async def logger_on_invite_create(self, invite: discord.Invite):
-        if invite.guild.id not in self.bot.log_channels or not self.bot.guild_loggings[invite.guild.id].invite_create:
+        if not self.bot.log_routes.enabled(invite.guild.id, 'invite_create'):
             return
         embed = discord.Embed(title='Invite Created', colour=discord.Colour.fuchsia(), timestamp=discord.utils.utcnow(),
                               description=f"**Inviter:** {invite.inviter}{f' ({invite.inviter.id})' if invite.inviter else ''}\n"
@@ -62,7 +62,7 @@ class JoinLeaveLogs(LoggingBase):
 
     @commands.Cog.listener('on_invite_delete')
     async def logger_on_invite_delete(self, invite: discord.Invite):
-        if invite.guild.id not in self.bot.log_channels or not self.bot.guild_loggings[invite.guild.id].invite_delete:
+        if not self.bot.log_routes.enabled(invite.guild.id, 'invite_delete'):
             return
         embed = discord.Embed(title='Invite Deleted', colour=discord.Colour.fuchsia(), timestamp=discord.utils.utcnow(),
                               description=f"**Inviter:** {invite.inviter}{f' ({invite.inviter.id})' if invite.inviter else ''}\n"
@@ -1,18 +1,61 @@
-import asyncio
+import typing
 
 import discord
 from discord.ext import commands
 
 from ._base import LoggingBase
 
+# how long member updates are collected before they're logged as one
+MEMBER_UPDATE_WINDOW = 2
+
 
 class MemberLogs(LoggingBase):
 
+    def __init__(self, bot):
+        super().__init__(bot)
+        # (guild id, member id) -> [first before, latest after, timer]
+        self.pending_member_updates: typing.Dict[typing.Tuple[int, int], list] = {}
+        self.member_updates_received = 0
+        self.member_updates_folded = 0
+
+    def cog_unload(self) -> None:
+        for key, (_, _, timer) in list(self.pending_member_updates.items()):
+            timer.cancel()
+            self.schedule_member_update_flush(key)
+        super().cog_unload()
+
     @commands.Cog.listener('on_member_update')
     async def logger_on_member_update(self, before: discord.Member, after: discord.Member):
-        if before.guild.id not in self.bot.log_channels or not self.bot.guild_loggings[after.guild.id].member_update:
+        if not self.bot.log_routes.enabled(before.guild.id, 'member_update'):
+            return
+        self.member_updates_received += 1
+        key = (after.guild.id, after.id)
+        pending = self.pending_member_updates.get(key)
+
+        if pending is not None:
+            # already waiting on an earlier update, the embed shows the first before against the latest after
+            pending[1] = after
+            self.member_updates_folded += 1
+            return
+
+        timer = self.bot.loop.call_later(MEMBER_UPDATE_WINDOW, self.schedule_member_update_flush, key)
+        self.pending_member_updates[key] = [before, after, timer]
+
+    def schedule_member_update_flush(self, key: typing.Tuple[int, int]):
+        # run like an event, so anything that goes wrong ends up in on_error
+        self.bot._schedule_event(self.flush_member_update, 'logger_member_update_flush', key)
+
+    async def flush_member_update(self, key: typing.Tuple[int, int]):
+        pending = self.pending_member_updates.get(key)
+        if pending is None:
+            # already flushed, the timer and cog_unload can both get here
             return
-        await asyncio.sleep(1)
+        try:
+            self.log_member_update(pending[0], pending[1])
+        finally:
+            self.pending_member_updates.pop(key, None)
+
+    def log_member_update(self, before: discord.Member, after: discord.Member):
         embed = discord.Embed(title='Member Updated', colour=discord.Colour.blurple(), timestamp=discord.utils.utcnow())
         embed.set_author(name=str(after), icon_url=after.display_avatar.url)
         embed.set_footer(text=f'User ID: {after.id}')
@@ -44,7 +87,7 @@ class MemberLogs(LoggingBase):
             if add:
                 embed.add_field(name='Roles updated:', inline=False,
                                 value=f"{added}\n{removed}")
-            deliver = True
+                deliver = True
         if before.nick != after.nick:
             embed.add_field(name='Nickname updated:', inline=False,
                             value=f"**Before:** {discord.utils.escape_markdown(str(before.nick))}"
@@ -53,11 +96,35 @@ class MemberLogs(LoggingBase):
         if deliver:
             self.log(embed, guild=after.guild, send_to=self.send_to.member)
 
+    # keeping log_routes.members in sync, on_user_update only looks there
+
+    @commands.Cog.listener('on_ready')
+    async def logger_index_members(self):
+        for guild_id in self.bot.log_routes.routes:
+            self.bot.log_routes.members.index_guild(guild_id)
+
+    @commands.Cog.listener('on_guild_available')
+    async def logger_index_guild(self, guild: discord.Guild):
+        if guild.id in self.bot.log_routes:
+            self.bot.log_routes.members.index_guild(guild.id)
+
+    @commands.Cog.listener('on_guild_remove')
+    async def logger_unindex_guild(self, guild: discord.Guild):
+        self.bot.log_routes.members.drop_guild(guild.id, guild)
+
+    @commands.Cog.listener('on_member_join')
+    async def logger_index_member(self, member: discord.Member):
+        self.bot.log_routes.members.add(member.id, member.guild.id)
+
+    @commands.Cog.listener('on_member_remove')
+    async def logger_unindex_member(self, member: discord.Member):
+        self.bot.log_routes.members.remove(member.id, member.guild.id)
+
     @commands.Cog.listener('on_user_update')
     async def logger_on_user_update(self, before: discord.User, after: discord.User):
         if after.id == self.bot.user.id:
             return
-        guilds = [g.id for g in before.mutual_guilds if g.id in self.bot.log_channels]
+        guilds = self.bot.log_routes.members.get(after.id)
         if not guilds:
             return
         deliver = False
@@ -86,12 +153,12 @@ class MemberLogs(LoggingBase):
             deliver = True
         if deliver:
             for g in guilds:
-                if self.bot.guild_loggings[g].member_update:
+                if self.bot.log_routes.enabled(g, 'member_update'):
                     self.log(embed, guild=g, send_to=self.send_to.member)
 
     @commands.Cog.listener('on_member_ban')
     async def logger_on_member_ban(self, guild: discord.Guild, user: discord.User):
-        if guild.id not in self.bot.log_channels or not self.bot.guild_loggings[guild.id].user_ban:
+        if not self.bot.log_routes.enabled(guild.id, 'user_ban'):
             return
         embed = discord.Embed(title='User Banned', colour=discord.Colour.red(), timestamp=discord.utils.utcnow(),
                               description=f"**Account Created:** {discord.utils.format_dt(user.created_at)} ({discord.utils.format_dt(user.created_at, style='R')})")
@@ -101,7 +168,7 @@ class MemberLogs(LoggingBase):
 
     @commands.Cog.listener('on_member_unban')
     async def logger_on_member_unban(self, guild: discord.Guild, user: discord.User):
-        if guild.id not in self.bot.log_channels or not self.bot.guild_loggings[guild.id].user_unban:
+        if not self.bot.log_routes.enabled(guild.id, 'user_unban'):
             return
         embed = discord.Embed(title='User Unbanned', colour=discord.Colour.blurple(), timestamp=discord.utils.utcnow(),
                               description=f"**Account Created:** {discord.utils.format_dt(user.created_at)} ({discord.utils.format_dt(user.created_at, style='R')})")
@@ -1,6 +1,7 @@
 import discord
 
 from ._base import LoggingBase
+from helpers.transcript import PurgeTranscript
 from discord.ext import commands
 
 
@@ -8,9 +9,9 @@ class MessageLogs(LoggingBase):
 
     @commands.Cog.listener('on_message_delete')
     async def logger_on_message_delete(self, message: discord.Message) -> None:
-        if message.author.bot or not message.guild or message.guild.id not in self.bot.log_channels or not self.bot.guild_loggings[message.guild.id].message_delete:
+        if message.author.bot or not message.guild or not self.bot.log_routes.enabled(message.guild.id, 'message_delete'):
             return
-        if message.guild.id in self.bot.log_channels:
+        if message.guild.id in self.bot.log_routes:
             embed = discord.Embed(title=f'Message deleted in #{message.channel}',
                                   description=(message.content or '\u200b')[0:4000],
                                   colour=discord.Colour.red(), timestamp=discord.utils.utcnow())
@@ -22,40 +23,60 @@ class MessageLogs(LoggingBase):
                 embed.add_field(name='Stickers:', value='\n'.join([a.name for a in message.stickers]), inline=False)
             self.log(embed, guild=message.guild, send_to=self.send_to.message)
 
+    @commands.Cog.listener('on_raw_message_delete')
+    async def logger_on_raw_message_delete(self, payload: discord.RawMessageDeleteEvent) -> None:
+        # on_message_delete handles the ones discord.py still had cached
+        if payload.cached_message or not payload.guild_id or not self.bot.log_routes.enabled(payload.guild_id, 'message_delete'):
+            return
+        snapshot = self.bot.message_snapshots.get(payload.channel_id, payload.message_id)
+        if snapshot is None:
+            return
+        channel = self.bot.get_channel(payload.channel_id)
+        member = getattr(channel, 'guild', None) and channel.guild.get_member(snapshot.author_id)
+        embed = discord.Embed(title=f'Message deleted in #{channel}',
+                              description=(snapshot.content or '\u200b')[0:4000],
+                              colour=discord.Colour.red(), timestamp=discord.utils.utcnow())
+        embed.set_author(name=snapshot.author, icon_url=member.display_avatar.url if member else discord.Embed.Empty)
+        embed.set_footer(text=f"Channel: {payload.channel_id}")
+        if snapshot.attachments:
+            embed.add_field(name='Attachments:', value='\n'.join(snapshot.attachments), inline=False)
+        self.log(embed, guild=payload.guild_id, send_to=self.send_to.message)
+
     @commands.Cog.listener('on_raw_bulk_message_delete')
     async def logger_on_raw_bulk_message_delete(self, payload: discord.RawBulkMessageDeleteEvent):
-        if not payload.guild_id or payload.guild_id not in self.bot.log_channels or not self.bot.guild_loggings[payload.guild_id].message_purge:
+        if not payload.guild_id or not self.bot.log_routes.enabled(payload.guild_id, 'message_purge'):
             return
-        embed = discord.Embed(title=f'{len(payload.message_ids)} messages purged in #{self.bot.get_channel(payload.channel_id)}',
+        channel = self.bot.get_channel(payload.channel_id)
+        embed = discord.Embed(title=f'{len(payload.message_ids)} messages purged in #{channel}',
                               colour=discord.Colour.red(), timestamp=discord.utils.utcnow())
-        msgs = []
-        for message in payload.cached_messages:
-            if message.author.bot:
-                continue
-            if message.attachments:
-                attachment = f'{len(message.attachments)} attachments: ' + message.attachments[0].filename
-            elif message.stickers:
-                attachment = 'Sticker: ' + message.stickers[0].name
+        transcript = PurgeTranscript()
+        cached = {message.id: message for message in payload.cached_messages}
+        for message_id in sorted(payload.message_ids):
+            if message_id in cached:
+                transcript.add(cached[message_id])
+            elif snapshot := self.bot.message_snapshots.get(payload.channel_id, message_id):
+                transcript.add_snapshot(snapshot)
             else:
-                attachment = None
-            message = f"{discord.utils.remove_markdown(str(message.author))} > {message.content or attachment or '-'}"
-            if len(message) > 200:
-                message = message[0:200] + '...'
-            msgs.append(message)
-            if len('\n'.join(msgs)[0:4096]) > 4000:
-                break
-        embed.description = '\n'.join(msgs)[0:4000]
-        embed.add_field(name='Showing: ', value=f"{len(msgs)}/{len(payload.message_ids)} messages.", inline=False)
+                transcript.add_missing(message_id)
+        embed.description = transcript.description()
+        embed.add_field(name='Showing: ', value=f"{len(transcript.preview)}/{len(payload.message_ids)} messages.", inline=False)
         embed.set_footer(text=f'Channel: {payload.channel_id}')
-        self.log(embed, guild=payload.guild_id, send_to=self.send_to.message)
+
+        header = f"{len(payload.message_ids)} messages purged in #{channel} ({payload.channel_id}), " \
+                 f"{transcript.cached} cached, {transcript.snapshots} from snapshots, {transcript.missing} not cached:\n"
+        file = transcript.file(f'purge-{payload.channel_id}', header=header)
+        embed.add_field(name='Transcript: ', value=f"All {len(transcript)} messages are in the attached file"
+                                                   f"{f' ({transcript.missing} only by ID)' if transcript.missing else ''}.",
+                        inline=False)
+        self.log(embed, guild=payload.guild_id, send_to=self.send_to.message, file=file)
 
     @commands.Cog.listener('on_message_edit')
     async def logger_on_message_edit(self, before: discord.Message, after: discord.Message):
-        if before.author.bot or not before.guild or before.guild.id not in self.bot.log_channels or not self.bot.guild_loggings[after.guild.id].message_edit:
+        if before.author.bot or not before.guild or not self.bot.log_routes.enabled(before.guild.id, 'message_edit'):
             return
-        if not self.bot.guild_loggings[before.guild.id].message_edit:
+        if not self.bot.log_routes.enabled(before.guild.id, 'message_edit'):
             return
-        if before.guild.id in self.bot.log_channels:
+        if before.guild.id in self.bot.log_routes:
             if before.content == after.content and before.attachments == after.attachments and before.stickers == after.stickers:
                 return
             embed = discord.Embed(title=f'Message edited in #{before.channel}',
@@ -76,3 +97,31 @@ class MessageLogs(LoggingBase):
                 embed.add_field(name='Attachments:', value='\n'.join(attachments), inline=False)
             embed.add_field(name='Jump:', value=f'[[Jump to message]]({after.jump_url})', inline=False)
             self.log(embed, guild=before.guild, send_to=self.send_to.message)
+
+    @commands.Cog.listener('on_raw_message_edit')
+    async def logger_on_raw_message_edit(self, payload: discord.RawMessageUpdateEvent):
+        snapshot = self.bot.message_snapshots.get(payload.channel_id, payload.message_id)
+        if snapshot is None:
+            return
+        before_content, before_attachments = snapshot.content, snapshot.attachments
+        self.bot.message_snapshots.edit(payload.channel_id, payload.message_id, payload.data)
+
+        # on_message_edit handles the ones discord.py still had cached
+        if payload.cached_message or not self.bot.log_routes.enabled(snapshot.guild_id, 'message_edit'):
+            return
+        if before_content == snapshot.content and before_attachments == snapshot.attachments:
+            return
+        channel = self.bot.get_channel(payload.channel_id)
+        member = getattr(channel, 'guild', None) and channel.guild.get_member(snapshot.author_id)
+        embed = discord.Embed(title=f'Message edited in #{channel}',
+                              colour=discord.Colour.blurple(), timestamp=discord.utils.utcnow())
+        embed.set_author(name=snapshot.author, icon_url=member.display_avatar.url if member else discord.Embed.Empty)
+        embed.set_footer(text=f"Channel: {payload.channel_id}")
+
+        embed.add_field(name='**__Before:__**', value=before_content[0:1024], inline=False)
+        embed.add_field(name='**__After:__**', value=snapshot.content[0:1024], inline=False)
+        if before_attachments and before_attachments != snapshot.attachments:
+            attachments = [a if a in snapshot.attachments else f"[Removed] ~~{a}~~" for a in before_attachments]
+            embed.add_field(name='Attachments:', value='\n'.join(attachments), inline=False)
+        embed.add_field(name='Jump:', value=f'[[Jump to message]]({snapshot.jump_url})', inline=False)
+        self.log(embed, guild=snapshot.guild_id, send_to=self.send_to.message)
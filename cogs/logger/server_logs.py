@@ -14,7 +14,7 @@ class ServerLogs(LoggingBase):
 
     @commands.Cog.listener('on_guild_channel_delete')
     async def logger_on_guild_channel_delete(self, channel: guild_channels):
-        if not channel.guild or channel.guild.id not in self.bot.log_channels or not self.bot.guild_loggings[channel.guild.id].channel_delete:
+        if not channel.guild or not self.bot.log_routes.enabled(channel.guild.id, 'channel_delete'):
             return
 
         embed = discord.Embed(title=f'{channel.type} channel deleted.'.title(),
@@ -28,7 +28,7 @@ class ServerLogs(LoggingBase):
 
     @commands.Cog.listener('on_guild_channel_create')
     async def logger_on_guild_channel_create(self, channel: guild_channels):
-        if channel.guild.id not in self.bot.log_channels:
+        if channel.guild.id not in self.bot.log_routes:
             return
         embed = discord.Embed(title=f'{channel.type} channel Created'.title(),
                               description=f"**Name:** #{channel.name}"
@@ -47,7 +47,7 @@ class ServerLogs(LoggingBase):
 
     @commands.Cog.listener('on_guild_channel_update')
     async def logger_on_guild_channel_update(self, before: guild_channels, after: guild_channels):
-        if before.guild.id not in self.bot.log_channels or not self.bot.guild_loggings[after.guild.id].channel_delete:
+        if not self.bot.log_routes.enabled(before.guild.id, 'channel_delete'):
             return
         deliver = False
         embed = discord.Embed(title=f'{before.type} channel updated'.title(), description=f'**Name:** #{after.name}\n**Category:** {getattr(after.category, "name", "no category")}',
@@ -82,7 +82,7 @@ class ServerLogs(LoggingBase):
 
     @commands.Cog.listener('on_guild_update')
     async def logger_on_guild_update(self, before: discord.Guild, after: discord.Guild):
-        if before.id not in self.bot.log_channels or not self.bot.guild_loggings[after.id].server_update:
+        if not self.bot.log_routes.enabled(before.id, 'server_update'):
             return
         if before.icon != after.icon:
             if after.icon and before.icon:
@@ -111,7 +111,7 @@ class ServerLogs(LoggingBase):
 
     @commands.Cog.listener('on_guild_role_create')
     async def logger_on_guild_role_create(self, role: discord.Role):
-        if role.guild.id not in self.bot.log_channels or not self.bot.guild_loggings[role.guild.id].role_create:
+        if not self.bot.log_routes.enabled(role.guild.id, 'role_create'):
             return
         embed = discord.Embed(title='New Role Created', timestamp=discord.utils.utcnow(), colour=discord.Colour.green(),
                               description=f"**Name:** {role.name}\n"
@@ -124,7 +124,7 @@ class ServerLogs(LoggingBase):
 
     @commands.Cog.listener('on_guild_role_delete')
     async def logger_on_guild_role_delete(self, role: discord.Role):
-        if role.guild.id not in self.bot.log_channels or not self.bot.guild_loggings[role.guild.id].role_delete:
+        if not self.bot.log_routes.enabled(role.guild.id, 'role_delete'):
             return
         embed = discord.Embed(title='Role Deleted', timestamp=discord.utils.utcnow(), colour=discord.Colour.red(),
                               description=f"**Name:** {role.name}\n"
@@ -139,7 +139,7 @@ class ServerLogs(LoggingBase):
 
     @commands.Cog.listener('on_guild_role_update')
     async def logger_on_guild_role_update(self, before: discord.Role, after: discord.Role):
-        if before.guild.id not in self.bot.log_channels or not self.bot.guild_loggings[after.guild.id].role_edit:
+        if not self.bot.log_routes.enabled(before.guild.id, 'role_edit'):
             return
         embed = discord.Embed(title='Role Updated', timestamp=discord.utils.utcnow(), colour=discord.Colour.blurple())
         deliver = False
@@ -199,19 +199,19 @@ class ServerLogs(LoggingBase):
 
     @commands.Cog.listener('on_guild_emojis_update')
     async def logger_on_guild_emojis_update(self, guild: discord.Guild, before: typing.Sequence[discord.Emoji], after: typing.Sequence[discord.Emoji]):
-        if guild.id not in self.bot.log_channels:
+        if guild.id not in self.bot.log_routes:
             return
         added = [e for e in after if e not in before]
         removed = [e for e in before if e not in after]
         for emoji in added:
-            if not self.bot.guild_loggings[guild.id].emoji_create:
+            if not self.bot.log_routes.enabled(guild.id, 'emoji_create'):
                 break
             embed = discord.Embed(title='Emoji Created', colour=discord.Colour.green(), timestamp=discord.utils.utcnow(),
                                   description=f"{emoji} - [{emoji.name}]({emoji.url})")
             embed.set_footer(text=f"Emoji ID: {emoji.id}")
             self.log(embed, guild=guild, send_to=self.send_to.server)
         for emoji in removed:
-            if not self.bot.guild_loggings[guild.id].emoji_delete:
+            if not self.bot.log_routes.enabled(guild.id, 'emoji_delete'):
                 break
             embed = discord.Embed(title='Emoji Deleted', colour=discord.Colour.red(), timestamp=discord.utils.utcnow(),
                                   description=f"{emoji.name}"
@@ -221,7 +221,7 @@ class ServerLogs(LoggingBase):
 
         existent = set.union(set(after) - set(added), set(before) - set(removed))
         for emoji in existent:
-            if not self.bot.guild_loggings[guild.id].emoji_update:
+            if not self.bot.log_routes.enabled(guild.id, 'emoji_update'):
                 break
             before_emoji = discord.utils.get(before, id=emoji.id)
             after_emoji = emoji
@@ -231,7 +231,7 @@ class ServerLogs(LoggingBase):
     def emoji_update(self, guild: discord.Guild, before: discord.Emoji, after: discord.Emoji):
         if before.name == after.name and before.roles == after.roles:
             return
-        if not self.bot.guild_loggings[guild.id].emoji_update:
+        if not self.bot.log_routes.enabled(guild.id, 'emoji_update'):
             return
         embed = discord.Embed(title='Emoji Updated', colour=discord.Colour.blurple(), timestamp=discord.utils.utcnow(), description=f'{str(after)} | [{after.name}]({after.url})')
         embed.set_footer(text=f"Emoji ID: {after.id}")
@@ -253,12 +253,12 @@ class ServerLogs(LoggingBase):
 
     @commands.Cog.listener('on_guild_stickers_update')
     async def logger_on_guild_stickers_update(self, guild: discord.Guild, before: typing.Sequence[discord.Sticker], after: typing.Sequence[discord.Sticker]):
-        if guild.id not in self.bot.log_channels:
+        if guild.id not in self.bot.log_routes:
             return
         added = [s for s in after if s not in before]
         removed = [s for s in before if s not in after]
         for sticker in added:
-            if not self.bot.guild_loggings[guild.id].sticker_create:
+            if not self.bot.log_routes.enabled(guild.id, 'sticker_create'):
                 break
             embed = discord.Embed(title='Sticker Created', colour=discord.Colour.green(), timestamp=discord.utils.utcnow(),
                                   description=f"[{sticker.name}]({sticker.url})")
@@ -267,7 +267,7 @@ class ServerLogs(LoggingBase):
             embed.set_footer(text=f"Sticker ID: {sticker.id}")
             self.log(embed, guild=guild, send_to=self.send_to.server)
         for sticker in removed:
-            if not self.bot.guild_loggings[guild.id].sticker_delete:
+            if not self.bot.log_routes.enabled(guild.id, 'sticker_delete'):
                 break
             embed = discord.Embed(title='Sticker Deleted', colour=discord.Colour.red(), timestamp=discord.utils.utcnow(),
                                   description=f"{sticker.name}"
@@ -279,7 +279,7 @@ class ServerLogs(LoggingBase):
 
         existent = set.union(set(after) - set(added), set(before) - set(removed))
         for sticker in existent:
-            if not self.bot.guild_loggings[guild.id].sticker_update:
+            if not self.bot.log_routes.enabled(guild.id, 'sticker_update'):
                 break
             before_sticker = discord.utils.get(before, id=sticker.id)
             after_sticker = sticker
@@ -289,7 +289,7 @@ class ServerLogs(LoggingBase):
     def sticker_update(self, guild: discord.Guild, before: discord.Sticker, after: discord.Sticker):
         if before.description == after.description and before.name == after.name:
             return
-        if not self.bot.guild_loggings[guild.id].sticker_update:
+        if not self.bot.log_routes.enabled(guild.id, 'sticker_update'):
             return
         embed = discord.Embed(title='Sticker Updated', colour=discord.Colour.blurple(), timestamp=discord.utils.utcnow(),
                               description=f"[{after.name}]({after.url})")
@@ -14,28 +14,28 @@ class VoiceLogs(LoggingBase):
 
     @commands.Cog.listener('on_voice_state_update')
     async def logger_on_voice_state_update(self, member: discord.Member, before: discord.VoiceState, after: discord.VoiceState):
-        if member.guild.id not in self.bot.log_channels:
+        if member.guild.id not in self.bot.log_routes:
             return
-        if before.channel and after.channel and before.channel != after.channel and self.bot.guild_loggings[member.guild.id].voice_move:
+        if before.channel and after.channel and before.channel != after.channel and self.bot.log_routes.enabled(member.guild.id, 'voice_move'):
             embed = discord.Embed(title='Member moved voice channels:', colour=discord.Colour.blurple(), timestamp=discord.utils.utcnow(),
                                   description=f"**From:** {before.channel.mention} ({after.channel.id})"
                                               f"\n**To:** {after.channel.mention} ({after.channel.id})")
             embed.set_author(name=str(member), icon_url=member.display_avatar.url)
             embed.set_footer(text=f"Member ID: {member.id}")
             self.log(embed, guild=member.guild, send_to=self.send_to.voice)
-        if not before.channel and after.channel and self.bot.guild_loggings[member.guild.id].voice_join:
+        if not before.channel and after.channel and self.bot.log_routes.enabled(member.guild.id, 'voice_join'):
             embed = discord.Embed(title='Member joined a voice channel:', colour=discord.Colour.green(), timestamp=discord.utils.utcnow(),
                                   description=f"**Joined:** {after.channel.mention} ({after.channel.id})")
             embed.set_author(name=str(member), icon_url=member.display_avatar.url)
             embed.set_footer(text=f"Member ID: {member.id}")
             self.log(embed, guild=member.guild, send_to=self.send_to.voice)
-        if before.channel and not after.channel and self.bot.guild_loggings[member.guild.id].voice_leave:
+        if before.channel and not after.channel and self.bot.log_routes.enabled(member.guild.id, 'voice_leave'):
             embed = discord.Embed(title='Member left a voice channel:', colour=discord.Colour.red(), timestamp=discord.utils.utcnow(),
                                   description=f"**Left:** {before.channel.mention} ({before.channel.id})")
             embed.set_author(name=str(member), icon_url=member.display_avatar.url)
             embed.set_footer(text=f"Member ID: {member.id}")
             self.log(embed, guild=member.guild, send_to=self.send_to.voice)
-        if not self.bot.guild_loggings[member.guild.id].voice_mod:
+        if not self.bot.log_routes.enabled(member.guild.id, 'voice_mod'):
             return
         if before.deaf != after.deaf:
             if after.deaf:
@@ -62,7 +62,7 @@ class VoiceLogs(LoggingBase):
 
     @commands.Cog.listener('on_stage_instance_create')
     async def logger_on_stage_instance_create(self, stage_instance: discord.StageInstance):
-        if stage_instance.guild.id not in self.bot.log_channels or not self.bot.guild_loggings[stage_instance.guild.id].stage_open:
+        if not self.bot.log_routes.enabled(stage_instance.guild.id, 'stage_open'):
             return
         embed = discord.Embed(title='Stage opened', colour=discord.Colour.teal(), timestamp=discord.utils.utcnow(),
                               description=f"**Channel** <#{stage_instance.channel_id}> ({stage_instance.channel_id})\n"
@@ -74,7 +74,7 @@ class VoiceLogs(LoggingBase):
 
     @commands.Cog.listener('on_stage_instance_delete')
     async def logger_on_stage_instance_delete(self, stage_instance: discord.StageInstance):
-        if stage_instance.guild.id not in self.bot.log_channels or not self.bot.guild_loggings[stage_instance.guild.id].stage_close:
+        if not self.bot.log_routes.enabled(stage_instance.guild.id, 'stage_close'):
             return
         embed = discord.Embed(title='Stage closed', colour=discord.Colour.dark_teal(), timestamp=discord.utils.utcnow(),
                               description=f"**Channel** <#{stage_instance.channel_id}> ({stage_instance.channel_id})\n"
@@ -1,4 +1,5 @@
 import re
+import os
 import yaml
 import errors
 import random
@@ -8,8 +9,8 @@ import contextlib
 from discord.ext import commands
 from helpers.context import CustomContext
 
-with open(r'/root/stealthbot/config.yaml') as file:
-    full_yaml = yaml.load(file)
+with open(os.environ.get('STEALTHBOT_CONFIG', r'/root/stealthbot/config.yaml')) as file:
+    full_yaml = yaml.safe_load(file)
 yaml_data = full_yaml
 
 def main(string):
@@ -236,10 +237,7 @@ class Misc(commands.Cog):
 
         if new not in old:
             old.append(new)
-            await self.bot.db.execute("INSERT INTO guilds(guild_id, prefix) VALUES ($1, $2) ON CONFLICT (guild_id) DO UPDATE SET prefix = $2",
-                                         ctx.guild.id, old)
-
-            self.bot.prefixes[ctx.guild.id] = old
+            await self.bot.guild_settings.set(ctx.guild.id, prefix=old)
 
             return await ctx.send(f"Successfully added `{new}` to the prefixes.\nMy prefixes are: `{'`, `'.join(old)}`")
 
@@ -256,10 +254,7 @@ class Misc(commands.Cog):
 
         if prefix in old:
             old.remove(prefix)
-            await self.bot.db.execute("INSERT INTO guilds(guild_id, prefix) VALUES ($1, $2) ON CONFLICT (guild_id) DO UPDATE SET prefix = $2",
-                                         ctx.guild.id, old)
-
-            self.bot.prefixes[ctx.guild.id] = old
+            await self.bot.guild_settings.set(ctx.guild.id, prefix=old)
 
             if prefix == "sb!":
                 return await ctx.send("You can't remove that prefix!")
@@ -278,9 +273,7 @@ class Misc(commands.Cog):
         help="Clears the bot's prefixes",
         aliases=['c', 'deleteall'])
     async def prefixes_clear(self, ctx: CustomContext) -> discord.Message:
-        await self.bot.db.execute("INSERT INTO guilds(guild_id, prefix) VALUES ($1, $2) ON CONFLICT (guild_id) DO UPDATE SET prefix = $2",
-                                     ctx.guild.id, None)
-        self.bot.prefixes[ctx.guild.id] = self.bot.PRE
+        await self.bot.guild_settings.set(ctx.guild.id, prefix=None)
 
         return await ctx.send("Cleared prefixes!")
 
@@ -302,12 +295,12 @@ class Misc(commands.Cog):
     @commands.command()
     @commands.cooldown(1, 5, commands.BucketType.member)
     async def verify(self, ctx: CustomContext) -> discord.Message:
-        record = await self.bot.db.fetchrow("SELECT * FROM guilds WHERE guild_id = $1", ctx.guild.id)
+        settings = await self.bot.guild_settings.get(ctx.guild.id)
 
-        if not record['verify_role_id']:
+        if not settings.verify_role_id:
             return await ctx.send(f"This server doesn't have a verify role. To set it do `{ctx.prefix}verifyrole set <role>`")
 
-        role = ctx.guild.get_role(record['verify_role_id'])
+        role = ctx.guild.get_role(settings.verify_role_id)
 
         def check(m):
             return m.author.id == ctx.author.id and m.guild.id == ctx.guild.id and m.channel.id == ctx.channel.id
@@ -1,11 +1,13 @@
 import errors
+import typing
+import asyncio
 import discord
 import datetime
 
 from helpers import helpers
 from helpers import time_inputs
 from ._base import ModerationBase
-from discord.ext import commands, tasks
+from discord.ext import commands
 from helpers.context import CustomContext
 
 def ensure_muterole(*, required: bool = True):
@@ -14,7 +16,7 @@ def ensure_muterole(*, required: bool = True):
             raise commands.BadArgument('Only servers can have mute roles')
         if not required:
             return True
-        if not (role := await ctx.bot.db.fetchval('SELECT muted_role_id FROM guilds WHERE guild_id = $1', ctx.guild.id)):
+        if not (role := (await ctx.bot.guild_settings.get(ctx.guild.id)).muted_role_id):
             raise commands.BadArgument('This server has no mute role set')
         if not (role := ctx.guild.get_role(role)):
             raise commands.BadArgument("It seems like I could not find this server's mute role. Was it deleted?")
@@ -27,7 +29,7 @@ def ensure_muterole(*, required: bool = True):
 async def muterole(ctx) -> discord.Role:
     if not ctx.guild:
         raise commands.BadArgument('Only servers can have mute roles')
-    if not (role := await ctx.bot.db.fetchval('SELECT muted_role_id FROM guilds WHERE guild_id = $1', ctx.guild.id)):
+    if not (role := (await ctx.bot.guild_settings.get(ctx.guild.id)).muted_role_id):
         raise commands.BadArgument('This server has no mute role set')
     if not (role := ctx.guild.get_role(role)):
         raise commands.BadArgument("It seems like I could not find this server's mute role. Was it deleted?")
@@ -39,54 +41,38 @@ class Mute(ModerationBase):
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        self.temporary_mutes.start()
+        self.bot.timers.register('mute', 'temporary_mutes', ('guild_id', 'member_id'), self.expire_mutes)
 
     def cog_unload(self):
-        self.temporary_mutes.cancel()
-
-    @tasks.loop()
-    async def temporary_mutes(self):
-        # if you don't care about keeping records of old tasks, remove this WHERE and change the UPDATE to DELETE
-        next_task = await self.bot.db.fetchrow('SELECT * FROM temporary_mutes ORDER BY end_time LIMIT 1')
-        # if no remaining tasks, stop the loop
-        if next_task is None:
-            self.temporary_mutes.cancel()
-            return
-
-        await discord.utils.sleep_until(next_task['end_time'])
-
-        guild: discord.Guild = self.bot.get_guild(next_task['guild_id'])
-
-        if guild:
+        self.bot.timers.unregister('mute')
 
-            mute_role = await self.bot.db.fetchval('SELECT muted_role_id FROM guilds WHERE guild_id = $1',
-                                                      next_task['guild_id'])
-            if mute_role:
+    async def expire_mutes(self, timers):
+        by_guild = {}
+        for timer in timers:
+            by_guild.setdefault(timer.key[0], []).append(timer.key[1])
 
-                role = guild.get_role(int(mute_role))
-                if isinstance(role, discord.Role):
+        await asyncio.gather(*(self.unmute_expired(guild_id, member_ids) for guild_id, member_ids in by_guild.items()))
 
-                    if not role > guild.me.top_role:
-                        try:
-                            member = (guild.get_member(next_task['member_id']) or
-                                      await guild.fetch_member(next_task['member_id']))
-                            if member:
-                                await member.remove_roles(role)
-                        except(discord.Forbidden, discord.HTTPException):
-                            pass
+    async def unmute_expired(self, guild_id: int, member_ids: typing.List[int]):
+        guild: discord.Guild = self.bot.get_guild(guild_id)
+        if not guild:
+            return
 
-        await self.bot.db.execute('DELETE FROM temporary_mutes WHERE (guild_id, member_id) = ($1, $2)',
-                                     next_task['guild_id'], next_task['member_id'])
+        mute_role = (await self.bot.guild_settings.get(guild_id)).muted_role_id
+        if not mute_role:
+            return
 
-    @temporary_mutes.before_loop
-    async def wait_for_bot_ready(self):
-        await self.bot.wait_until_ready()
+        role = guild.get_role(int(mute_role))
+        if not isinstance(role, discord.Role) or role > guild.me.top_role:
+            return
 
-    def mute_task(self):
-        if self.temporary_mutes.is_running():
-            self.temporary_mutes.restart()
-        else:
-            self.temporary_mutes.start()
+        for member_id in member_ids:
+            try:
+                member = guild.get_member(member_id) or await guild.fetch_member(member_id)
+                if member:
+                    await member.remove_roles(role)
+            except(discord.Forbidden, discord.HTTPException):
+                pass
 
     @commands.command(
         help="Mutes the specified member forever.",
@@ -120,10 +106,7 @@ class Mute(ModerationBase):
                                reason=f"Muted by {ctx.author} ({ctx.author.id}) {f'for: {reason}' if reason else ''}"[
                                       0:500])
 
-        await self.bot.db.execute("DELETE FROM temporary_mutes WHERE (guild_id, member_id) = ($1, $2)", ctx.guild.id,
-                                     member.id)
-
-        self.mute_task()
+        await self.bot.timers.cancel('mute', (ctx.guild.id, member.id))
 
         if ctx.channel.permissions_for(role).send_messages_in_threads:
             try:
@@ -175,10 +158,7 @@ class Mute(ModerationBase):
                                   reason=f"Unmuted by {ctx.author} ({ctx.author.id}) {f'for {reason}' if reason else ''}"[
                                          0:500])
 
-        await self.bot.db.execute("DELETE FROM temporary_mutes WHERE (guild_id, member_id) = ($1, $2)", ctx.guild.id,
-                                     member.id)
-
-        self.mute_task()
+        await self.bot.timers.cancel('mute', (ctx.guild.id, member.id))
 
         embed = discord.Embed(description=f"Successfully un-muted `{member}` for `{reason}`",
                               color=discord.Color.green())
@@ -227,11 +207,8 @@ class Mute(ModerationBase):
         except discord.Forbidden:
             return await ctx.send(f"I don't seem to have permissions to add the `{role.name}` role")
 
-        await self.bot.db.execute(
-            "INSERT INTO temporary_mutes(guild_id, member_id, reason, end_time) VALUES ($1, $2, $3, $4) ON CONFLICT (guild_id, member_id) DO UPDATE SET reason = $3, end_time = $4",
-            ctx.guild.id, member.id, f"Temporary mute by {ctx.author} ({ctx.author.id})", duration.dt)
-
-        self.mute_task()
+        await self.bot.timers.schedule('mute', (ctx.guild.id, member.id), duration.dt,
+                                       reason=f"Temporary mute by {ctx.author} ({ctx.author.id})")
 
         embed = discord.Embed(description=f"Successfully temp-muted `{member}` for `{delta}`",
                               color=discord.Color.green())
@@ -272,10 +249,7 @@ class Mute(ModerationBase):
 
         else:
 
-            await self.bot.db.execute(
-                "INSERT INTO temporary_mutes(guild_id, member_id, reason, end_time) VALUES ($1, $2, $3, $4) ON CONFLICT (guild_id, member_id) DO UPDATE SET reason = $3, end_time = $4",
-                ctx.guild.id, ctx.author.id, f"Self-mute mute by {ctx.author} ({ctx.author.id})", duration.dt)
-
-            self.mute_task()
+            await self.bot.timers.schedule('mute', (ctx.guild.id, ctx.author.id), duration.dt,
+                                           reason=f"Self-mute mute by {ctx.author} ({ctx.author.id})")
 
             return await ctx.send("You've successfully been self-muted. Be sure to not bother anyone about it.")
\ No newline at end of file
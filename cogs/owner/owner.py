@@ -22,6 +22,8 @@ from discord.ext.menus.views import ViewMenuPages
 from jishaku.paginators import WrappedPaginator, PaginatorInterface
 from jishaku.codeblocks import codeblock_converter
 from helpers.context import CustomContext
+from helpers.extensions import build_manifest, load_manifest, save_manifest
+from helpers.levels import XP_MODES, XP_PER_LEVEL, split_total
 from jishaku.modules import ExtensionConverter
 import io
 import import_expression
@@ -384,6 +386,8 @@ Average: {average_latency}
 
         for extension in itertools.chain(*extensions):
             everything.append(f"{extension}")
+            # drop the lazy stubs first, otherwise the real commands clash with them
+            self.bot.lazy.discard(extension)
             method, icon = ((self.bot.reload_extension, ":repeat:") if extension in self.bot.extensions else (self.bot.load_extension, ":mailbox:"))
 
             try:
@@ -425,6 +429,110 @@ Average: {average_latency}
             embed = discord.Embed(description=f"```py\n{result}\n```")
             await ctx.send(embed=embed)
 
+    @dev.command(
+        help="Rebuilds the extension manifest used for lazy extension loading.",
+        aliases=['build_manifest', 'build-manifest'])
+    @commands.is_owner()
+    async def manifest(self, ctx: CustomContext):
+        await self.bot.lazy.load_all()
+
+        # keep entries for extensions that failed to load instead of forgetting about them
+        manifest = load_manifest()
+        manifest.update(build_manifest(self.bot))
+        save_manifest(manifest)
+
+        embed = discord.Embed(description=f"Successfully wrote the manifest for {len(manifest)} extensions.")
+
+        await ctx.send(embed=embed)
+
+    @dev.command(
+        name="logging",
+        help="Shows the logging queues: backlog and dropped events per guild, and delivery stats.",
+        aliases=['log-queues', 'logqueues'])
+    @commands.is_owner()
+    async def logging_stats(self, ctx: CustomContext, guild: typing.Optional[discord.Guild] = None):
+        queues = {guild.id: self.bot.log_cache.get(guild.id, {})} if guild else self.bot.log_cache
+        rows = []
+
+        for guild_id, caches in queues.items():
+            backlog = sum(len(queue) for queue in caches.values())
+            dropped = sum(queue.dropped for queue in caches.values())
+            if backlog or dropped or guild:
+                rows.append((guild_id, backlog, dropped))
+
+        rows.sort(key=lambda r: (r[1], r[2]), reverse=True)
+
+        lines = []
+        for guild_id, backlog, dropped in rows[:15]:
+            name = getattr(self.bot.get_guild(guild_id), 'name', guild_id)
+            lines.append(f"`{backlog:>5}` queued `{dropped:>5}` dropped - {name}")
+
+        embed = discord.Embed(title="Logging queues", description="\n".join(lines) or "Nothing queued or dropped.")
+        embed.add_field(name="Total", value=f"{sum(r[1] for r in rows)} queued\n{sum(r[2] for r in rows)} dropped")
+
+        cog = self.bot.get_cog('LoggingBackend')
+        if cog:
+            embed.add_field(name="Delivery", value=f"{cog.delivery.sent} sent\n{cog.delivery.failed} failed\n"
+                                                   f"{len(cog.delivery.workers)} workers running")
+            embed.add_field(name="Member updates", value=f"{cog.member_updates_received} received\n"
+                                                         f"{cog.member_updates_folded} folded\n"
+                                                         f"{len(cog.pending_member_updates)} pending")
+            repairs = cog.repair_stats
+            embed.add_field(name="Webhook repairs", value=f"{repairs['attempts']} attempts, {repairs['failed']} failed\n"
+                                                          f"{repairs['joined']} joined, {repairs['skipped']} backed off\n"
+                                                          f"{repairs['dropped']} embeds dropped")
+
+        pool = self.bot.webhook_pool.stats()
+        embed.add_field(name="Webhook pool", value=f"{pool['webhooks']} webhooks\n{pool['hits']} hits, "
+                                                   f"{pool['misses']} misses ({pool['hit_rate']:.1%})\n"
+                                                   f"{pool['invalidations']} invalidations")
+
+        await ctx.send(embed=embed)
+
+    @dev.command(
+        name="migrate-xp",
+        help="Converts every member's XP to the given storage mode (level or total) in one statement. "
+             "Set XP_MODE in the config and restart afterwards.",
+        aliases=['migrate_xp', 'migratexp'])
+    @commands.is_owner()
+    async def migrate_xp(self, ctx: CustomContext, mode: str):
+        mode = mode.lower()
+        if mode not in XP_MODES:
+            return await ctx.send(f"The mode has to be one of: {', '.join(XP_MODES)}")
+
+        # anything still held in memory has to be in the table before it's converted
+        await self.bot.xp.flush()
+
+        async with self.bot.db.acquire() as conn:
+            async with conn.transaction():
+                await conn.execute("ALTER TABLE users ADD COLUMN IF NOT EXISTS total_xp BIGINT NOT NULL DEFAULT 0")
+
+                if mode == 'total':
+                    # level_threshold, in bigint so big levels don't overflow
+                    status = await conn.execute(
+                        "UPDATE users SET total_xp = $1::bigint * (level - 1) * (level - 2) / 2 + xp", XP_PER_LEVEL)
+
+                else:
+                    # levels come from helpers.levels.split_total, a float sqrt in SQL can be a level off at the
+                    # boundaries of big totals
+                    rows = await conn.fetch("SELECT user_id, guild_id, total_xp FROM users FOR UPDATE")
+                    levels = [split_total(row['total_xp']) for row in rows]
+                    status = await conn.execute(
+                        "UPDATE users SET level = d.level, xp = d.xp "
+                        "FROM unnest($1::bigint[], $2::bigint[], $3::bigint[], $4::bigint[]) AS d(user_id, guild_id, level, xp) "
+                        "WHERE d.user_id = users.user_id AND d.guild_id = users.guild_id",
+                        [row['user_id'] for row in rows], [row['guild_id'] for row in rows],
+                        [level for level, _ in levels], [xp for _, xp in levels])
+
+        self.bot.ranks.guilds.clear()
+        self.bot.ranks.keys.clear()
+
+        embed = discord.Embed(description=f"Converted {status.split()[-1]} members to the `{mode}` XP mode. "
+                                          f"The bot is running in `{self.bot.xp_mode}` mode until the config says "
+                                          f"otherwise and it's restarted.")
+
+        await ctx.send(embed=embed)
+
     @dev.command(
         help="Update the bot.",
         aliases=['upd', 'gitpull', 'pull'])
@@ -17,7 +17,7 @@ class AFK(UtilityBase):
             await self.bot.db.execute(
                 "INSERT INTO afk (user_id, start_time, reason) VALUES ($1, $2, $3) ON CONFLICT (user_id) DO UPDATE SET start_time = $2, reason = $3",
                 ctx.author.id, ctx.message.created_at, reason[0:1800])
-            self.bot.afk_users[ctx.author.id] = True
+            self.bot.afk_users[ctx.author.id] = self.bot.afk_record(ctx.message.created_at, reason[0:1800])
 
             embed = discord.Embed(title=f"<:idle:872784075591675904>{ctx.author.name} is now AFK",
                                   description=f"With the reason being: {reason}")
@@ -25,23 +25,24 @@ class AFK(UtilityBase):
             await ctx.send(embed=embed)
 
         else:
-            self.bot.afk_users.pop(ctx.author.id)
+            info = (await self.bot.get_afk(ctx.author.id)).get(ctx.author.id)
+            self.bot.afk_users.pop(ctx.author.id, None)
+
+            if info is None:
+                return await ctx.send("You aren't AFK.")
 
-            info = await self.bot.db.fetchrow("SELECT * FROM afk WHERE user_id = $1", ctx.author.id)
             await self.bot.db.execute(
                 "INSERT INTO afk (user_id, start_time, reason) VALUES ($1, null, null) ON CONFLICT (user_id) DO UPDATE SET start_time = null, reason = null",
                 ctx.author.id)
 
-            start_time = info["start_time"]
-
-            delta_uptime = ctx.message.created_at - start_time
+            delta_uptime = ctx.message.created_at - info.start_time
             hours, remainder = divmod(int(delta_uptime.total_seconds()), 3600)
             minutes, seconds = divmod(remainder, 60)
             days, hours = divmod(hours, 24)
 
             embed = discord.Embed(title=f"👋 Welcome back {ctx.author.name}!", description=f"""
     You've been AFK for {ctx.time(days=int(days), hours=int(hours), minutes=int(minutes), seconds=int(seconds))}.
-    With the reason being: {info['reason']}""")
+    With the reason being: {info.reason}""")
 
             await ctx.send(embed=embed)
 
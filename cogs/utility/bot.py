@@ -1,4 +1,5 @@
 import time
+import os
 import yaml
 import discord
 
@@ -7,8 +8,8 @@ from discord.ext import commands
 from helpers.context import CustomContext
 from discord.ext.commands.cooldowns import BucketType
 
-with open(r'/root/stealthbot/config.yaml') as file:
-    full_yaml = yaml.load(file)
+with open(os.environ.get('STEALTHBOT_CONFIG', r'/root/stealthbot/config.yaml')) as file:
+    full_yaml = yaml.safe_load(file)
 
 yaml_data = full_yaml
 
@@ -187,26 +187,23 @@ class WelcomeCog(commands.Cog):
         
     @commands.Cog.listener()
     async def on_invite_update(self, member: discord.Member, invite: discord.Invite) -> None:
-        database = await self.bot.db.fetchrow("SELECT * FROM guilds WHERE guild_id = $1", member.guild.id)
+        settings = await self.bot.guild_settings.get(member.guild.id)
         
-        if not database:
+        if not settings.welcome_channel_id:
             return
         
-        if not database['welcome_channel_id']:
-            return
-        
-        if not database['welcome_message']:
+        if not settings.welcome_message:
             message = f"Welcome to **[server]**, **[full-user]**!"
             
         else:
-            message = database['welcome_message']
+            message = settings.welcome_message
 
         message = message.replace("[server]", f"{member.guild.name}")
         message = message.replace("[user]", f"{member.display_name}").replace("[full-user]", f"{member}").replace("[user-mention]", f"{member.mention}")
         message = message.replace("[count]", f"{member.guild.member_count}").replace("[ordinal-count]", f"{self.make_ordinal(member.guild.member_count)}")
         message = message.replace("[code]", f"{str(invite.code)}").replace("[full-code]", f"discord.gg/{invite.code}").replace("[full-url]", f"{str(invite.url)}").replace("[inviter]", f"{str(((member.guild.get_member(invite.inviter.id).display_name) or invite.inviter.name) if invite.inviter else 'N/A')}").replace("[full-inviter]", f"{str(invite.inviter if invite.inviter else 'N/A')}").replace("[inviter-mention]", f"{str(invite.inviter.mention if invite.inviter else 'N/A')}")
         
-        channel = self.bot.get_channel(database['welcome_channel_id'])
+        channel = self.bot.get_channel(settings.welcome_channel_id)
         
         await channel.send(message)
 
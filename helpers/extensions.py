@@ -0,0 +1,207 @@
+import sys
+import json
+import time
+import typing
+import asyncio
+import builtins
+
+from collections import defaultdict
+from discord.ext import commands
+
+MANIFEST_PATH = "data/extensions.json"
+LOCAL_MODULES = ('cogs', 'helpers', 'errors', 'musicerrors', '__main__')
+
+
+def cogs_for(bot, ext: str) -> typing.List[commands.Cog]:
+    return [cog for cog in bot.cogs.values() if cog.__module__ == ext or cog.__module__.startswith(f"{ext}.")]
+
+
+def build_manifest(bot) -> dict:
+    manifest = {}
+
+    for ext in bot.extensions:
+        cogs = cogs_for(bot, ext)
+
+        manifest[ext] = {
+            'commands': [{'name': command.name,
+                          'aliases': list(command.aliases),
+                          'help': command.help,
+                          'brief': command.brief,
+                          'hidden': command.hidden} for cog in cogs for command in cog.get_commands()],
+            'listeners': sorted({name for cog in cogs for name, _ in cog.get_listeners()} |
+                                ({'on_message'} if any(route.cog in cogs for route in bot.router.routes) else set()))
+        }
+
+    return manifest
+
+
+def load_manifest(path: str = MANIFEST_PATH) -> dict:
+    try:
+        with open(path) as file:
+            return json.load(file)
+
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def save_manifest(manifest: dict, path: str = MANIFEST_PATH) -> None:
+    with open(path, "w") as file:
+        json.dump(manifest, file, indent=4)
+
+
+class ImportProfiler:
+    """Times every first-time import made while active, grouped by top-level package.
+
+    Nested imports of other packages are subtracted, so each package is only charged for its own code."""
+
+    def __init__(self):
+        self.modules: typing.Dict[str, float] = defaultdict(float)
+        self._stack = []
+        self._original_import = None
+
+    def __enter__(self):
+        self._original_import = builtins.__import__
+        builtins.__import__ = self._import
+        return self
+
+    def __exit__(self, *exc):
+        builtins.__import__ = self._original_import
+
+    def _import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        if level or name in sys.modules:
+            return self._original_import(name, globals, locals, fromlist, level)
+
+        frame = [name.partition('.')[0], 0.0]
+        self._stack.append(frame)
+        start = time.perf_counter()
+
+        try:
+            return self._original_import(name, globals, locals, fromlist, level)
+
+        finally:
+            elapsed = time.perf_counter() - start
+            self._stack.pop()
+            self.modules[frame[0]] += elapsed - frame[1]
+
+            if self._stack:
+                self._stack[-1][1] += elapsed
+
+    def third_party(self) -> typing.List[typing.Tuple[str, float]]:
+        stdlib = getattr(sys, 'stdlib_module_names', ())
+        return sorted([(name, seconds) for name, seconds in self.modules.items()
+                       if name not in stdlib and name not in LOCAL_MODULES], key=lambda i: i[1], reverse=True)
+
+    def report(self, extensions: typing.Dict[str, float], limit: int = 15) -> None:
+        print("[EXT] import profile (per extension):")
+        for ext, seconds in sorted(extensions.items(), key=lambda i: i[1], reverse=True):
+            print(f"[EXT]   {ext:<22} {seconds * 1000:8.2f}ms")
+
+        print(f"[EXT] import profile (top {limit} third-party modules):")
+        for name, seconds in self.third_party()[:limit]:
+            print(f"[EXT]   {name:<22} {seconds * 1000:8.2f}ms")
+
+
+class LazyCommand(commands.Command):
+    """Stands in for a command whose extension isn't loaded yet.
+
+    It skips checks, cooldowns and hooks and goes straight to its callback, which loads the extension and invokes the
+    real command, so those only run once."""
+
+    async def invoke(self, ctx) -> None:
+        ctx.command = self
+        await self.callback(ctx)
+
+
+class LazyExtensions:
+    """Registers stub commands and listeners for an extension and only imports it once one of them is used."""
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.pending: typing.Dict[str, typing.Tuple[list, list]] = {}
+        self._lock = asyncio.Lock()
+
+    def register(self, ext: str, entry: dict) -> None:
+        stubs = []
+        listeners = []
+
+        for data in entry['commands']:
+            if data['name'] in self.bot.all_commands:
+                print(f"[EXT] {ext}: not stubbing {data['name']}, a loaded extension already has that name")
+                continue
+
+            # an alias taken by another command would make add_command raise, the stub just goes without it
+            aliases = [alias for alias in data['aliases'] if alias not in self.bot.all_commands]
+            command = LazyCommand(self._command_stub(ext), name=data['name'], aliases=aliases,
+                                  help=data['help'], brief=data['brief'], hidden=data['hidden'],
+                                  ignore_extra=True)
+            self.bot.add_command(command)
+            stubs.append(command)
+
+        for event in entry['listeners']:
+            func = self._listener_stub(ext, event)
+            self.bot.add_listener(func, event)
+            listeners.append((event, func))
+
+        self.pending[ext] = (stubs, listeners)
+        print(f"[EXT] {ext} has been registered lazily ({len(stubs)} commands, {len(listeners)} listeners)")
+
+    def discard(self, ext: str) -> bool:
+        try:
+            stubs, listeners = self.pending.pop(ext)
+
+        except KeyError:
+            return False
+
+        for command in stubs:
+            if self.bot.all_commands.get(command.name) is command:
+                self.bot.remove_command(command.name)
+
+        for event, func in listeners:
+            self.bot.remove_listener(func, event)
+
+        return True
+
+    async def ensure_loaded(self, ext: str) -> bool:
+        """Loads a lazy extension. Returns whether it's loaded now, including when another stub's load got there
+        first, and False only if loading it failed."""
+        async with self._lock:
+            if self.discard(ext):
+                self.bot._load_extension(ext)
+
+            return ext in self.bot.extensions
+
+    async def load_all(self) -> None:
+        for ext in list(self.pending):
+            await self.ensure_loaded(ext)
+
+    def _command_stub(self, ext: str):
+        async def stub(ctx):
+            await self.ensure_loaded(ext)
+            # the stub is gone now, so this resolves to the real command
+            command = self.bot.all_commands.get(ctx.invoked_with)
+            if command is None or isinstance(command, LazyCommand):
+                return
+
+            await command.invoke(ctx)
+
+        return stub
+
+    def _listener_stub(self, ext: str, event: str):
+        async def stub(*args, **kwargs):
+            if not await self.ensure_loaded(ext):
+                return
+
+            # the real listeners were registered after this event was dispatched (by us or by a stub of another
+            # event that loaded it first), so hand it over ourselves
+            cogs = cogs_for(self.bot, ext)
+            for cog in cogs:
+                for name, method in cog.get_listeners():
+                    if name == event:
+                        await method(*args, **kwargs)
+
+            if event == 'on_message':
+                for route in self.bot.router.routes:
+                    if route.cog in cogs and route.matches(args[0]):
+                        await route.callback(args[0])
+
+        return stub
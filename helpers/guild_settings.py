@@ -0,0 +1,219 @@
+import uuid
+import typing
+import asyncio
+
+GUILD_SETTINGS_CHANNEL = 'guild_settings'
+SETTINGS_COLUMNS = ('prefix', 'welcome_channel_id', 'welcome_message', 'muted_role_id', 'verify_role_id',
+                    'disable_commands')
+
+
+class GuildSettings:
+    """A guild's row of the guilds table. Guilds without a row get one with every setting unset."""
+
+    __slots__ = ('guild_id',) + SETTINGS_COLUMNS
+
+    def __init__(self, guild_id: int, *, prefix: typing.Optional[typing.List[str]] = None,
+                 welcome_channel_id: typing.Optional[int] = None, welcome_message: typing.Optional[str] = None,
+                 muted_role_id: typing.Optional[int] = None, verify_role_id: typing.Optional[int] = None,
+                 disable_commands: bool = False):
+        self.guild_id = guild_id
+        self.prefix = prefix
+        self.welcome_channel_id = welcome_channel_id
+        self.welcome_message = welcome_message
+        self.muted_role_id = muted_role_id
+        self.verify_role_id = verify_role_id
+        self.disable_commands = bool(disable_commands)
+
+    @classmethod
+    def from_record(cls, guild_id: int, record) -> 'GuildSettings':
+        if record is None:
+            return cls(guild_id)
+        return cls(guild_id, **{column: record[column] for column in SETTINGS_COLUMNS})
+
+    def __repr__(self) -> str:
+        return f"<GuildSettings {' '.join(f'{s}={getattr(self, s)!r}' for s in self.__slots__)}>"
+
+
+class GuildSettingsCache:
+    """Every guild's GuildSettings, loaded at startup and kept current without reading the guilds table again.
+
+    Changes go through ``set`` / ``delete``, which write the row and update the cache with what the database returned
+    (the prefix matcher and ``disable_commands_guilds`` included). Every write also NOTIFYs ``guild_settings``, and
+    ``listen`` makes other processes drop and reload a guild when they hear about it. If the LISTEN connection drops,
+    a new one is set up and every guild is re-read, since notifications sent in between are lost."""
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.settings: typing.Dict[int, GuildSettings] = {}
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        # tells our own notifications apart from another process's
+        self._origin = uuid.uuid4().hex
+        self._loading: typing.Dict[int, asyncio.Future] = {}
+        # bumped on every write, so a read that started before it doesn't overwrite the new values
+        self._versions: typing.Dict[int, int] = {}
+        self._listener = None
+        self._closed = False
+
+    def __len__(self) -> int:
+        return len(self.settings)
+
+    def _store(self, settings: GuildSettings) -> GuildSettings:
+        guild_id = settings.guild_id
+        self.settings[guild_id] = settings
+
+        prefix = settings.prefix
+        self.bot.set_prefixes(guild_id, prefix if prefix and prefix[0] else self.bot.PRE)
+        if settings.disable_commands:
+            self.bot.disable_commands_guilds[guild_id] = True
+        else:
+            self.bot.disable_commands_guilds.pop(guild_id, None)
+
+        return settings
+
+    def load(self, records, guild_ids: typing.Iterable[int] = ()) -> None:
+        """Fills the cache from ``guilds`` rows, with defaults for ``guild_ids`` that don't have one."""
+        for record in records:
+            self._store(GuildSettings.from_record(record['guild_id'], record))
+
+        for guild_id in guild_ids:
+            if guild_id not in self.settings:
+                self._store(GuildSettings(guild_id))
+
+    def peek(self, guild_id: int) -> typing.Optional[GuildSettings]:
+        return self.settings.get(guild_id)
+
+    async def get(self, guild_id: int) -> GuildSettings:
+        settings = self.settings.get(guild_id)
+        if settings is not None:
+            self.hits += 1
+            return settings
+
+        self.misses += 1
+        future = self._loading.get(guild_id)
+        if future is None:
+            future = self._loading[guild_id] = asyncio.ensure_future(self._fetch(guild_id))
+            future.add_done_callback(lambda _: self._loading.pop(guild_id, None))
+
+        return await asyncio.shield(future)
+
+    async def _fetch(self, guild_id: int) -> GuildSettings:
+        version = self._versions.get(guild_id, 0)
+        record = await self.bot.db.fetchrow(f"SELECT guild_id, {', '.join(SETTINGS_COLUMNS)} FROM guilds "
+                                            f"WHERE guild_id = $1", guild_id)
+        settings = GuildSettings.from_record(guild_id, record)
+
+        if self._versions.get(guild_id, 0) != version:
+            # written to while this was in flight, the write already stored the newer values
+            return self.settings.get(guild_id, settings)
+        return self._store(settings)
+
+    def _bump(self, guild_id: int) -> None:
+        self._versions[guild_id] = self._versions.get(guild_id, 0) + 1
+
+    async def set(self, guild_id: int, **values) -> GuildSettings:
+        for column in values:
+            if column not in SETTINGS_COLUMNS:
+                raise TypeError(f"{column!r} is not a guild setting")
+
+        columns = list(values)
+        placeholders = ', '.join(f'${i}' for i in range(2, len(columns) + 2))
+        channel, payload = len(columns) + 2, len(columns) + 3
+        self._bump(guild_id)
+
+        # the notification goes out when the upsert commits, in the same round trip
+        record = await self.bot.db.fetchrow(
+            f"INSERT INTO guilds (guild_id, {', '.join(columns)}) VALUES ($1, {placeholders}) "
+            f"ON CONFLICT (guild_id) DO UPDATE SET {', '.join(f'{c} = EXCLUDED.{c}' for c in columns)} "
+            f"RETURNING guild_id, {', '.join(SETTINGS_COLUMNS)}, pg_notify(${channel}, ${payload})",
+            guild_id, *values.values(), GUILD_SETTINGS_CHANNEL, f'{self._origin}:{guild_id}')
+
+        return self._store(GuildSettings.from_record(guild_id, record))
+
+    async def delete(self, guild_id: int) -> GuildSettings:
+        self._bump(guild_id)
+        await self.bot.db.execute("WITH deleted AS (DELETE FROM guilds WHERE guild_id = $1) SELECT pg_notify($2, $3)",
+                                  guild_id, GUILD_SETTINGS_CHANNEL, f'{self._origin}:{guild_id}')
+        return self._store(GuildSettings(guild_id))
+
+    def invalidate(self, guild_id: int) -> None:
+        self.invalidations += 1
+        self._bump(guild_id)
+        if self.settings.pop(guild_id, None) is not None:
+            # reloaded right away, the prefix matcher still has the old prefixes until then
+            asyncio.ensure_future(self.get(guild_id))
+
+    def _on_notify(self, connection, pid, channel, payload: str) -> None:
+        origin, _, guild_id = payload.partition(':')
+        if origin != self._origin and guild_id.isdigit():
+            self.invalidate(int(guild_id))
+
+    async def reload_all(self) -> None:
+        """Re-reads every guild in one query, for when notifications may have been missed."""
+        versions = dict(self._versions)
+        records = await self.bot.db.fetch(f"SELECT guild_id, {', '.join(SETTINGS_COLUMNS)} FROM guilds")
+        self.invalidations += len(self.settings)
+
+        seen = set()
+        for record in records:
+            guild_id = record['guild_id']
+            seen.add(guild_id)
+            # written to while this was in flight, the write already stored the newer values
+            if self._versions.get(guild_id, 0) == versions.get(guild_id, 0):
+                self._store(GuildSettings.from_record(guild_id, record))
+
+        for guild_id in list(self.settings):
+            if guild_id not in seen and self._versions.get(guild_id, 0) == versions.get(guild_id, 0):
+                self._store(GuildSettings(guild_id))
+
+    async def listen(self) -> None:
+        """Holds a pool connection open to LISTEN for other processes' writes, and gets a new one if it drops."""
+        listener = await self.bot.db.acquire()
+        try:
+            await listener.add_listener(GUILD_SETTINGS_CHANNEL, self._on_notify)
+            listener.add_termination_listener(self._on_terminate)
+        except Exception:
+            await self.bot.db.release(listener)
+            raise
+        self._listener = listener
+
+    def _on_terminate(self, connection) -> None:
+        if not self._closed:
+            asyncio.ensure_future(self._relisten())
+
+    async def _relisten(self) -> None:
+        listener, self._listener = self._listener, None
+        if listener is not None:
+            try:
+                await self.bot.db.release(listener)
+            except Exception:
+                pass
+
+        delay = 1
+        while not self._closed:
+            try:
+                await self.listen()
+                break
+            except Exception as e:
+                print(f"[CACHE] lost the guild settings LISTEN connection, retrying in {delay}s ({e})")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 60)
+        else:
+            return
+
+        # anything another process changed while nobody was listening
+        try:
+            await self.reload_all()
+        except Exception as e:
+            print(f"[CACHE] couldn't reload guild settings after reconnecting, dropping them instead ({e})")
+            for guild_id in list(self.settings):
+                self.invalidate(guild_id)
+
+    async def close(self) -> None:
+        self._closed = True
+        if self._listener is not None:
+            listener, self._listener = self._listener, None
+            listener.remove_termination_listener(self._on_terminate)
+            await listener.remove_listener(GUILD_SETTINGS_CHANNEL, self._on_notify)
+            await self.bot.db.release(listener)
@@ -0,0 +1,364 @@
+import os
+import math
+import bisect
+import typing
+import asyncio
+
+XP_PER_LEVEL = 300
+JOURNAL_PATH = "data/xp_journal.log"
+FLUSH_INTERVAL = 10
+JOURNAL_INTERVAL = 1
+XP_MODES = ('level', 'total')
+
+
+def xp_needed(level: int) -> int:
+    """XP a member needs to go from ``level`` to the next one."""
+    return (level - 1) * XP_PER_LEVEL
+
+
+def level_threshold(level: int) -> int:
+    """Cumulative XP a member has on reaching ``level``, the sum of xp_needed for every level below it."""
+    return XP_PER_LEVEL * (level - 1) * (level - 2) // 2
+
+
+def level_for(total_xp: int) -> int:
+    """The highest level whose threshold ``total_xp`` has reached.
+
+    threshold(n + 1) <= total  <=>  n * (n - 1) <= 2 * total // XP_PER_LEVEL, solved with an integer square root so
+    there's no float rounding to worry about however big the total gets."""
+    n = (1 + math.isqrt(1 + 4 * (2 * total_xp // XP_PER_LEVEL))) // 2
+    return n + 1
+
+
+def split_total(total_xp: int) -> typing.Tuple[int, int]:
+    """Cumulative XP to (level, xp into that level)."""
+    level = level_for(total_xp)
+    return level, total_xp - level_threshold(level)
+
+
+class XPRecord:
+    __slots__ = ('level', 'xp')
+
+    def __init__(self, level: int = 1, xp: int = 0):
+        self.level = level
+        self.xp = xp
+
+
+class XPAccumulator:
+    """Keeps members' level and XP in memory and writes them to the ``users`` table in batches.
+
+    Every change is appended to a small journal as the member's new absolute (level, xp), so replaying it after a
+    crash is idempotent, the last line for a member wins. Lines are buffered and written from a thread every
+    ``JOURNAL_INTERVAL`` seconds instead of on every message. The journal is rotated when a flush starts and only
+    deleted once the batch is in the database.
+
+    Members nobody has earned XP from since the previous flush are dropped from memory after a flush, so ``records``
+    only holds recently active members."""
+
+    def __init__(self, bot, journal_path: str = JOURNAL_PATH):
+        self.bot = bot
+        self.journal_path = journal_path
+        self.records: typing.Dict[typing.Tuple[int, int], XPRecord] = {}
+        self.dirty: typing.Set[typing.Tuple[int, int]] = set()
+        # members given XP since the last flush, the others get evicted once they're written
+        self.active: typing.Set[typing.Tuple[int, int]] = set()
+        self.evicted = 0
+        self._loading: typing.Dict[typing.Tuple[int, int], asyncio.Future] = {}
+        self._flush_lock = asyncio.Lock()
+        self._journal_lock = asyncio.Lock()
+        self._journal = None
+        self._buffer: typing.List[str] = []
+
+    @property
+    def _flushing_path(self) -> str:
+        return f"{self.journal_path}.flushing"
+
+    def _append_journal(self, lines: typing.List[str]) -> None:
+        if self._journal is None:
+            self._journal = open(self.journal_path, "a")
+
+        self._journal.write(''.join(lines))
+        # no fsync, this only has to survive the process dying, not the machine
+        self._journal.flush()
+
+    async def write_journal(self) -> None:
+        """Appends the buffered lines to the journal off the event loop."""
+        async with self._journal_lock:
+            if not self._buffer:
+                return
+
+            lines, self._buffer = self._buffer, []
+            try:
+                await self.bot.loop.run_in_executor(None, self._append_journal, lines)
+
+            except Exception:
+                self._buffer[:0] = lines
+                raise
+
+    async def guild_rows(self, guild_id: int) -> typing.List[typing.Tuple[int, int, int]]:
+        rows = await self.bot.db.fetch("SELECT user_id, level, xp FROM users WHERE guild_id = $1", guild_id)
+        return [(row['user_id'], row['level'], row['xp']) for row in rows]
+
+    async def _load(self, key: typing.Tuple[int, int]) -> XPRecord:
+        guild_id, user_id = key
+        row = await self.bot.db.fetchrow("SELECT level, xp FROM users WHERE user_id = $1 AND guild_id = $2",
+                                         user_id, guild_id)
+
+        if row:
+            return XPRecord(row['level'], row['xp'])
+
+        # not in the table yet, the next flush inserts it
+        return XPRecord()
+
+    async def get(self, guild_id: int, user_id: int) -> XPRecord:
+        key = (guild_id, user_id)
+
+        try:
+            return self.records[key]
+
+        except KeyError:
+            pass
+
+        # concurrent misses for the same member share one query
+        try:
+            return await asyncio.shield(self._loading[key])
+
+        except KeyError:
+            pass
+
+        future = self._loading[key] = asyncio.ensure_future(self._load(key))
+        try:
+            record = await asyncio.shield(future)
+
+        finally:
+            self._loading.pop(key, None)
+
+        return self.records.setdefault(key, record)
+
+    async def add(self, guild_id: int, user_id: int, amount: int) -> typing.Optional[int]:
+        """Gives a member XP, returning their new level if they levelled up."""
+        record = await self.get(guild_id, user_id)
+        levelled_up = record.xp >= xp_needed(record.level)
+
+        if levelled_up:
+            record.level += 1
+            record.xp = 0
+
+        else:
+            record.xp += amount
+
+        self.dirty.add((guild_id, user_id))
+        self.active.add((guild_id, user_id))
+        self._buffer.append(f"{guild_id} {user_id} {record.level} {record.xp}\n")
+        self.bot.ranks.update(guild_id, user_id, record.level, record.xp)
+
+        return record.level if levelled_up else None
+
+    def _rotate_journal(self) -> None:
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+
+        if not os.path.exists(self.journal_path):
+            return
+
+        if os.path.exists(self._flushing_path):
+            # the last flush failed, so keep its lines ahead of the newer ones
+            with open(self.journal_path) as new, open(self._flushing_path, "a") as old:
+                old.write(new.read())
+            os.remove(self.journal_path)
+
+        else:
+            os.replace(self.journal_path, self._flushing_path)
+
+    async def _upsert(self, rows: list) -> None:
+        await self.bot.db.executemany(
+            "INSERT INTO users (user_id, guild_id, level, xp) VALUES ($1, $2, $3, $4) "
+            "ON CONFLICT (user_id, guild_id) DO UPDATE SET level = EXCLUDED.level, xp = EXCLUDED.xp", rows)
+
+    def _evict(self) -> None:
+        idle = self.records.keys() - self.active - self.dirty
+        for key in idle:
+            del self.records[key]
+
+        self.evicted += len(idle)
+        self.active = set()
+
+    async def flush(self) -> int:
+        async with self._flush_lock:
+            if not self.dirty:
+                self._evict()
+                return 0
+
+            # everything buffered so far goes into the file being rotated out, it's all covered by this batch
+            await self.write_journal()
+            async with self._journal_lock:
+                dirty, self.dirty = self.dirty, set()
+                rows = [(user_id, guild_id, self.records[(guild_id, user_id)].level,
+                         self.records[(guild_id, user_id)].xp) for guild_id, user_id in dirty]
+                self._rotate_journal()
+
+            try:
+                await self._upsert(rows)
+
+            except Exception:
+                self.dirty |= dirty
+                raise
+
+            if os.path.exists(self._flushing_path):
+                os.remove(self._flushing_path)
+
+            self._evict()
+            return len(rows)
+
+    async def replay(self) -> int:
+        """Writes whatever a previous run journaled but never flushed."""
+        rows = {}
+
+        for path in (self._flushing_path, self.journal_path):
+            try:
+                with open(path) as file:
+                    for line in file:
+                        try:
+                            guild_id, user_id, level, xp = map(int, line.split())
+
+                        except ValueError:
+                            # most likely a line cut short by the crash
+                            continue
+
+                        rows[(guild_id, user_id)] = (user_id, guild_id, level, xp)
+
+            except FileNotFoundError:
+                continue
+
+        if rows:
+            await self._upsert(list(rows.values()))
+
+        for path in (self._flushing_path, self.journal_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+        return len(rows)
+
+    def close(self) -> None:
+        if self._buffer:
+            # the last flush didn't make it, keep these for the replay on the next start
+            lines, self._buffer = self._buffer, []
+            self._append_journal(lines)
+
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+
+
+class TotalXPStore:
+    """The ``total`` XP mode: one cumulative ``total_xp`` column and levels derived from it with :func:`level_for`.
+
+    Every grant is a single upsert that adds to the column and returns the new total, so concurrent messages (or
+    several bot processes) can't overwrite each other's XP. Nothing is held back, flush and replay are no-ops."""
+
+    def __init__(self, bot):
+        self.bot = bot
+
+    async def guild_rows(self, guild_id: int) -> typing.List[typing.Tuple[int, int, int]]:
+        rows = await self.bot.db.fetch("SELECT user_id, total_xp FROM users WHERE guild_id = $1", guild_id)
+        return [(row['user_id'], *split_total(row['total_xp'])) for row in rows]
+
+    async def add(self, guild_id: int, user_id: int, amount: int) -> typing.Optional[int]:
+        total = await self.bot.db.fetchval(
+            "INSERT INTO users (user_id, guild_id, level, xp, total_xp) VALUES ($1, $2, 1, 0, $3) "
+            "ON CONFLICT (user_id, guild_id) DO UPDATE SET total_xp = users.total_xp + EXCLUDED.total_xp "
+            "RETURNING total_xp", user_id, guild_id, amount)
+
+        level, xp = split_total(total)
+        self.bot.ranks.update(guild_id, user_id, level, xp)
+
+        return level if level > level_for(total - amount) else None
+
+    async def flush(self) -> int:
+        return 0
+
+    async def write_journal(self) -> None:
+        pass
+
+    async def replay(self) -> int:
+        return 0
+
+    def close(self) -> None:
+        pass
+
+
+class RankIndex:
+    """Per-guild members sorted by (level, xp), highest first, so ranks and leaderboard pages are bisects and slices.
+
+    A guild is read from the database the first time it's asked for and kept up to date by :class:`XPAccumulator`
+    from then on."""
+
+    def __init__(self, bot):
+        self.bot = bot
+        # keys are (-level, -xp, user_id), so a plain ascending sort puts the top member first
+        self.guilds: typing.Dict[int, list] = {}
+        self.keys: typing.Dict[int, typing.Dict[int, tuple]] = {}
+        self._loading: typing.Dict[int, asyncio.Future] = {}
+
+    def update(self, guild_id: int, user_id: int, level: int, xp: int) -> None:
+        try:
+            ranked = self.guilds[guild_id]
+            keys = self.keys[guild_id]
+
+        except KeyError:
+            # nobody has looked at this guild's ranks yet, it's read fresh when they do
+            return
+
+        old = keys.get(user_id)
+        if old is not None:
+            del ranked[bisect.bisect_left(ranked, old)]
+
+        key = keys[user_id] = (-level, -xp, user_id)
+        bisect.insort(ranked, key)
+
+    async def _load(self, guild_id: int) -> None:
+        # registered before anything is awaited, so XP that changes while the table is read lands in here and
+        # wins over the (older) row
+        ranked = self.guilds[guild_id] = []
+        keys = self.keys[guild_id] = {}
+        await self.bot.xp.flush()
+
+        for user_id, level, xp in await self.bot.xp.guild_rows(guild_id):
+            keys.setdefault(user_id, (-level, -xp, user_id))
+
+        ranked[:] = sorted(keys.values())
+
+    async def ensure(self, guild_id: int) -> None:
+        if guild_id in self.guilds and guild_id not in self._loading:
+            return
+
+        try:
+            future = self._loading[guild_id]
+
+        except KeyError:
+            future = self._loading[guild_id] = asyncio.ensure_future(self._load(guild_id))
+            future.add_done_callback(lambda _: self._loading.pop(guild_id, None))
+
+        try:
+            await asyncio.shield(future)
+
+        except Exception:
+            self.guilds.pop(guild_id, None)
+            self.keys.pop(guild_id, None)
+            raise
+
+    def get(self, guild_id: int, user_id: int) -> typing.Optional[typing.Tuple[int, int, int]]:
+        """Returns a member's (rank, level, xp), ranks start at 1."""
+        key = self.keys.get(guild_id, {}).get(user_id)
+        if key is None:
+            return None
+
+        return bisect.bisect_left(self.guilds[guild_id], key) + 1, -key[0], -key[1]
+
+    def count(self, guild_id: int) -> int:
+        return len(self.guilds.get(guild_id, ()))
+
+    def page(self, guild_id: int, start: int, count: int) -> typing.List[typing.Tuple[int, int, int]]:
+        """Returns (user_id, level, xp) for ``count`` members starting at the 0-indexed position ``start``."""
+        return [(user_id, -level, -xp) for level, xp, user_id in self.guilds.get(guild_id, [])[start:start + count]]
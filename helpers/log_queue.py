@@ -0,0 +1,177 @@
+import typing
+import discord
+
+from collections import Counter, deque
+
+LOG_QUEUE_CAP = 500
+LOG_QUEUE_POLICIES = ('drop-oldest', 'summarize')
+
+# discord's limits for a single webhook message
+MAX_EMBEDS = 10
+MAX_FILES = 10
+MAX_TOTAL_CHARS = 6000
+LIMITS = {'title': 256, 'description': 4096, 'fields': 25, 'field_name': 256, 'field_value': 1024, 'footer': 2048,
+          'author': 256}
+
+LogFile = typing.Tuple[str, bytes]
+
+
+def embed_size(data: dict) -> int:
+    """Characters discord counts towards the 6000 limit, for an embed's to_dict()."""
+    return (len(data.get('title') or '') + len(data.get('description') or '')
+            + sum(len(f.get('name') or '') + len(f.get('value') or '') for f in data.get('fields') or ())
+            + len((data.get('footer') or {}).get('text') or '') + len((data.get('author') or {}).get('name') or ''))
+
+
+def _dump(data: dict) -> str:
+    lines = [data.get('title') or '', data.get('description') or '']
+    lines += [f"{f.get('name')}:\n{f.get('value')}" for f in data.get('fields') or ()]
+    lines += [(data.get('author') or {}).get('name') or '', (data.get('footer') or {}).get('text') or '']
+    return "\n\n".join(line for line in lines if line)
+
+
+def _cut(text: str, limit: int) -> str:
+    return text if len(text) <= limit else text[:max(0, limit - 3)] + '...'
+
+
+def fit_embed(embed: discord.Embed, name: str = 'event.txt') -> typing.Tuple[discord.Embed, typing.Optional[LogFile]]:
+    """Makes an embed fit in a webhook message on its own.
+
+    Anything that goes over a limit is cut, and when something had to be cut the whole event is returned as a text
+    file to send alongside it, so nothing is lost."""
+    data = embed.to_dict()
+
+    if (embed_size(data) <= MAX_TOTAL_CHARS and len(data.get('title') or '') <= LIMITS['title']
+            and len(data.get('description') or '') <= LIMITS['description']
+            and len(data.get('fields') or ()) <= LIMITS['fields']
+            and all(len(f.get('name') or '') <= LIMITS['field_name'] and len(f.get('value') or '') <= LIMITS['field_value']
+                    for f in data.get('fields') or ())
+            and len((data.get('footer') or {}).get('text') or '') <= LIMITS['footer']
+            and len((data.get('author') or {}).get('name') or '') <= LIMITS['author']):
+        return embed, None
+
+    file = (name, _dump(data).encode())
+
+    if 'title' in data:
+        data['title'] = _cut(data['title'], LIMITS['title'])
+    if 'author' in data and 'name' in data['author']:
+        data['author']['name'] = _cut(data['author']['name'], LIMITS['author'])
+    data['footer'] = {**data.get('footer', {}),
+                      'text': _cut(f"{(data.get('footer') or {}).get('text') or ''}\nToo long, the full event is in {name}"
+                                   .strip(), LIMITS['footer'])}
+    data['fields'] = [{**f, 'name': _cut(f.get('name') or '', LIMITS['field_name']),
+                       'value': _cut(f.get('value') or '', LIMITS['field_value'])}
+                      for f in (data.get('fields') or [])[:LIMITS['fields']]]
+
+    # still too big in total, drop fields from the end, then shorten the description
+    while data['fields'] and embed_size(data) > MAX_TOTAL_CHARS:
+        data['fields'].pop()
+
+    if 'description' in data:
+        room = MAX_TOTAL_CHARS - (embed_size(data) - len(data['description']))
+        data['description'] = _cut(data['description'], min(LIMITS['description'], room))
+
+    return discord.Embed.from_dict(data), file
+
+
+class LogQueue:
+    """A capped queue of log embeds for one (guild, deliver type).
+
+    Once it's full the oldest embed is dropped to make room. With the ``summarize`` policy the next batch taken from
+    the queue also starts with an embed saying how many events (and of what kind) were dropped, so the log channel
+    shows there's a gap instead of silently skipping it."""
+
+    __slots__ = ('items', 'seqs', 'files', 'cap', 'policy', 'dropped', 'last_seq', '_unreported', '_taken')
+
+    def __init__(self, cap: int = LOG_QUEUE_CAP, policy: str = 'drop-oldest'):
+        self.items: typing.Deque[discord.Embed] = deque()
+        # spool sequence numbers, kept in step with items (None when the spool is off)
+        self.seqs: typing.Deque[typing.Optional[int]] = deque()
+        # files sent along with an embed (purge transcripts), also kept in step with items
+        self.files: typing.Deque[typing.Optional[LogFile]] = deque()
+        self.cap = cap
+        self.policy = policy
+        self.dropped = 0
+        self.last_seq: typing.Optional[int] = None
+        self._unreported: typing.Optional[Counter] = None
+        # what the last take() removed, as it was queued, so putback() can undo it
+        self._taken: typing.List[typing.Tuple[discord.Embed, typing.Optional[int], typing.Optional[LogFile]]] = []
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def __bool__(self) -> bool:
+        return bool(self.items) or bool(self._unreported)
+
+    def append(self, embed: discord.Embed, seq: int = None, file: LogFile = None) -> None:
+        if len(self.items) >= self.cap:
+            old = self.items.popleft()
+            self.seqs.popleft()
+            self.files.popleft()
+            self.dropped += 1
+
+            if self.policy == 'summarize':
+                if self._unreported is None:
+                    self._unreported = Counter()
+                self._unreported[old.title or 'Untitled event'] += 1
+
+        self.items.append(embed)
+        self.seqs.append(seq)
+        self.files.append(file)
+
+    def _summary(self) -> discord.Embed:
+        unreported, self._unreported = self._unreported, None
+        total = sum(unreported.values())
+        lines = [f"`{count}x` {title}" for title, count in unreported.most_common(15)]
+        if len(unreported) > 15:
+            lines.append(f"...and {len(unreported) - 15} other kinds of events")
+
+        embed = discord.Embed(title=f"{total} log events were dropped",
+                              description="Too many events were waiting to be delivered to this channel, "
+                                          "so the oldest ones were skipped:\n" + "\n".join(lines),
+                              colour=discord.Colour.orange(), timestamp=discord.utils.utcnow())
+        embed.set_footer(text="Check that this log channel's webhook still exists")
+        return embed
+
+    def take(self, max_embeds: int = MAX_EMBEDS, max_chars: int = MAX_TOTAL_CHARS
+             ) -> typing.Tuple[typing.List[discord.Embed], typing.List[LogFile]]:
+        """Takes as many embeds as fit in one webhook message, in order, along with any files they need."""
+        embeds = []
+        files = []
+        size = 0
+        self._taken = []
+
+        if self._unreported:
+            embed = self._summary()
+            embeds.append(embed)
+            size += len(embed)
+
+        while self.items and len(embeds) < max_embeds:
+            embed, file = fit_embed(self.items[0], name=f'event-{len(embeds) + 1}.txt')
+            embed_chars = len(embed)
+            extra = [f for f in (file, self.files[0]) if f]
+
+            if embeds and (size + embed_chars > max_chars or len(files) + len(extra) > MAX_FILES):
+                break
+
+            queued = self.items.popleft()
+            queued_file = self.files.popleft()
+            seq = self.seqs.popleft()
+            if seq is not None:
+                self.last_seq = seq
+            self._taken.append((queued, seq, queued_file))
+            embeds.append(embed)
+            size += embed_chars
+            files.extend(extra)
+
+        return embeds, files
+
+    def putback(self) -> None:
+        """Puts the last batch taken back at the front of the queue, for when it couldn't be sent.
+
+        A summary of dropped events that went out with it isn't rebuilt."""
+        for embed, seq, file in reversed(self._taken):
+            self.items.appendleft(embed)
+            self.seqs.appendleft(seq)
+            self.files.appendleft(file)
+        self._taken = []
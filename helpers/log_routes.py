@@ -0,0 +1,122 @@
+import typing
+
+from helpers.helpers import LoggingEventsFlags
+from helpers.webhooks import DELIVER_TYPES
+
+EVENT_BITS: typing.Dict[str, int] = dict(LoggingEventsFlags.VALID_FLAGS)
+
+
+class LogRoute:
+    """A guild's logging config compiled down to what the listeners and delivery need.
+
+    ``events`` is the LoggingEventsFlags value as a plain int, and ``targets`` maps every deliver type to the one it's
+    actually sent as, with the fallback to the default channel already applied."""
+
+    __slots__ = ('events', 'targets')
+
+    def __init__(self, events: int, targets: typing.Dict[str, str]):
+        self.events = events
+        self.targets = targets
+
+    def enabled(self, event: str) -> bool:
+        return bool(self.events & EVENT_BITS[event])
+
+
+class MemberIndex:
+    """Which logging guilds every member is in, so a user update doesn't have to walk all their mutual guilds.
+
+    Guilds are indexed once their members are cached (on ready / when they become available) and when logging gets
+    enabled, and kept up to date from member joins and leaves. Entries for guilds that stopped logging may linger
+    until the member leaves, ``get`` skips them."""
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.guilds: typing.Dict[int, typing.Set[int]] = {}
+        self.indexed: typing.Set[int] = set()
+
+    def __len__(self) -> int:
+        return len(self.guilds)
+
+    def get(self, user_id: int) -> typing.List[int]:
+        routes = self.bot.log_routes
+        return [guild_id for guild_id in self.guilds.get(user_id, ()) if guild_id in routes]
+
+    def add(self, user_id: int, guild_id: int) -> None:
+        if guild_id in self.indexed:
+            self.guilds.setdefault(user_id, set()).add(guild_id)
+
+    def remove(self, user_id: int, guild_id: int) -> None:
+        guilds = self.guilds.get(user_id)
+        if guilds is not None:
+            guilds.discard(guild_id)
+            if not guilds:
+                del self.guilds[user_id]
+
+    def index_guild(self, guild_id: int) -> None:
+        guild = self.bot.get_guild(guild_id)
+        if guild is None:
+            # not cached yet, it gets indexed when it becomes available
+            return
+
+        self.indexed.add(guild_id)
+        for user_id in guild._members:  # noqa
+            self.guilds.setdefault(user_id, set()).add(guild_id)
+
+    def drop_guild(self, guild_id: int, guild=None) -> None:
+        if guild_id not in self.indexed:
+            return
+
+        self.indexed.discard(guild_id)
+        # a guild the bot just left isn't in the cache anymore, so on_guild_remove passes it in
+        guild = guild or self.bot.get_guild(guild_id)
+        for user_id in (guild._members if guild else ()):  # noqa
+            self.remove(user_id, guild_id)
+
+
+class LogRoutes:
+    """Compiled LogRoutes for every logging guild, built from ``bot.log_channels`` and ``bot.guild_loggings``.
+
+    Nothing here is looked up per event, ``rebuild`` has to be called whenever a guild's channels or enabled events
+    change (``update_log`` and the logging config commands do)."""
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.routes: typing.Dict[int, LogRoute] = {}
+        self.members = MemberIndex(bot)
+        self.rebuilds = 0
+
+    def __contains__(self, guild_id: int) -> bool:
+        return guild_id in self.routes
+
+    def __len__(self) -> int:
+        return len(self.routes)
+
+    def get(self, guild_id: int) -> typing.Optional[LogRoute]:
+        return self.routes.get(guild_id)
+
+    def enabled(self, guild_id: int, event: str) -> bool:
+        route = self.routes.get(guild_id)
+        return route is not None and bool(route.events & EVENT_BITS[event])
+
+    def rebuild(self, guild_id: int) -> typing.Optional[LogRoute]:
+        webhooks = self.bot.log_channels.get(guild_id)
+        if webhooks is None:
+            self.routes.pop(guild_id, None)
+            self.members.drop_guild(guild_id)
+            return None
+
+        if guild_id not in self.members.indexed:
+            self.members.index_guild(guild_id)
+
+        flags = self.bot.guild_loggings.get(guild_id)
+        targets = {deliver_type: deliver_type if getattr(webhooks, deliver_type) else 'default'
+                   for deliver_type in DELIVER_TYPES}
+
+        self.rebuilds += 1
+        route = self.routes[guild_id] = LogRoute(flags.value if flags else 0, targets)
+        return route
+
+    def rebuild_all(self) -> None:
+        self.routes.clear()
+        for guild_id in self.bot.log_channels:
+            self.rebuild(guild_id)
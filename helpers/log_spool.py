@@ -0,0 +1,114 @@
+import json
+import typing
+import asyncio
+import sqlite3
+import discord
+import concurrent.futures
+
+SPOOL_PATH = "data/log_spool.sqlite3"
+SPOOL_FLUSH_INTERVAL = 1
+# the file is only vacuumed on startup once it's at least this big and more than this share of it is unused
+VACUUM_MIN_PAGES = 1024
+VACUUM_FREE_RATIO = 0.5
+
+
+class LogSpool:
+    """An on-disk copy of every queued log embed, so a restart or crash doesn't lose them.
+
+    Embeds are numbered as they're queued, and only written out every ``SPOOL_FLUSH_INTERVAL`` seconds, as one
+    transaction, from a dedicated thread. Log handlers never wait on the disk. Each (guild, deliver type) queue is
+    delivered in order, so acknowledging a batch just deletes everything up to its last number. Whatever is left on
+    startup is put back in the queues."""
+
+    def __init__(self, path: str = SPOOL_PATH):
+        self.path = path
+        self.seq = 0
+        self.written = 0
+        self._pending: typing.List[typing.Tuple[int, int, str, discord.Embed]] = []
+        self._acks: typing.Dict[typing.Tuple[int, str], int] = {}
+        self._lock = asyncio.Lock()
+        # sqlite connections aren't safe to share between threads, so everything runs on this one
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix='log-spool')
+        self._db: typing.Optional[sqlite3.Connection] = None
+
+    async def _run(self, func, *args):
+        return await asyncio.get_event_loop().run_in_executor(self._executor, func, *args)
+
+    def _open(self) -> int:
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        # WAL + NORMAL only syncs on checkpoints, a crash of the bot (not the machine) loses nothing
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS spool (seq INTEGER PRIMARY KEY, guild_id INTEGER NOT NULL, "
+                         "deliver_type TEXT NOT NULL, payload TEXT NOT NULL)")
+        self._db.commit()
+        return self._db.execute("SELECT COALESCE(MAX(seq), 0) FROM spool").fetchone()[0]
+
+    def add(self, guild_id: int, deliver_type: str, embed: discord.Embed) -> int:
+        self.seq += 1
+        self._pending.append((self.seq, guild_id, deliver_type, embed))
+        return self.seq
+
+    def ack(self, guild_id: int, deliver_type: str, seq: typing.Optional[int]) -> None:
+        if seq is not None:
+            key = (guild_id, deliver_type)
+            self._acks[key] = max(seq, self._acks.get(key, 0))
+
+    def _write(self, rows: list, acks: list) -> None:
+        with self._db:
+            self._db.executemany("INSERT OR REPLACE INTO spool (seq, guild_id, deliver_type, payload) "
+                                 "VALUES (?, ?, ?, ?)", rows)
+            self._db.executemany("DELETE FROM spool WHERE guild_id = ? AND deliver_type = ? AND seq <= ?", acks)
+
+    async def flush(self) -> None:
+        async with self._lock:
+            if self._db is None or not (self._pending or self._acks):
+                return
+
+            pending, self._pending = self._pending, []
+            acks, self._acks = self._acks, {}
+
+            # serialized here rather than in log() so the handlers only pay for a list append
+            rows = [(seq, guild_id, deliver_type, json.dumps(embed.to_dict()))
+                    for seq, guild_id, deliver_type, embed in pending]
+            await self._run(self._write, rows, [(g, t, seq) for (g, t), seq in acks.items()])
+            self.written += len(rows)
+
+    def _load(self, keep: typing.Set[int]) -> list:
+        rows = self._db.execute("SELECT seq, guild_id, deliver_type, payload FROM spool ORDER BY seq").fetchall()
+
+        # filtered here and deleted by seq, binding every logging guild to a NOT IN would go over sqlite's
+        # parameter limit on a big bot
+        gone = [(row[0],) for row in rows if row[1] not in keep]
+        if gone:
+            with self._db:
+                self._db.executemany("DELETE FROM spool WHERE seq = ?", gone)
+
+        # compact whatever was acknowledged last run back into the main file, and only rewrite the whole file when
+        # most of it is free pages
+        self._db.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        pages = self._db.execute("PRAGMA page_count").fetchone()[0]
+        free = self._db.execute("PRAGMA freelist_count").fetchone()[0]
+        if pages >= VACUUM_MIN_PAGES and free > pages * VACUUM_FREE_RATIO:
+            self._db.execute("VACUUM")
+
+        return [row for row in rows if row[1] in keep]
+
+    async def replay(self, bot) -> int:
+        """Opens the spool and queues whatever the last run didn't get to deliver."""
+        self.seq = await self._run(self._open)
+        rows = await self._run(self._load, set(bot.log_channels))
+
+        for seq, guild_id, deliver_type, payload in rows:
+            bot.log_cache[guild_id][deliver_type].append(discord.Embed.from_dict(json.loads(payload)), seq)
+
+        return len(rows)
+
+    async def close(self) -> None:
+        await self.flush()
+
+        if self._db is not None:
+            await self._run(self._db.close)
+            self._db = None
+
+        self._executor.shutdown(wait=False)
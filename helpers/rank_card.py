@@ -0,0 +1,179 @@
+import io
+import os
+import math
+import typing
+import asyncio
+import functools
+import importlib.util
+import concurrent.futures
+
+from collections import OrderedDict
+
+BACKGROUND_URL = 'https://media.discordapp.net/attachments/820049182860509206/923974515623604224/Untitled48_20211224102440.png?width=1193&height=671'
+RENDER_WORKERS = 2
+AVATAR_CACHE_SIZE = 512
+CARD_CACHE_SIZE = 256
+
+DARK = (252, 179, 63)
+
+# per worker process, filled by _init_worker so every render starts from already decoded images
+_assets = {}
+
+
+def _init_worker(background: bytes) -> None:
+    from PIL import Image, ImageDraw, ImageFont
+
+    # only disrank's bundled fonts and status icons are used, importing it would pull in requests for nothing
+    path = os.path.join(importlib.util.find_spec('disrank').submodule_search_locations[0], 'assets')
+
+    card = Image.open(io.BytesIO(background)).convert("RGBA")
+    width, height = card.size
+    if (width, height) != (900, 238):
+        nh = math.ceil(width * 0.264444)
+        y1, y2 = ((height / 2) - 119, nh + (height / 2) - 119) if nh < height else (0, 0)
+        card = card.crop((0, y1, width, y2)).resize((900, 238))
+
+    mask = Image.new("RGBA", card.size, 0)
+    ImageDraw.Draw(mask).ellipse((29, 29, 209, 209), fill=(255, 25, 255, 255))
+
+    _assets.update(
+        background=card,
+        mask=mask,
+        statuses={status: Image.open(os.path.join(path, f'{status}.png')).convert("RGBA").resize((40, 40))
+                  for status in ('online', 'offline', 'idle', 'dnd', 'streaming')},
+        font_normal=ImageFont.truetype(os.path.join(path, 'font.ttf'), 36),
+        font_small=ImageFont.truetype(os.path.join(path, 'font.ttf'), 20),
+    )
+
+
+def short_number(xp: int) -> str:
+    if xp < 1000:
+        return str(xp)
+    if xp < 1000000:
+        return str(round(xp / 1000, 1)) + "k"
+    return str(round(xp / 1000000, 1)) + "M"
+
+
+def bar_length(user_xp: int, next_xp: int) -> int:
+    return int((user_xp / next_xp) * 490) + 248 if next_xp else 248
+
+
+def render(avatar: bytes, level: int, user_xp: int, next_xp: int, position: int, name: str, status: str) -> bytes:
+    """Same layout as disrank's Generator.generate_profile, minus the downloads and decoding of static assets."""
+    from PIL import Image, ImageDraw
+
+    card = _assets['background'].copy()
+    profile = Image.open(io.BytesIO(avatar)).convert('RGBA').resize((180, 180))
+
+    draw = ImageDraw.Draw(card)
+    draw.text((245, 22), name, DARK, font=_assets['font_normal'])
+    draw.text((245, 98), f"Rank #{position}", DARK, font=_assets['font_small'])
+    draw.text((245, 123), f"Level {level}", DARK, font=_assets['font_small'])
+    draw.text((245, 150), f"Exp {short_number(user_xp)}/{short_number(next_xp)}", DARK, font=_assets['font_small'])
+
+    blank = Image.new("RGBA", card.size, (255, 255, 255, 0))
+    blank_draw = ImageDraw.Draw(blank)
+    blank_draw.rectangle((245, 185, 750, 205), fill=(255, 255, 255, 0), outline=DARK)
+    blank_draw.rectangle((248, 188, bar_length(user_xp, next_xp), 202), fill=DARK)
+    blank_draw.ellipse((20, 20, 218, 218), fill=(255, 255, 255, 0), outline=DARK)
+
+    holder = Image.new("RGBA", card.size, (255, 255, 255, 0))
+    holder.paste(profile, (29, 29, 209, 209))
+
+    final = Image.alpha_composite(Image.composite(holder, card, _assets['mask']), blank)
+    badge = Image.new("RGBA", final.size, (255, 255, 255, 0))
+    badge.paste(_assets['statuses'].get(status, _assets['statuses']['offline']), (169, 169))
+    final = Image.alpha_composite(final, badge)
+
+    buffer = io.BytesIO()
+    final.save(buffer, 'png')
+    return buffer.getvalue()
+
+
+class LRU(OrderedDict):
+    def __init__(self, size: int):
+        super().__init__()
+        self.size = size
+
+    def get(self, key, default=None):
+        try:
+            self.move_to_end(key)
+            return self[key]
+
+        except KeyError:
+            return default
+
+    def put(self, key, value) -> None:
+        self[key] = value
+        self.move_to_end(key)
+        while len(self) > self.size:
+            self.popitem(last=False)
+
+
+class RankCardRenderer:
+    """Renders rank cards in a small process pool.
+
+    The background is downloaded once and decoded once per worker, avatars are cached by their asset key and
+    finished cards by everything that's drawn on them, so an unchanged card is never rendered twice."""
+
+    def __init__(self, session, *, workers: int = RENDER_WORKERS, background_url: str = BACKGROUND_URL):
+        self.session = session
+        self.workers = workers
+        self.background_url = background_url
+        self.avatars = LRU(AVATAR_CACHE_SIZE)
+        self.cards = LRU(CARD_CACHE_SIZE)
+        self.hits = 0
+        self.misses = 0
+        self._pool: typing.Optional[concurrent.futures.ProcessPoolExecutor] = None
+        self._pool_lock = asyncio.Lock()
+        # more than this many cards waiting and the rest wait here instead of piling up in the pool's queue
+        self._slots = asyncio.Semaphore(workers * 2)
+
+    async def _download(self, url: str) -> bytes:
+        async with self.session.get(url) as response:
+            response.raise_for_status()
+            return await response.read()
+
+    async def _get_pool(self) -> concurrent.futures.ProcessPoolExecutor:
+        async with self._pool_lock:
+            if self._pool is None:
+                background = await self._download(self.background_url)
+                self._pool = concurrent.futures.ProcessPoolExecutor(self.workers, initializer=_init_worker,
+                                                                    initargs=(background,))
+            return self._pool
+
+    async def _avatar(self, asset) -> bytes:
+        avatar = self.avatars.get(asset.key)
+        if avatar is None:
+            # drawn at 180x180, so there's no point in fetching the 2048px one
+            avatar = await asset.replace(format='png', size=256).read()
+            self.avatars.put(asset.key, avatar)
+        return avatar
+
+    async def render(self, member, *, level: int, xp: int, next_xp: int, position: int) -> io.BytesIO:
+        name = str(member)
+        status = member.status.name
+        asset = member.display_avatar
+        key = (member.id, name, level, short_number(xp), short_number(next_xp), bar_length(xp, next_xp), position,
+               asset.key, status)
+
+        card = self.cards.get(key)
+        if card is not None:
+            self.hits += 1
+            return io.BytesIO(card)
+
+        self.misses += 1
+        avatar = await self._avatar(asset)
+        pool = await self._get_pool()
+
+        async with self._slots:
+            card = await asyncio.get_event_loop().run_in_executor(
+                pool, functools.partial(render, avatar, level, xp, next_xp, position, name, status))
+
+        self.cards.put(key, card)
+        return io.BytesIO(card)
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
@@ -0,0 +1,146 @@
+import typing
+import discord
+import itertools
+
+from collections import defaultdict
+
+IDs = typing.Union[typing.Iterable[int], typing.Callable[[typing.Any], typing.Iterable[int]]]
+
+
+def message_handler(*, guild_only: bool = False, dm_only: bool = False, ignore_bots: bool = False,
+                    channels: IDs = None, category: typing.Union[int, typing.Callable] = None, authors: IDs = None,
+                    mentions: bool = False, check: typing.Callable[[typing.Any, discord.Message], bool] = None):
+    """Marks a cog method as a message handler for :class:`MessageRouter`.
+
+    ``channels``, ``category`` and ``authors`` can be callables taking the cog, they're resolved when the cog is
+    added (or the router is rebuilt). ``check`` runs for every message that passes the other filters, so keep it cheap.
+    """
+
+    def decorator(func):
+        func.__message_route__ = dict(guild_only=guild_only, dm_only=dm_only, ignore_bots=ignore_bots,
+                                      channels=channels, category=category, authors=authors, mentions=mentions,
+                                      check=check)
+        return func
+
+    return decorator
+
+
+class Route:
+    __slots__ = ('cog', 'callback', 'name', 'filters', 'guild_only', 'dm_only', 'ignore_bots', 'channels',
+                 'category', 'authors', 'mentions', 'check')
+
+    def __init__(self, cog, callback, filters: dict):
+        self.cog = cog
+        self.callback = callback
+        self.name = callback.__name__
+        self.filters = filters
+        self.resolve()
+
+    def resolve(self) -> None:
+        def value(v):
+            return v(self.cog) if callable(v) else v
+
+        self.guild_only = self.filters['guild_only']
+        self.dm_only = self.filters['dm_only']
+        self.ignore_bots = self.filters['ignore_bots']
+        self.mentions = self.filters['mentions']
+        self.check = self.filters['check']
+        self.category = value(self.filters['category'])
+        channels = value(self.filters['channels'])
+        authors = value(self.filters['authors'])
+        self.channels = frozenset(channels) if channels is not None else None
+        self.authors = frozenset(authors) if authors is not None else None
+
+    def allows(self, is_guild: bool, is_bot: bool, has_mentions: bool) -> bool:
+        return not ((self.guild_only and not is_guild) or (self.dm_only and is_guild)
+                    or (self.ignore_bots and is_bot) or (self.mentions and not has_mentions))
+
+    def matches(self, message: discord.Message) -> bool:
+        if not self.allows(message.guild is not None, message.author.bot, bool(message.mentions)):
+            return False
+
+        if self.authors is not None and message.author.id not in self.authors:
+            return False
+
+        if self.channels is not None and message.channel.id not in self.channels:
+            return False
+
+        if self.category is not None and getattr(message.channel, 'category_id', None) != self.category:
+            return False
+
+        return self.check is None or self.check(self.cog, message)
+
+
+class MessageRouter:
+    """Single on_message entry point that only schedules the handlers whose filters can match a message.
+
+    Handlers with an author, channel or category filter are indexed by that ID, the rest are bucketed by
+    (in a guild, sent by a bot, has mentions) so a message only looks at handlers that could act on it."""
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.routes: typing.List[Route] = []
+        self._by_author = {}
+        self._by_channel = {}
+        self._by_category = {}
+        self._buckets = {}
+        self.rebuild()
+
+    def add_cog(self, cog) -> None:
+        for cls in type(cog).__mro__:
+            for name, func in cls.__dict__.items():
+                filters = getattr(func, '__message_route__', None)
+                if filters is not None:
+                    self.routes.append(Route(cog, getattr(cog, name), filters))
+
+        self.rebuild()
+
+    def remove_cog(self, cog) -> None:
+        self.routes = [route for route in self.routes if route.cog is not cog]
+        self.rebuild()
+
+    def rebuild(self) -> None:
+        by_author = defaultdict(list)
+        by_channel = defaultdict(list)
+        by_category = defaultdict(list)
+        unindexed = []
+
+        for route in self.routes:
+            route.resolve()
+
+            if route.authors is not None:
+                for author_id in route.authors:
+                    by_author[author_id].append(route)
+            elif route.channels is not None:
+                for channel_id in route.channels:
+                    by_channel[channel_id].append(route)
+            elif route.category is not None:
+                by_category[route.category].append(route)
+            else:
+                unindexed.append(route)
+
+        self._by_author = {k: tuple(v) for k, v in by_author.items()}
+        self._by_channel = {k: tuple(v) for k, v in by_channel.items()}
+        self._by_category = {k: tuple(v) for k, v in by_category.items()}
+        self._buckets = {key: tuple(route for route in unindexed if route.allows(*key))
+                         for key in itertools.product((True, False), repeat=3)}
+
+    def candidates(self, message: discord.Message) -> typing.Iterator[Route]:
+        yield from self._buckets[(message.guild is not None, message.author.bot, bool(message.mentions))]
+
+        if self._by_author:
+            yield from self._by_author.get(message.author.id, ())
+
+        if self._by_channel:
+            yield from self._by_channel.get(message.channel.id, ())
+
+        if self._by_category:
+            category_id = getattr(message.channel, 'category_id', None)
+            if category_id is not None:
+                yield from self._by_category.get(category_id, ())
+
+    def dispatch(self, message: discord.Message) -> None:
+        for route in self.candidates(message):
+            if route.matches(message):
+                # same error handling as a normal listener, exceptions end up in bot.on_error
+                self.bot._schedule_event(route.callback, f"on_message ({route.name})", message)
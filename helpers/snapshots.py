@@ -0,0 +1,95 @@
+import typing
+import discord
+
+from collections import OrderedDict
+
+SNAPSHOTS_PER_CHANNEL = 100
+MAX_SNAPSHOTS = 20000
+
+
+class MessageSnapshot:
+    """The parts of a message the delete/edit logs and the ghost ping detector need, nothing else."""
+
+    __slots__ = ('id', 'channel_id', 'guild_id', 'author_id', 'author', 'content', 'attachments', 'mentions')
+
+    def __init__(self, message: discord.Message):
+        self.id = message.id
+        self.channel_id = message.channel.id
+        self.guild_id = message.guild.id
+        self.author_id = message.author.id
+        self.author = str(message.author)
+        self.content = message.content
+        self.attachments = tuple(a.filename for a in message.attachments)
+        self.mentions = tuple(m.id for m in message.mentions)
+
+    @property
+    def created_at(self):
+        return discord.utils.snowflake_time(self.id)
+
+    @property
+    def jump_url(self) -> str:
+        return f'https://discord.com/channels/{self.guild_id}/{self.channel_id}/{self.id}'
+
+
+class MessageSnapshots:
+    """Recent messages from logging and moderation guilds, for when discord.py's cache no longer has them.
+
+    Each channel keeps its last ``per_channel`` messages, and once there are more than ``max_snapshots`` in total the
+    oldest message of the least recently active channel goes first. Bot messages aren't kept."""
+
+    def __init__(self, bot, *, per_channel: int = SNAPSHOTS_PER_CHANNEL, max_snapshots: int = MAX_SNAPSHOTS):
+        self.bot = bot
+        self.per_channel = per_channel
+        self.max_snapshots = max_snapshots
+        # guilds kept on top of the logging ones
+        self.guilds: typing.Set[int] = set()
+        self.channels: typing.OrderedDict[int, typing.OrderedDict[int, MessageSnapshot]] = OrderedDict()
+        self.size = 0
+
+    def __len__(self) -> int:
+        return self.size
+
+    def wanted(self, guild_id: int) -> bool:
+        return guild_id in self.bot.log_routes or guild_id in self.guilds
+
+    def add(self, message: discord.Message) -> None:
+        if not message.guild or message.author.bot or not self.wanted(message.guild.id):
+            return
+
+        channel = self.channels.get(message.channel.id)
+        if channel is None:
+            channel = self.channels[message.channel.id] = OrderedDict()
+        else:
+            self.channels.move_to_end(message.channel.id)
+
+        if message.id not in channel:
+            self.size += 1
+        channel[message.id] = MessageSnapshot(message)
+
+        if len(channel) > self.per_channel:
+            channel.popitem(last=False)
+            self.size -= 1
+
+        while self.size > self.max_snapshots:
+            channel_id, oldest = next(iter(self.channels.items()))
+            oldest.popitem(last=False)
+            self.size -= 1
+            if not oldest:
+                del self.channels[channel_id]
+
+    def get(self, channel_id: int, message_id: int) -> typing.Optional[MessageSnapshot]:
+        channel = self.channels.get(channel_id)
+        return channel.get(message_id) if channel else None
+
+    def edit(self, channel_id: int, message_id: int, data: dict) -> None:
+        """Applies a raw MESSAGE_UPDATE to the snapshot, so later edits and deletes show the right content."""
+        snapshot = self.get(channel_id, message_id)
+        if snapshot is None:
+            return
+
+        if 'content' in data:
+            snapshot.content = data['content']
+        if 'attachments' in data:
+            snapshot.attachments = tuple(a['filename'] for a in data['attachments'])
+        if 'mentions' in data:
+            snapshot.mentions = tuple(int(m['id']) for m in data['mentions'])
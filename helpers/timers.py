@@ -0,0 +1,259 @@
+import heapq
+import typing
+import asyncio
+import datetime
+import itertools
+import traceback
+
+import discord
+
+# how many cancelled entries the heap can hold, as a fraction of its size, before it's rebuilt without them
+STALE_RATIO = 0.5
+
+
+class Timer:
+    """One pending expiry. ``key`` holds the values of the kind's key columns, in order."""
+
+    __slots__ = ('kind', 'key', 'when', 'seq', 'cancelled')
+
+    def __init__(self, kind: str, key: tuple, when: datetime.datetime, seq: int):
+        self.kind = kind
+        self.key = key
+        self.when = when
+        self.seq = seq
+        self.cancelled = False
+
+    def __lt__(self, other: 'Timer') -> bool:
+        return (self.when, self.seq) < (other.when, other.seq)
+
+    def __repr__(self) -> str:
+        return f"<Timer kind={self.kind!r} key={self.key!r} when={self.when!r}{' cancelled' if self.cancelled else ''}>"
+
+
+class TimerKind:
+    __slots__ = ('name', 'table', 'keys', 'callback', 'loaded', 'naive')
+
+    def __init__(self, name: str, table: str, keys: typing.Tuple[str, ...],
+                 callback: typing.Callable[[typing.List[Timer]], typing.Awaitable[None]]):
+        self.name = name
+        self.table = table
+        self.keys = keys
+        self.callback = callback
+        self.loaded = asyncio.Event()
+        # end_time is a plain ``timestamp`` column, holding UTC without saying so
+        self.naive = False
+
+    def to_db(self, when: datetime.datetime) -> datetime.datetime:
+        return when.astimezone(datetime.timezone.utc).replace(tzinfo=None) if self.naive else when
+
+    @property
+    def time_type(self) -> str:
+        return 'timestamp' if self.naive else 'timestamptz'
+
+
+def as_utc(when: datetime.datetime) -> datetime.datetime:
+    """Aware UTC, naive datetimes are taken to be UTC already."""
+    if when.tzinfo is None:
+        return when.replace(tzinfo=datetime.timezone.utc)
+    return when.astimezone(datetime.timezone.utc)
+
+
+class TimerService:
+    """Runs everything that has to happen at some point in the future (temp mutes and the like).
+
+    Each kind of timer is backed by its own table with bigint key columns and an ``end_time``, and the service keeps
+    every row of it in a min-heap. One task sleeps until the earliest ``end_time``, then hands *everything* that is due
+    to the kind's callback in one batch and deletes those rows in one query. Scheduling and cancelling are heap
+    operations (cancelled entries are skipped when they come up), so nothing gets restarted or re-queried.
+
+    Rows are loaded when a kind is registered, so anything that expired while the bot was down fires as soon as it's
+    ready again. Times are kept as aware UTC in memory, and written back as naive UTC if ``end_time`` turns out to be
+    a ``timestamp`` column rather than ``timestamptz``."""
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.kinds: typing.Dict[str, TimerKind] = {}
+        self.heap: typing.List[Timer] = []
+        self.pending: typing.Dict[typing.Tuple[str, tuple], Timer] = {}
+        self.fired = 0
+        self.batches = 0
+        self._stale = 0
+        self._seq = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._task: typing.Optional[asyncio.Task] = None
+        # keys scheduled or cancelled while their kind was still loading, the load mustn't overwrite them
+        self._touched: typing.Dict[str, typing.Set[tuple]] = {}
+
+    def __len__(self) -> int:
+        return len(self.pending)
+
+    def register(self, name: str, table: str, keys: typing.Tuple[str, ...],
+                 callback: typing.Callable[[typing.List[Timer]], typing.Awaitable[None]]) -> TimerKind:
+        """Adds a kind of timer and starts loading its rows. ``callback`` gets a list of every due timer of the kind."""
+        if name in self.kinds:
+            self.unregister(name)
+
+        kind = self.kinds[name] = TimerKind(name, table, tuple(keys), callback)
+        self._touched[name] = set()
+        asyncio.ensure_future(self._load(kind))
+
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._dispatch())
+        return kind
+
+    def unregister(self, name: str) -> None:
+        """Forgets a kind's timers in memory, its rows stay where they are for the next ``register``."""
+        self.kinds.pop(name, None)
+        self._touched.pop(name, None)
+        for timer in [t for (kind, _), t in self.pending.items() if kind == name]:
+            self._discard(timer)
+
+    async def _load(self, kind: TimerKind) -> None:
+        try:
+            kind.naive = await self.bot.db.fetchval(
+                "SELECT data_type = 'timestamp without time zone' FROM information_schema.columns "
+                "WHERE table_name = $1 AND column_name = 'end_time'", kind.table) or False
+            rows = await self.bot.db.fetch(f"SELECT {', '.join(kind.keys)}, end_time FROM {kind.table}")
+        except Exception as e:
+            print(f"[TIMERS] couldn't load {kind.name} timers from {kind.table} ({e})")
+            rows = []
+
+        if self.kinds.get(kind.name) is not kind:
+            return
+
+        touched = self._touched.pop(kind.name, set())
+        for row in rows:
+            key = tuple(row[column] for column in kind.keys)
+            if key not in touched:
+                self._push(kind.name, key, as_utc(row['end_time']))
+
+        kind.loaded.set()
+        print(f"[TIMERS] loaded {len(rows)} {kind.name} timers")
+
+    def _push(self, kind: str, key: tuple, when: datetime.datetime) -> Timer:
+        old = self.pending.get((kind, key))
+        if old is not None:
+            self._discard(old)
+
+        timer = Timer(kind, key, when, next(self._seq))
+        self.pending[(kind, key)] = timer
+        heapq.heappush(self.heap, timer)
+
+        if self.heap[0] is timer:
+            # sooner than whatever the dispatcher is sleeping on
+            self._wakeup.set()
+        return timer
+
+    def _discard(self, timer: Timer) -> None:
+        timer.cancelled = True
+        if self.pending.get((timer.kind, timer.key)) is timer:
+            del self.pending[(timer.kind, timer.key)]
+
+        self._stale += 1
+        if self._stale > len(self.heap) * STALE_RATIO:
+            self.heap = [t for t in self.heap if not t.cancelled]
+            heapq.heapify(self.heap)
+            self._stale = 0
+
+    def get(self, kind: str, key: tuple) -> typing.Optional[Timer]:
+        return self.pending.get((kind, tuple(key)))
+
+    async def schedule(self, kind: str, key: tuple, when: datetime.datetime, **columns) -> Timer:
+        """Writes the timer's row (``columns`` go into the other columns of it) and schedules it,
+        replacing the key's earlier timer if it had one."""
+        timer_kind = self.kinds[kind]
+        # the column type is only known once the kind has loaded
+        await timer_kind.loaded.wait()
+        key = tuple(key)
+        when = as_utc(when)
+        names = timer_kind.keys + tuple(columns) + ('end_time',)
+        values = key + tuple(columns.values()) + (timer_kind.to_db(when),)
+        updates = ', '.join(f'{c} = EXCLUDED.{c}' for c in tuple(columns) + ('end_time',))
+
+        await self.bot.db.execute(
+            f"INSERT INTO {timer_kind.table} ({', '.join(names)}) "
+            f"VALUES ({', '.join(f'${i}' for i in range(1, len(values) + 1))}) "
+            f"ON CONFLICT ({', '.join(timer_kind.keys)}) DO UPDATE SET {updates}", *values)
+
+        if kind in self._touched:
+            self._touched[kind].add(key)
+        return self._push(kind, key, when)
+
+    async def cancel(self, kind: str, key: tuple) -> bool:
+        """Deletes the timer's row and drops it from the heap. Returns whether there was one scheduled."""
+        timer_kind = self.kinds[kind]
+        key = tuple(key)
+        conditions = ' AND '.join(f'{c} = ${i}' for i, c in enumerate(timer_kind.keys, start=1))
+        await self.bot.db.execute(f"DELETE FROM {timer_kind.table} WHERE {conditions}", *key)
+
+        if kind in self._touched:
+            self._touched[kind].add(key)
+
+        timer = self.pending.get((kind, key))
+        if timer is None:
+            return False
+        self._discard(timer)
+        return True
+
+    def _pop_due(self, now: datetime.datetime) -> typing.List[Timer]:
+        due = []
+        while self.heap and self.heap[0].when <= now:
+            timer = heapq.heappop(self.heap)
+            if timer.cancelled:
+                self._stale -= 1
+                continue
+            del self.pending[(timer.kind, timer.key)]
+            due.append(timer)
+        return due
+
+    async def _dispatch(self) -> None:
+        await self.bot.wait_until_ready()
+
+        while True:
+            self._wakeup.clear()
+            due = self._pop_due(discord.utils.utcnow())
+            if due:
+                await self._fire(due)
+                continue
+
+            timeout = (self.heap[0].when - discord.utils.utcnow()).total_seconds() if self.heap else None
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _fire(self, due: typing.List[Timer]) -> None:
+        by_kind: typing.Dict[str, typing.List[Timer]] = {}
+        for timer in due:
+            by_kind.setdefault(timer.kind, []).append(timer)
+
+        self.batches += 1
+        self.fired += len(due)
+        await asyncio.gather(*(self._fire_kind(self.kinds[name], timers)
+                               for name, timers in by_kind.items() if name in self.kinds))
+
+    async def _fire_kind(self, kind: TimerKind, timers: typing.List[Timer]) -> None:
+        try:
+            await kind.callback(timers)
+        except Exception as e:
+            print(f"[TIMERS] {kind.name} callback failed for {len(timers)} timers:")
+            traceback.print_exception(type(e), e, e.__traceback__)
+
+        # the end_time check leaves rows alone that were rescheduled while the callback ran
+        columns = ', '.join(kind.keys + ('end_time',))
+        arrays = ', '.join([f'${i}::bigint[]' for i in range(1, len(kind.keys) + 1)] +
+                           [f'${len(kind.keys) + 1}::{kind.time_type}[]'])
+        matches = ' AND '.join(f't.{c} = d.{c}' for c in kind.keys)
+        try:
+            await self.bot.db.execute(
+                f"DELETE FROM {kind.table} t USING unnest({arrays}) AS d({columns}) "
+                f"WHERE {matches} AND t.end_time <= d.end_time",
+                *([timer.key[i] for timer in timers] for i in range(len(kind.keys))),
+                [kind.to_db(timer.when) for timer in timers])
+        except Exception as e:
+            print(f"[TIMERS] couldn't delete {len(timers)} expired {kind.name} timers ({e})")
+
+    def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
@@ -0,0 +1,100 @@
+import gzip
+import typing
+import discord
+
+from helpers.log_queue import LogFile
+from helpers.snapshots import MessageSnapshot
+
+PREVIEW_CHARS = 4000
+PREVIEW_LINE_CHARS = 200
+
+
+class PurgeTranscript:
+    """Builds the log of a bulk delete in one pass over the messages.
+
+    Every message goes into the full transcript (sent gzipped alongside the embed), and the short preview for the embed
+    description keeps a running length, so it stops taking lines once it's full instead of re-joining everything."""
+
+    def __init__(self, preview_chars: int = PREVIEW_CHARS):
+        self.lines: typing.List[str] = []
+        self.preview: typing.List[str] = []
+        self.preview_chars = preview_chars
+        self.cached = 0
+        self.snapshots = 0
+        self.missing = 0
+        self._preview_length = 0
+        self._preview_full = False
+
+    def __len__(self) -> int:
+        return len(self.lines)
+
+    @staticmethod
+    def _full_line(message: discord.Message) -> str:
+        author = f"{message.author} ({message.author.id}){' [BOT]' if message.author.bot else ''}"
+        line = f"[{message.created_at:%Y-%m-%d %H:%M:%S}] {author}: {message.content}"
+        for attachment in message.attachments:
+            line += f"\n    Attachment: {attachment.filename} - {attachment.url}"
+        for sticker in message.stickers:
+            line += f"\n    Sticker: {sticker.name} ({sticker.id})"
+        return line
+
+    @staticmethod
+    def _preview_line(message: discord.Message) -> str:
+        if message.attachments:
+            attachment = f'{len(message.attachments)} attachments: ' + message.attachments[0].filename
+        elif message.stickers:
+            attachment = 'Sticker: ' + message.stickers[0].name
+        else:
+            attachment = None
+        line = f"{discord.utils.remove_markdown(str(message.author))} > {message.content or attachment or '-'}"
+        if len(line) > PREVIEW_LINE_CHARS:
+            line = line[0:PREVIEW_LINE_CHARS] + '...'
+        return line
+
+    @staticmethod
+    def _snapshot_line(snapshot: MessageSnapshot) -> str:
+        line = f"[{snapshot.created_at:%Y-%m-%d %H:%M:%S}] {snapshot.author} ({snapshot.author_id}): {snapshot.content}"
+        for filename in snapshot.attachments:
+            line += f"\n    Attachment: {filename}"
+        return line
+
+    def add(self, message: discord.Message) -> None:
+        self.cached += 1
+        self.lines.append(self._full_line(message))
+        if not message.author.bot:
+            self._add_preview(self._preview_line(message))
+
+    def add_snapshot(self, snapshot: MessageSnapshot) -> None:
+        """A message discord.py had forgotten but the snapshot store still had."""
+        self.snapshots += 1
+        self.lines.append(self._snapshot_line(snapshot))
+
+        content = snapshot.content or (f'{len(snapshot.attachments)} attachments: ' + snapshot.attachments[0]
+                                       if snapshot.attachments else '-')
+        line = f"{discord.utils.remove_markdown(snapshot.author)} > {content}"
+        self._add_preview(line if len(line) <= PREVIEW_LINE_CHARS else line[0:PREVIEW_LINE_CHARS] + '...')
+
+    def add_missing(self, message_id: int) -> None:
+        """A message nothing had a copy of, so the transcript still accounts for it."""
+        self.missing += 1
+        self.lines.append(f"[{discord.utils.snowflake_time(message_id):%Y-%m-%d %H:%M:%S}] ID {message_id} (not cached)")
+
+    def _add_preview(self, line: str) -> None:
+        if self._preview_full:
+            return
+
+        # +1 for the newline joining it to the previous one
+        length = len(line) + bool(self.preview)
+        if self._preview_length + length > self.preview_chars:
+            self._preview_full = True
+            return
+
+        self.preview.append(line)
+        self._preview_length += length
+
+    def description(self) -> str:
+        return '\n'.join(self.preview)
+
+    def file(self, name: str, header: str = '') -> LogFile:
+        text = '\n'.join([header] + self.lines if header else self.lines)
+        return f'{name}.txt.gz', gzip.compress(text.encode())
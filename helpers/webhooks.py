@@ -0,0 +1,75 @@
+import re
+import time
+import typing
+
+DELIVER_TYPES = ('default', 'message', 'member', 'join_leave', 'voice', 'server')
+WEBHOOK_URL_REGEX = re.compile(r'webhooks/(?P<id>[0-9]{17,20})/(?P<token>[A-Za-z0-9.\-_]{60,68})')
+
+
+class RateLimit:
+    __slots__ = ('remaining', 'reset_at')
+
+    def __init__(self):
+        self.remaining = 1
+        self.reset_at = 0.0
+
+    def delay(self) -> float:
+        if self.remaining > 0:
+            return 0.0
+        return max(0.0, self.reset_at - time.monotonic())
+
+
+class PooledWebhook:
+    __slots__ = ('url', 'id', 'token', 'bucket')
+
+    def __init__(self, url: str, bucket: RateLimit):
+        match = WEBHOOK_URL_REGEX.search(url)
+        self.url = url
+        self.id = int(match['id']) if match else None
+        self.token = match['token'] if match else None
+        self.bucket = bucket
+
+
+class WebhookPool:
+    """Long-lived webhooks for log delivery, keyed by (guild, deliver type) and built from ``bot.log_channels``.
+
+    An entry is rebuilt whenever the URL in ``log_channels`` no longer matches the one it was built from, and
+    ``update_log`` / the logging config commands invalidate entries explicitly. Rate limit buckets are shared by URL,
+    since the same webhook can be set for more than one deliver type."""
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.entries: typing.Dict[typing.Tuple[int, str], PooledWebhook] = {}
+        self.buckets: typing.Dict[str, RateLimit] = {}
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, guild_id: int, deliver_type: str) -> typing.Optional[PooledWebhook]:
+        webhooks = self.bot.log_channels.get(guild_id)
+        url = getattr(webhooks, deliver_type, None) if webhooks else None
+        if not url:
+            return None
+
+        key = (guild_id, deliver_type)
+        entry = self.entries.get(key)
+
+        if entry is not None and entry.url == url:
+            self.hits += 1
+            return entry
+
+        self.misses += 1
+        entry = self.entries[key] = PooledWebhook(url, self.buckets.setdefault(url, RateLimit()))
+        return entry
+
+    def invalidate(self, guild_id: int, deliver_type: str = None) -> None:
+        for deliver_type in ((deliver_type,) if deliver_type else DELIVER_TYPES):
+            entry = self.entries.pop((guild_id, deliver_type), None)
+            if entry is not None:
+                self.invalidations += 1
+                self.buckets.pop(entry.url, None)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {'webhooks': len(self.entries), 'hits': self.hits, 'misses': self.misses,
+                'invalidations': self.invalidations, 'hit_rate': self.hits / lookups if lookups else 0.0}